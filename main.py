@@ -1,22 +1,37 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime
-import logging
 from src.routes import user_routes
-from src.db.database import SessionLocal, engine, Base
-from src.db.models import EmailVerification
+from src.db.database import engine, Base
+from src.db.migrations import run_startup_migrations
 from src.core.logger import logger
+from src.core.security import password_hasher
+from src.utils.email import mail_queue
+from src.core.middleware import AccessLogMiddleware
+from src.core.profiling import ProfilingMiddleware
+from src.core.config import (
+    SLOT_SWEEP_INTERVAL_MINUTES, SLOT_HOLD_SWEEP_SECONDS, SLOT_HOLD_FULL_SWEEP_MINUTES,
+    ASYNC_STACK_ENABLED, ASYNC_STACK_PREFIX, DB_POOL_LOG_INTERVAL_SECONDS, PROFILE_SECRET, PROFILE_SAMPLE_RATE,
+    SLOT_ENGINE
+)
 from src.routes.slot_generator import generate_barber_slots  
+from src.services.hold_service import sweep_expired_holds
+from src.db.pool import log_pool_metrics
+from src.db.query_stats import tracked_job
 from src.routes.shop_routes import router as shop_router
 from src.routes.barber_routes import router as barber_router
 from src.routes.availability_routes import router as availability_router
 from src.routes.booking_routes import router as booking_router
+from src.routes.internal_routes import router as internal_router
+from src.routes.search_routes import router as search_router
+from src.routes.metrics_routes import router as metrics_router
 
 # ============================================
 # 🧱 Database initialization
 # ============================================
 Base.metadata.create_all(bind=engine)
+run_startup_migrations()
 
 # ============================================
 # 🚀 FastAPI app initialization
@@ -41,52 +56,32 @@ app.add_middleware(
 # ============================================
 # 🧾 Log every incoming request
 # ============================================
-logging.basicConfig(
-    filename="/home/azureuser/app/backend/api_access.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# Opt-in request profiling (signed X-Profile header or sampling); added first so it runs
+# inside the access middleware and sees the request's query counter
+if PROFILE_SECRET or PROFILE_SAMPLE_RATE:
+    app.add_middleware(ProfilingMiddleware)
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    client_ip = request.client.host
-    method = request.method
-    url = str(request.url.path)
-    try:
-        response = await call_next(request)
-        status_code = response.status_code
-        logging.info(f"{client_ip} - {method} {url} - {status_code}")
-        return response
-    except Exception as e:
-        logging.error(f"{client_ip} - {method} {url} - ERROR: {str(e)}")
-        raise e
+# Pure ASGI: times every request into per-route histograms (served at /metrics) and
+# writes the access log through the "access" category of the logging pipeline
+app.add_middleware(AccessLogMiddleware)
 
 # ============================================
 # 🧩 Include Routers
 # ============================================
+# Async stack side by side with the sync one during the migration; with an empty
+# prefix it is included first so its routes win on the shared paths
+if ASYNC_STACK_ENABLED:
+    from src.routes.async_routes import router as async_router
+    app.include_router(async_router, prefix=ASYNC_STACK_PREFIX)
+
 app.include_router(user_routes.router, prefix="/users", tags=["Users"])
 app.include_router(shop_router)
 app.include_router(barber_router)
 app.include_router(availability_router)
 app.include_router(booking_router)
-
-# ============================================
-# 🧹 OTP Cleanup Job
-# ============================================
-def delete_expired_otps():
-    db = SessionLocal()
-    now = datetime.utcnow()
-    try:
-        deleted = db.query(EmailVerification).filter(
-            EmailVerification.otp_expiry < now
-        ).delete(synchronize_session=False)
-        db.commit()
-        logger.info(f"[OTP CLEANUP] Deleted {deleted} expired OTP(s) at {now}")
-    except Exception as e:
-        db.rollback()
-        logger.error(f"[OTP CLEANUP ERROR] {str(e)}")
-    finally:
-        db.close()
+app.include_router(search_router)
+app.include_router(internal_router)
+app.include_router(metrics_router)
 
 # ============================================
 # ⏰ APScheduler setup
@@ -96,24 +91,47 @@ scheduler = BackgroundScheduler()
 @app.on_event("startup")
 def start_scheduler():
     try:
+        # The virtual engine computes slots from schedules and bookings: nothing to materialize
+        if SLOT_ENGINE != "virtual":
+            scheduler.add_job(
+                tracked_job("slot_agent", generate_barber_slots),
+                "interval",
+                minutes=SLOT_SWEEP_INTERVAL_MINUTES,
+                next_run_time=datetime.now(),  # fill the horizon right away instead of after the first interval
+                id="slot_agent",
+                replace_existing=True
+            )
+
+        # Cheap in-process check: only hits the DB when a hold from this worker is due
+        scheduler.add_job(
+            tracked_job("release_holds", sweep_expired_holds),
+            "interval",
+            seconds=SLOT_HOLD_SWEEP_SECONDS,
+            id="release_holds",
+            replace_existing=True
+        )
+
+        # Catches holds from other workers or from before a restart
         scheduler.add_job(
-            delete_expired_otps,
+            tracked_job("release_holds_full", sweep_expired_holds),
             "interval",
-            minutes=5,
-            id="delete_otps",
+            minutes=SLOT_HOLD_FULL_SWEEP_MINUTES,
+            kwargs={"force": True},
+            id="release_holds_full",
             replace_existing=True
         )
 
+        # Pool pressure in the logs, to size pools per deployment
         scheduler.add_job(
-            generate_barber_slots,
+            log_pool_metrics,
             "interval",
-            minutes=60,
-            id="slot_agent",
+            seconds=DB_POOL_LOG_INTERVAL_SECONDS,
+            id="pool_metrics",
             replace_existing=True
         )
 
         scheduler.start()
-        logger.info("Scheduler started with OTP cleanup + Slot generator jobs")
+        logger.info(f"Scheduler started ({SLOT_ENGINE} slot engine) with jobs: {', '.join(job.id for job in scheduler.get_jobs())}")
     except Exception as e:
         logger.error(f"Failed to start scheduler: {str(e)}")
 
@@ -122,6 +140,8 @@ def shutdown_scheduler():
     try:
         scheduler.shutdown()
         logger.info("Scheduler shutdown successfully.")
+        password_hasher.shutdown()
+        mail_queue.stop()
     except Exception as e:
         logger.error(f"Error while shutting down scheduler: {str(e)}")
 
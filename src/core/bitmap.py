@@ -0,0 +1,155 @@
+from array import array
+from functools import reduce
+from math import gcd
+
+# Bit i of a barber's masks is the slot starting at offset + i * step minutes after midnight
+SLOT_STATUSES = ("available", "booked", "held")
+
+
+def _to_minutes(slot_time: str) -> int:
+    hours, minutes, _ = slot_time.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _to_slot_time(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+def _bits(mask: int):
+    """Yield the positions of the set bits of `mask`, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BarberDayMask:
+    """
+    One barber's slots for one date as three integer bitmasks (free, booked, held).
+    `slot_ids` holds the ids of all slots in time order, so the masks expand back to the
+    full listing without keeping one dict per slot around.
+    """
+
+    __slots__ = ("barber_id", "barber_name", "offset", "step", "free", "booked", "held", "slot_ids")
+
+    def __init__(self, barber_id: int, barber_name: str, offset: int, step: int,
+                 free: int = 0, booked: int = 0, held: int = 0, slot_ids=()):
+        self.barber_id = barber_id
+        self.barber_name = barber_name
+        self.offset = offset
+        self.step = step
+        self.free = free
+        self.booked = booked
+        self.held = held
+        self.slot_ids = array("q", slot_ids)
+
+    def minute_of(self, bit: int) -> int:
+        return self.offset + bit * self.step
+
+    def any_free(self) -> bool:
+        return self.free != 0
+
+    def first_free(self):
+        """Start minute of the earliest free slot, or None."""
+        if not self.free:
+            return None
+        return self.minute_of((self.free & -self.free).bit_length() - 1)
+
+    def window_mask(self, start: int, end: int) -> int:
+        """Mask of the bits whose slot starts within [start, end) minutes."""
+        first = max(0, -(-(start - self.offset) // self.step))
+        last = -(-(end - self.offset) // self.step)
+        if last <= first:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+    def free_in_window(self, start: int, end: int) -> int:
+        """Free slots starting within [start, end) minutes, as a mask."""
+        return self.free & self.window_mask(start, end)
+
+    def slots(self):
+        """Expand back into the per-slot dicts served by the slot listing."""
+        result = []
+        for slot_id, bit in zip(self.slot_ids, _bits(self.free | self.booked | self.held)):
+            if self.free >> bit & 1:
+                status = "available"
+            elif self.booked >> bit & 1:
+                status = "booked"
+            else:
+                status = "held"
+            result.append({
+                "slot_id": slot_id,
+                "barber_id": self.barber_id,
+                "barber_name": self.barber_name,
+                "slot_time": _to_slot_time(self.minute_of(bit)),
+                "status": status
+            })
+        return result
+
+
+class DayAvailability:
+    """A shop's slot listing for one date, stored as one BarberDayMask per barber."""
+
+    __slots__ = ("barbers",)
+
+    def __init__(self, barbers):
+        self.barbers = tuple(barbers)
+
+    @classmethod
+    def from_slots(cls, slots, step: int):
+        """
+        Build from a listing ordered by (barber_id, slot_time). `step` is the slot length,
+        used as the grid when a barber's start times do not imply a finer one.
+        Raises ValueError for listings a bitmap cannot reproduce exactly.
+        """
+        grouped = {}
+        for slot in slots:
+            if slot["status"] not in SLOT_STATUSES or _to_slot_time(_to_minutes(slot["slot_time"])) != slot["slot_time"]:
+                raise ValueError(f"Slot {slot['slot_id']} cannot be stored as a bit")
+            grouped.setdefault(slot["barber_id"], []).append(slot)
+
+        barbers = []
+        for barber_id, barber_slots in grouped.items():
+            starts = [_to_minutes(slot["slot_time"]) for slot in barber_slots]
+            if starts != sorted(set(starts)):
+                raise ValueError(f"Slots of barber {barber_id} are not in strict time order")
+            offset = starts[0]
+            barber_step = reduce(gcd, (start - offset for start in starts), step)
+            masks = {status: 0 for status in SLOT_STATUSES}
+            for slot, start in zip(barber_slots, starts):
+                masks[slot["status"]] |= 1 << ((start - offset) // barber_step)
+            barbers.append(BarberDayMask(
+                barber_id, barber_slots[0]["barber_name"], offset, barber_step,
+                masks["available"], masks["booked"], masks["held"],
+                [slot["slot_id"] for slot in barber_slots]
+            ))
+        return cls(barbers)
+
+    def slots(self):
+        return [slot for barber in self.barbers for slot in barber.slots()]
+
+    def __len__(self):
+        return sum(len(barber.slot_ids) for barber in self.barbers)
+
+    def to_bitmap(self) -> dict:
+        """
+        Compact response: a barber lookup table plus hex masks aligned with it.
+        Masks are hex strings so they stay exact on clients limited to 53-bit integers.
+        A barber's `slot_ids` belong to the set bits of free | booked | held, lowest bit
+        first, so a client can book a free bit without fetching the JSON listing.
+        """
+        return {
+            "barbers": [
+                {
+                    "barber_id": barber.barber_id,
+                    "barber_name": barber.barber_name,
+                    "offset_minutes": barber.offset,
+                    "step_minutes": barber.step,
+                    "slot_ids": list(barber.slot_ids)
+                }
+                for barber in self.barbers
+            ],
+            "free": [format(barber.free, "x") for barber in self.barbers],
+            "booked": [format(barber.booked, "x") for barber in self.barbers],
+            "held": [format(barber.held, "x") for barber in self.barbers]
+        }
@@ -14,6 +14,137 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 DATABASE_URL = f"mysql+pymysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"mysql+aiomysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Read replica for GET routes (same credentials and schema); unset = everything goes to the primary
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST")
+DB_REPLICA_PORT = os.getenv("DB_REPLICA_PORT", DB_PORT)
+DATABASE_REPLICA_URL = (
+    f"mysql+pymysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}" if DB_REPLICA_HOST else None
+)
+ASYNC_DATABASE_REPLICA_URL = (
+    f"mysql+aiomysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}" if DB_REPLICA_HOST else None
+)
+# Clients that wrote within this window read from the primary (read-your-writes)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+READ_YOUR_WRITES_MAX_CLIENTS = int(os.getenv("READ_YOUR_WRITES_MAX_CLIENTS", 100000))
+# Upper bound on replica lag: caches and ETags are not filled from reads this close to a write
+REPLICA_LAG_GRACE_SECONDS = float(os.getenv("REPLICA_LAG_GRACE_SECONDS", 2)) if DB_REPLICA_HOST else 0.0
+
+# Connection pool (per engine, per worker process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # below MySQL's wait_timeout
+DB_POOL_LOG_INTERVAL_SECONDS = int(os.getenv("DB_POOL_LOG_INTERVAL_SECONDS", 60))
+# Log every SQL statement (through the queued "sql" log category)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+# Per-request / per-job query counting. QUERY_DEBUG adds X-DB-* response headers and logs a
+# summary; a statement shape repeated QUERY_NPLUSONE_THRESHOLD times in one unit is flagged as N+1
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "false").lower() == "true"
+QUERY_NPLUSONE_THRESHOLD = int(os.getenv("QUERY_NPLUSONE_THRESHOLD", 5))
+
+# On-demand request profiling (sampling profiler). A request is profiled when it carries a valid
+# X-Profile header signed with PROFILE_SECRET, or at random with PROFILE_SAMPLE_RATE.
+# Both unset = the profiling middleware is not installed at all.
+PROFILE_SECRET = os.getenv("PROFILE_SECRET")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 2))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 200))  # newest profiles kept on disk
+
+# Logging: handlers run on a background writer thread fed by a bounded queue (records are
+# dropped, and counted, when it is full). LOG_FORMAT is "text" or "json".
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Per-category sampling ("access=0.1,sql=0.01") and rate limits in records/second ("access=500");
+# warnings and errors are never sampled or limited
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_RATE_LIMITS = os.getenv("LOG_RATE_LIMITS", "access=500,sql=200")
+ACCESS_LOG_FILE = os.getenv("ACCESS_LOG_FILE", "/home/azureuser/app/backend/api_access.log")
+
+# Async request stack (aiomysql). When enabled its routes are mounted under ASYNC_STACK_PREFIX
+# next to the sync ones; an empty prefix makes them take over the regular paths.
+ASYNC_STACK_ENABLED = os.getenv("ASYNC_STACK_ENABLED", "false").lower() == "true"
+ASYNC_STACK_PREFIX = os.getenv("ASYNC_STACK_PREFIX", "/async")
+
+# One-time passwords: lifetime, and the cap on codes held by the in-process store
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", 300))
+OTP_STORE_MAX_ENTRIES = int(os.getenv("OTP_STORE_MAX_ENTRIES", 100000))
+
+# Password hashing. Raising BCRYPT_ROUNDS rehashes each user's password at their next login.
+# bcrypt runs in a pool of PASSWORD_HASH_WORKERS processes (0 = inline on the calling thread);
+# beyond PASSWORD_HASH_MAX_PENDING queued/running hashes, requests are rejected with 503.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
 
 SMTP_EMAIL = os.getenv("SMTP_EMAIL")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+# Point SMTP_HOST/SMTP_PORT at a local stand-in (e.g. `python -m aiosmtpd -n -l localhost:1025`,
+# with SMTP_STARTTLS=false) to exercise delivery without sending real mail
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", 10))
+
+# Outbound mail queue: requests enqueue, MAIL_WORKERS threads deliver over persistent SMTP
+# connections (closed after MAIL_IDLE_SECONDS without work), up to MAIL_BATCH_SIZE messages per
+# wake-up. Failed sends are retried with exponential backoff from MAIL_RETRY_BASE_SECONDS.
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", 2))
+MAIL_QUEUE_SIZE = int(os.getenv("MAIL_QUEUE_SIZE", 10000))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 20))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+MAIL_RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", 2))
+MAIL_IDLE_SECONDS = float(os.getenv("MAIL_IDLE_SECONDS", 60))
+
+# Number of days (starting today) for which bookable slots are kept materialized
+SLOT_HORIZON_DAYS = int(os.getenv("SLOT_HORIZON_DAYS", 14))
+
+# Length of one bookable slot
+SLOT_DURATION_MINUTES = int(os.getenv("SLOT_DURATION_MINUTES", 60))
+
+# "materialized" reads barber_slots rows, "virtual" computes slots from schedules and bookings
+SLOT_ENGINE = os.getenv("SLOT_ENGINE", "materialized")
+
+# Booking concurrency: "pessimistic" (conditional UPDATE holding row locks) or "optimistic" (version check + retry)
+BOOKING_CONCURRENCY_MODE = os.getenv("BOOKING_CONCURRENCY_MODE", "pessimistic")
+BOOKING_MAX_RETRIES = int(os.getenv("BOOKING_MAX_RETRIES", 3))
+BOOKING_RETRY_BACKOFF_MS = int(os.getenv("BOOKING_RETRY_BACKOFF_MS", 20))
+
+# Stored first responses for requests sent with an Idempotency-Key
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", 10000))
+
+# Short-lived slot holds during checkout
+SLOT_HOLD_SECONDS = int(os.getenv("SLOT_HOLD_SECONDS", 300))
+SLOT_HOLD_MAX_SECONDS = int(os.getenv("SLOT_HOLD_MAX_SECONDS", 900))
+SLOT_HOLD_SWEEP_SECONDS = int(os.getenv("SLOT_HOLD_SWEEP_SECONDS", 15))
+SLOT_HOLD_FULL_SWEEP_MINUTES = int(os.getenv("SLOT_HOLD_FULL_SWEEP_MINUTES", 5))
+
+# Read-through cache of slot listings per (shop, date)
+SLOT_CACHE_MAX_ENTRIES = int(os.getenv("SLOT_CACHE_MAX_ENTRIES", 5000))
+SLOT_CACHE_TTL_SECONDS = int(os.getenv("SLOT_CACHE_TTL_SECONDS", 300))
+
+# Upper bound on tracked ETag version scopes (shops, barbers, slot dates)
+VERSION_STAMPS_MAX_ENTRIES = int(os.getenv("VERSION_STAMPS_MAX_ENTRIES", 100000))
+# ETags roll over at least this often: bounds stale 304s after writes handled by other worker processes
+VERSION_STAMPS_MAX_AGE_SECONDS = int(os.getenv("VERSION_STAMPS_MAX_AGE_SECONDS", 60))
+
+# GET /shops/ page size
+SHOP_PAGE_SIZE = int(os.getenv("SHOP_PAGE_SIZE", 50))
+SHOP_PAGE_MAX_SIZE = int(os.getenv("SHOP_PAGE_MAX_SIZE", 200))
+
+# Longest date range served by the shop calendar endpoint
+CALENDAR_MAX_DAYS = int(os.getenv("CALENDAR_MAX_DAYS", 31))
+
+# Slot stream (SSE): per-subscriber event backlog, subscriber cap per worker, keep-alive interval
+SLOT_STREAM_QUEUE_SIZE = int(os.getenv("SLOT_STREAM_QUEUE_SIZE", 100))
+SLOT_STREAM_MAX_SUBSCRIBERS = int(os.getenv("SLOT_STREAM_MAX_SUBSCRIBERS", 10000))
+SLOT_STREAM_HEARTBEAT_SECONDS = int(os.getenv("SLOT_STREAM_HEARTBEAT_SECONDS", 15))
+
+# Full slot sweep interval; schedule edits are regenerated immediately per barber
+SLOT_SWEEP_INTERVAL_MINUTES = int(os.getenv("SLOT_SWEEP_INTERVAL_MINUTES", 360))
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from src.core.config import IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_ENTRIES
+from src.core.logger import logger
+
+
+class IdempotencyBackend(ABC):
+    """
+    Storage for the first response of requests sent with an Idempotency-Key.
+
+    A record is a dict with "fingerprint", "status_code" and "body"; "status_code" is None
+    while the first request is still running. A shared store (e.g. Redis) can implement
+    the same three methods and be installed with `set_idempotency_backend`.
+    """
+
+    @abstractmethod
+    def reserve(self, key, fingerprint: str):
+        """Atomically claim `key`. Returns None if claimed, otherwise the existing record."""
+
+    @abstractmethod
+    def complete(self, key, status_code: int, body):
+        """Store the response of the request that reserved `key`."""
+
+    @abstractmethod
+    def release(self, key):
+        """Drop the reservation of a request that failed, so the key can be retried."""
+
+
+class InMemoryIdempotencyStore(IdempotencyBackend):
+    """Process-local store with a TTL per record and LRU eviction beyond `max_entries`."""
+
+    def __init__(self, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS, max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+                 clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, key, fingerprint: str):
+        now = self._clock()
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record["expires_at"] > now:
+                self._records.move_to_end(key)
+                return record
+
+            self._records[key] = {
+                "fingerprint": fingerprint,
+                "status_code": None,
+                "body": None,
+                "expires_at": now + self.ttl_seconds
+            }
+            self._records.move_to_end(key)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+            return None
+
+    def complete(self, key, status_code: int, body):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None:
+                record["status_code"] = status_code
+                record["body"] = body
+
+    def release(self, key):
+        with self._lock:
+            self._records.pop(key, None)
+
+    def __len__(self):
+        return len(self._records)
+
+
+_backend = InMemoryIdempotencyStore()
+
+
+def set_idempotency_backend(backend: IdempotencyBackend):
+    global _backend
+    _backend = backend
+
+
+def run_idempotent(idempotency_key: str | None, user_id: int, payload, handler):
+    """
+    Run `handler()` at most once per (user_id, idempotency_key).
+
+    Replays of a finished request get the stored response without calling the handler.
+    Successful responses and client errors are stored; conflicts (409) and server errors
+    are not, so the client can retry them with the same key.
+    """
+    if not idempotency_key:
+        return handler()
+
+    key, replay = _reserve(idempotency_key, user_id, payload)
+    if replay is not None:
+        return replay
+    try:
+        result = handler()
+    except Exception as e:
+        _record_failure(key, e)
+        raise
+    return _record_success(key, result)
+
+
+async def run_idempotent_async(idempotency_key: str | None, user_id: int, payload, handler):
+    """`run_idempotent` for async routes: `handler()` returns an awaitable."""
+    if not idempotency_key:
+        return await handler()
+
+    key, replay = _reserve(idempotency_key, user_id, payload)
+    if replay is not None:
+        return replay
+    try:
+        result = await handler()
+    except Exception as e:
+        _record_failure(key, e)
+        raise
+    return _record_success(key, result)
+
+
+def _reserve(idempotency_key: str, user_id: int, payload):
+    """Return (key, None) when this request should run, or (key, stored response) for a replay."""
+    key = (user_id, idempotency_key)
+    fingerprint = hashlib.sha256(
+        json.dumps(jsonable_encoder(payload), sort_keys=True).encode()
+    ).hexdigest()
+
+    record = _backend.reserve(key, fingerprint)
+    if record is None:
+        return key, None
+
+    if record["fingerprint"] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    if record["status_code"] is None:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+    logger.info(f"[IDEMPOTENCY] Replaying stored response for user {user_id}")
+    return key, JSONResponse(
+        status_code=record["status_code"],
+        content=record["body"],
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+
+def _record_failure(key, error: Exception):
+    if isinstance(error, HTTPException) and error.status_code != 409 and error.status_code < 500:
+        _backend.complete(key, error.status_code, {"detail": error.detail})
+    else:
+        _backend.release(key)
+
+
+def _record_success(key, result):
+    _backend.complete(key, 200, jsonable_encoder(result))
+    return result
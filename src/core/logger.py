@@ -1,6 +1,16 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
+from src.core.config import (
+    LOG_ASYNC, LOG_QUEUE_SIZE, LOG_FORMAT, LOG_SAMPLE_RATES, LOG_RATE_LIMITS, ACCESS_LOG_FILE
+)
 
 # Log directory
 LOG_DIR = "logs"
@@ -9,6 +19,172 @@ os.makedirs(LOG_DIR, exist_ok=True)
 # Logger config
 LOG_FILE = os.path.join(LOG_DIR, "app.log")
 
+# Standard LogRecord attributes; anything else on a record came in through `extra=`
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "category"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        category = getattr(record, "category", None)
+        if category:
+            entry["category"] = category
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _parse_rates(spec: str) -> dict:
+    """"access=0.1,sql=5" -> {"access": 0.1, "sql": 5.0}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        category, _, value = item.partition("=")
+        rates[category.strip()] = float(value)
+    return rates
+
+
+def record_category(record) -> str | None:
+    """`extra={"category": ...}` if given; SQLAlchemy's engine logs are the "sql" category."""
+    category = getattr(record, "category", None)
+    if category is None and record.name.startswith("sqlalchemy"):
+        category = "sql"
+    return category
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Per-category sampling and token-bucket rate limiting of INFO/DEBUG records. Runs on the
+    emitting thread before a record is queued, so dropped records cost almost nothing.
+    """
+
+    def __init__(self, sample_rates: dict = None, rate_limits: dict = None, clock=time.monotonic, rng=random.random):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limits = rate_limits or {}
+        self._clock = clock
+        self._rng = rng
+        self._buckets = {}  # category -> (tokens, last refill)
+        self.sampled_out = {}
+        self.rate_limited = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        category = record_category(record)
+        if category is None:
+            return True
+
+        rate = self.sample_rates.get(category)
+        if rate is not None and self._rng() >= rate:
+            self._count(self.sampled_out, category)
+            return False
+
+        limit = self.rate_limits.get(category)
+        if limit is not None and not self._take(category, limit):
+            self._count(self.rate_limited, category)
+            return False
+        return True
+
+    def _take(self, category: str, limit: float) -> bool:
+        with self._lock:
+            now = self._clock()
+            tokens, last = self._buckets.get(category, (limit, now))
+            tokens = min(limit, tokens + (now - last) * limit)
+            if tokens < 1:
+                self._buckets[category] = (tokens, now)
+                return False
+            self._buckets[category] = (tokens - 1, now)
+            return True
+
+    def _count(self, counter: dict, category: str):
+        with self._lock:
+            counter[category] = counter.get(category, 0) + 1
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to a bounded queue drained by a QueueListener thread. Formatting happens on
+    the listener thread too (records stay in-process, so there is nothing to pickle), and a
+    full queue drops the record instead of blocking the request.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+formatter = (
+    JsonFormatter() if LOG_FORMAT == "json"
+    else logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+)
+sampling_filter = SamplingFilter(_parse_rates(LOG_SAMPLE_RATES), _parse_rates(LOG_RATE_LIMITS))
+_listeners = []
+_queue_handlers = {}
+
+
+def attach_handlers(target: logging.Logger, handlers: list, name: str):
+    """
+    Route `target` to `handlers`: through a queue and background writer thread when LOG_ASYNC,
+    directly otherwise. Either way the sampling filter runs first.
+    """
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    if not LOG_ASYNC:
+        for handler in handlers:
+            handler.addFilter(sampling_filter)
+            target.addHandler(handler)
+        return
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(sampling_filter)
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    _queue_handlers[name] = queue_handler
+    target.addHandler(queue_handler)
+
+
+def stop_logging():
+    """Flush queued records and stop the writer threads (also runs at interpreter exit)."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(stop_logging)
+
+
+def logging_stats() -> dict:
+    return {
+        "async": LOG_ASYNC,
+        "queues": {
+            name: {"queued": handler.queue.qsize(), "dropped": handler.dropped}
+            for name, handler in _queue_handlers.items()
+        },
+        "sampled_out": dict(sampling_filter.sampled_out),
+        "rate_limited": dict(sampling_filter.rate_limited)
+    }
+
+
 # Create logger
 logger = logging.getLogger("fastapi-auth")
 logger.setLevel(logging.INFO)
@@ -21,12 +197,25 @@ console_handler.setLevel(logging.INFO)
 file_handler = RotatingFileHandler(LOG_FILE, maxBytes=5*1024*1024, backupCount=3)
 file_handler.setLevel(logging.INFO)
 
-# Formatter
-formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s")
-console_handler.setFormatter(formatter)
-file_handler.setFormatter(formatter)
-
 # Add handlers
 if not logger.handlers:  # Avoid duplicate logs
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    attach_handlers(logger, [console_handler, file_handler], "app")
+
+
+def enable_sql_logging():
+    """DB_ECHO: SQL statements go through the app log pipeline (category "sql") instead of echo=True."""
+    sql_logger = logging.getLogger("sqlalchemy.engine")
+    sql_logger.setLevel(logging.INFO)
+    sql_logger.propagate = False
+    if not sql_logger.handlers:
+        sql_logger.addHandler(_queue_handlers["app"] if "app" in _queue_handlers else file_handler)
+
+
+def access_logger() -> logging.Logger:
+    """Per-request access log (category "access") written to ACCESS_LOG_FILE by its own writer thread."""
+    access = logging.getLogger("fastapi-auth.access")
+    if not access.handlers:
+        access.setLevel(logging.INFO)
+        access.propagate = False
+        attach_handlers(access, [logging.FileHandler(ACCESS_LOG_FILE)], "access")
+    return access
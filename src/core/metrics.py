@@ -0,0 +1,137 @@
+import threading
+from bisect import bisect_left
+
+# Upper bounds in milliseconds; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: O(1) memory per series and cheap enough to observe on every
+    request. Percentiles are estimated by interpolating inside the bucket that holds them.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def percentile(self, q: float, counts=None, total=None):
+        """Estimated value below which a fraction `q` of the observations fall."""
+        if counts is None:
+            with self._lock:
+                counts, total = list(self._counts), self._count
+        if not total:
+            return 0.0
+
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else max(self._max, lower)
+                return round(lower + (upper - lower) * (rank - seen) / count, 3)
+            seen += count
+        return round(self._max, 3)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total, value_sum, value_max = list(self._counts), self._count, self._sum, self._max
+
+        cumulative, running = [], 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            running += count
+            cumulative.append((bound, running))
+        return {
+            "count": total,
+            "sum": round(value_sum, 3),
+            "max": round(value_max, 3),
+            "p50": self.percentile(0.50, counts, total),
+            "p95": self.percentile(0.95, counts, total),
+            "p99": self.percentile(0.99, counts, total),
+            "buckets": cumulative
+        }
+
+
+class RouteLatency:
+    """Request latency histograms and status counters per (method, route template)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self._histograms = {}  # (method, route) -> Histogram
+        self._statuses = {}    # (method, route, status) -> count
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, duration_ms: float):
+        key = (method, route)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        histogram.observe(duration_ms)
+        status_key = (method, route, status)
+        with self._lock:
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            histograms, statuses = dict(self._histograms), dict(self._statuses)
+        return {
+            "latency_ms": {key: histogram.snapshot() for key, histogram in histograms.items()},
+            "statuses": statuses
+        }
+
+
+route_latency = RouteLatency()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def render_prometheus(snapshot: dict = None) -> str:
+    """Prometheus text exposition (format 0.0.4) of `route_latency`."""
+    snapshot = snapshot or route_latency.snapshot()
+    lines = [
+        "# HELP http_requests_total Requests handled, by method, route template and status.",
+        "# TYPE http_requests_total counter"
+    ]
+    for (method, route, status), count in sorted(snapshot["statuses"].items()):
+        lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += [
+        "# HELP http_request_duration_seconds Request latency, by method and route template.",
+        "# TYPE http_request_duration_seconds histogram"
+    ]
+    for (method, route), stats in sorted(snapshot["latency_ms"].items()):
+        for bound, cumulative in stats["buckets"]:
+            le = bound if bound == "+Inf" else repr(bound / 1000)
+            lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=le)} {cumulative}")
+        lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {stats['sum'] / 1000}")
+        lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} {stats['count']}")
+
+    lines += [
+        "# HELP http_request_latency_ms Estimated request latency percentiles, by method and route template.",
+        "# TYPE http_request_latency_ms summary"
+    ]
+    for (method, route), stats in sorted(snapshot["latency_ms"].items()):
+        for quantile, field in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            lines.append(f"http_request_latency_ms{_labels(method=method, route=route, quantile=quantile)} {stats[field]}")
+        lines.append(f"http_request_latency_ms_sum{_labels(method=method, route=route)} {stats['sum']}")
+        lines.append(f"http_request_latency_ms_count{_labels(method=method, route=route)} {stats['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,72 @@
+import time
+from src.core.config import QUERY_DEBUG
+from src.core.logger import access_logger
+from src.core.metrics import route_latency
+from src.db.query_stats import track_queries, report, debug_headers
+
+# Requests that matched no route share one label, so unknown paths cannot grow the metrics
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class AccessLogMiddleware:
+    """
+    Pure ASGI access log and timing: no request/response wrapping, streaming bodies pass
+    straight through. Records method, route template, status and duration into
+    `route_latency` and writes one access log line per request. Database statements of
+    the request are counted (see query_stats); N+1 loops are logged, and with QUERY_DEBUG
+    the counts are returned in X-DB-* headers.
+
+    Duration runs until the last body chunk is sent, so for a streaming response
+    (e.g. the slot event stream) it is the lifetime of the stream.
+    """
+
+    def __init__(self, app, latency=route_latency):
+        self.app = app
+        self.latency = latency
+        self.access_log = access_logger()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        with track_queries(f"{scope['method']} {scope['path']}") as queries:
+
+            async def send_wrapper(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if QUERY_DEBUG:
+                        message = {**message, "headers": [*message.get("headers", ()), *debug_headers(queries)]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception as e:
+                self._record(scope, 500, start, error=e)
+                raise
+            finally:
+                report(queries)
+            self._record(scope, status, start)
+
+    def _record(self, scope, status: int, start: float, error: Exception = None):
+        duration_ms = (time.perf_counter() - start) * 1000
+        # The router leaves the matched route in the scope; its path is the template ("/shops/{shop_id}/slots/")
+        route = scope.get("route")
+        template = getattr(route, "path", None) or UNMATCHED_ROUTE
+        self.latency.observe(scope["method"], template, status, duration_ms)
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "-"
+        extra = {"category": "access", "route": template, "status": status, "duration_ms": round(duration_ms, 3)}
+        if error is not None:
+            self.access_log.error(
+                "%s - %s %s - ERROR: %s - %.1fms", client_ip, scope["method"], scope["path"], error, duration_ms, extra=extra
+            )
+        else:
+            self.access_log.info(
+                "%s - %s %s - %s - %.1fms", client_ip, scope["method"], scope["path"], status, duration_ms, extra=extra
+            )
@@ -0,0 +1,93 @@
+import heapq
+import hmac
+import threading
+import time
+from abc import ABC, abstractmethod
+from src.core.config import OTP_STORE_MAX_ENTRIES
+
+# Outcomes of OTPStore.verify
+OTP_VALID = "valid"
+OTP_INVALID = "invalid"
+OTP_EXPIRED = "expired"
+OTP_MISSING = "missing"
+
+
+class OTPStore(ABC):
+    """
+    Expiring key -> one-time code store. A shared backend (e.g. Redis SET with EX, GETDEL)
+    implements these methods so codes issued by one worker process verify on another.
+    """
+
+    @abstractmethod
+    def put(self, key: str, code: str, ttl_seconds: float):
+        """Store `code` under `key` for `ttl_seconds`, replacing any earlier code."""
+
+    @abstractmethod
+    def verify(self, key: str, code: str) -> str:
+        """Compare `code` in constant time; a valid code is consumed. Returns one of the OTP_* outcomes."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Drop the code stored under `key`, if any."""
+
+
+class InMemoryOTPStore(OTPStore):
+    """
+    Per-process OTP store: a dict for O(1) lookups plus a min-heap of expiry times, popped as
+    codes are issued, so expired codes are dropped without any periodic scan. Codes only
+    verify on the worker process that issued them: run a single worker or use a shared backend.
+    """
+
+    def __init__(self, max_entries: int = OTP_STORE_MAX_ENTRIES, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._codes = {}   # key -> (code, expires_at)
+        self._expiry = []  # (expires_at, key); stale once the key is reissued or consumed
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float):
+        while self._expiry and (self._expiry[0][0] <= now or len(self._codes) > self.max_entries):
+            expires_at, key = heapq.heappop(self._expiry)
+            entry = self._codes.get(key)
+            if entry is not None and entry[1] == expires_at:
+                del self._codes[key]
+
+    def put(self, key: str, code: str, ttl_seconds: float):
+        with self._lock:
+            now = self._clock()
+            expires_at = now + ttl_seconds
+            self._codes[key] = (code, expires_at)
+            heapq.heappush(self._expiry, (expires_at, key))
+            self._purge(now)
+
+    def verify(self, key: str, code: str) -> str:
+        with self._lock:
+            entry = self._codes.get(key)
+            if entry is None:
+                return OTP_MISSING
+            stored, expires_at = entry
+            if expires_at <= self._clock():
+                del self._codes[key]
+                return OTP_EXPIRED
+            if not hmac.compare_digest(stored.encode(), code.encode()):
+                return OTP_INVALID
+            del self._codes[key]
+            return OTP_VALID
+
+    def delete(self, key: str):
+        with self._lock:
+            self._codes.pop(key, None)
+
+    def __len__(self):
+        return len(self._codes)
+
+
+otp_store = InMemoryOTPStore()
+
+
+def verification_key(email: str) -> str:
+    return f"verify:{email}"
+
+
+def login_key(email: str) -> str:
+    return f"login:{email}"
@@ -0,0 +1,241 @@
+"""
+On-demand request profiling.
+
+A sampling profiler: while a request is profiled, a background thread snapshots the stacks
+of the worker's threads every PROFILE_INTERVAL_MS. Sampling covers the threadpool threads that
+run the sync routes, which a per-thread deterministic profiler (cProfile) would miss. Only
+stacks inside the app or its web/DB/serialization libraries are kept; work running concurrently
+in the same process (other requests, scheduler jobs) can still show up, so profile on a quiet
+worker when precision matters.
+
+Each profile is saved under PROFILE_DIR as collapsed stacks (`<id>.folded`, the input format of
+flamegraph.pl and speedscope) plus a JSON summary (`<id>.json`) of the top frames and the
+DB / Python / serialization split, also served at /internal/profiles/{id}.
+"""
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+from starlette.concurrency import run_in_threadpool
+from src.core.config import PROFILE_SECRET, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS, PROFILE_DIR, PROFILE_KEEP
+from src.core.logger import logger
+from src.db.query_stats import current_query_stats
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STDLIB = sysconfig.get_paths()["stdlib"]
+PROFILE_ID = re.compile(r"^[0-9a-f]{12}$")
+MAX_STACK_DEPTH = 64
+# Stacks touching none of these are idle threads (or unrelated ones) and are not sampled
+_RELEVANT = ("/fastapi/", "/starlette/", "/pydantic", "/sqlalchemy/")
+_SERIALIZATION = ("fastapi/encoders.py", "pydantic", "serialize_response")
+_DATABASE = ("sqlalchemy/", "pymysql/", "aiomysql/")
+# Threads parked in these (e.g. a caller blocked on a future) are waiting, not working
+_WAITING = ("/threading.py", "/queue.py", "/concurrent/futures/")
+
+
+def sign_profile_request(path: str, ttl_seconds: int = 300, secret: str = PROFILE_SECRET) -> str:
+    """X-Profile header value that profiles requests to `path` for the next `ttl_seconds`."""
+    expires = int(time.time()) + ttl_seconds
+    signature = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires}:{signature}"
+
+
+def verify_profile_header(value: str, path: str, secret: str = PROFILE_SECRET) -> bool:
+    if not secret or not value:
+        return False
+    expires, _, signature = value.partition(":")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    elif "site-packages/" in filename:
+        filename = filename.split("site-packages/", 1)[1]
+    elif filename.startswith(STDLIB):
+        filename = os.path.relpath(filename, STDLIB)
+    return f"{filename}:{getattr(code, 'co_qualname', code.co_name)}"  # co_qualname is 3.11+
+
+
+class StackSampler:
+    """Collects the stacks of all other threads on a fixed interval until stopped."""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()  # tuple of frame labels, outermost first -> samples
+        self.ticks = Counter()   # "db" / "serialization" / "python" / "waiting" -> ticks
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            kinds = set()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                codes = []
+                while frame is not None and len(codes) < MAX_STACK_DEPTH:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                if not codes or any(marker in codes[0].co_filename for marker in _WAITING):
+                    continue
+                if not any(code.co_filename.startswith(PROJECT_ROOT)
+                           or any(marker in code.co_filename for marker in _RELEVANT) for code in codes):
+                    continue
+
+                stack = tuple(_frame_label(code) for code in reversed(codes))
+                self.stacks[stack] += 1
+                if any(marker in label for label in stack for marker in _SERIALIZATION):
+                    kinds.add("serialization")
+                elif any(marker in label for label in stack for marker in _DATABASE):
+                    kinds.add("db")
+                else:
+                    kinds.add("python")
+            # One tick is attributed to a single kind, in this order of precedence
+            for kind in ("serialization", "db", "python"):
+                if kind in kinds:
+                    self.ticks[kind] += 1
+                    break
+            else:
+                self.ticks["waiting"] += 1
+
+
+def summarize(sampler: StackSampler, wall_ms: float, db_ms: float, top: int = 15) -> dict:
+    """Top frames by own and cumulative samples, and the wall time split by what was running."""
+    own, cumulative = Counter(), Counter()
+    for stack, count in sampler.stacks.items():
+        own[stack[-1]] += count
+        for label in set(stack):
+            cumulative[label] += count
+
+    total_ticks = sum(sampler.ticks.values())
+    per_tick = wall_ms / total_ticks if total_ticks else 0.0
+    return {
+        "wall_ms": round(wall_ms, 3),
+        "db_ms": round(db_ms, 3),  # measured by the query counter, not sampled
+        "sampled_ms": {kind: round(ticks * per_tick, 3) for kind, ticks in sampler.ticks.items()},
+        "samples": sum(sampler.stacks.values()),
+        "top_own": own.most_common(top),
+        "top_cumulative": cumulative.most_common(top)
+    }
+
+
+def _save(profile_id: str, sampler: StackSampler, summary: dict):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w") as folded:
+        for stack, count in sampler.stacks.most_common():
+            folded.write(f"{';'.join(stack)} {count}\n")
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as summary_file:
+        json.dump(summary, summary_file)
+
+    # Keep only the newest PROFILE_KEEP profiles
+    summaries = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in summaries[:-PROFILE_KEEP]:
+        for suffix in (".json", ".folded"):
+            try:
+                os.remove(entry.path[:-len(".json")] + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def load_profile(profile_id: str) -> dict | None:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(PROFILE_DIR, f"{profile_id}.json")) as summary_file:
+            return json.load(summary_file)
+    except FileNotFoundError:
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests carrying a valid signed X-Profile header, and a PROFILE_SAMPLE_RATE share
+    of all requests. Profiled responses get a Server-Timing header (total, db, python,
+    serialization) and X-Profile-Id. One profiled request at a time per worker; others run normally.
+    Installed inside the access middleware so the request's query counter is available.
+    """
+
+    def __init__(self, app, secret: str = PROFILE_SECRET, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self._busy = threading.Lock()
+
+    def _wanted(self, scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if self.secret:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    return verify_profile_header(value.decode("latin-1"), scope["path"], self.secret)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        sampler = StackSampler()
+        start = time.perf_counter()
+        summary = None
+
+        def finish() -> dict:
+            nonlocal summary
+            if summary is None:
+                sampler.stop()
+                queries = current_query_stats.get()
+                summary = summarize(sampler, (time.perf_counter() - start) * 1000, queries.total_ms if queries else 0.0)
+                summary.update(id=profile_id, method=scope["method"], path=scope["path"])
+            return summary
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # The body is serialized by now; streaming bodies are profiled up to their first chunk
+                timing = finish()
+                metrics = [f"total;dur={timing['wall_ms']}", f"db;dur={timing['db_ms']}"]
+                metrics += [f"{kind};dur={ms}" for kind, ms in timing["sampled_ms"].items() if kind != "db"]
+                message = {**message, "headers": [
+                    *message.get("headers", ()),
+                    (b"server-timing", ", ".join(metrics).encode()),
+                    (b"x-profile-id", profile_id.encode())
+                ]}
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            try:
+                timing = finish()
+                await run_in_threadpool(_save, profile_id, sampler, timing)
+                logger.info(f"[PROFILE] {profile_id} {scope['method']} {scope['path']}: {timing['wall_ms']}ms "
+                            f"(db {timing['db_ms']}ms, sampled {timing['sampled_ms']})")
+            except Exception as e:
+                logger.error(f"[PROFILE ERROR] {profile_id}: {e}")
+            finally:
+                self._busy.release()
@@ -0,0 +1,112 @@
+import asyncio
+import itertools
+import threading
+from src.core.config import SLOT_STREAM_QUEUE_SIZE, SLOT_STREAM_MAX_SUBSCRIBERS
+
+
+class Subscription:
+    """
+    One subscriber's bounded event queue, owned by the event loop it was created on.
+    When the subscriber falls behind, its backlog is replaced by a single "refresh"
+    event so a slow client costs bounded memory and simply re-fetches the listing.
+    """
+
+    def __init__(self, shop_id: int, date: str, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.shop_id = shop_id
+        self.date = date
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, event: dict):
+        """Runs on the subscriber's loop."""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": "refresh", "shop_id": self.shop_id, "date": self.date}
+        self.queue.put_nowait(event)
+
+
+class SlotEventHub:
+    """
+    In-process pub/sub of slot changes per (shop_id, date).
+
+    Subscribers are plain asyncio queues, so thousands of idle streams cost no threads.
+    `publish` is safe to call from any thread (request threadpool, scheduler jobs) and hands
+    events to each subscriber's loop with call_soon_threadsafe. Events only reach clients
+    connected to the same worker process.
+    """
+
+    def __init__(self, queue_size: int = SLOT_STREAM_QUEUE_SIZE, max_subscribers: int = SLOT_STREAM_MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = {}  # shop_id -> {date: set of Subscription}
+        self._count = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, shop_id: int, date: str) -> Subscription:
+        """Must be called from the event loop that will consume the subscription."""
+        subscription = Subscription(shop_id, date, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise OverflowError("Too many slot subscribers")
+            self._subscribers.setdefault(shop_id, {}).setdefault(date, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            by_date = self._subscribers.get(subscription.shop_id, {})
+            subscribers = by_date.get(subscription.date)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            self._count -= 1
+            if not subscribers:
+                del by_date[subscription.date]
+            if not by_date:
+                del self._subscribers[subscription.shop_id]
+
+    def has_subscribers(self, shop_id: int, date: str = None) -> bool:
+        with self._lock:
+            by_date = self._subscribers.get(shop_id)
+            return bool(by_date) and (date is None or date in by_date)
+
+    def publish(self, shop_id: int, date: str = None, changes=None):
+        """
+        Send `changes` (list of slot dicts) to the subscribers of (shop_id, date).
+        Without changes, or with date None (every date of the shop), subscribers get a
+        "refresh" event telling them to re-fetch the listing.
+        """
+        with self._lock:
+            by_date = self._subscribers.get(shop_id)
+            if not by_date:
+                return
+            if date is None:
+                targets = [(subscription, subscription.date) for subs in by_date.values() for subscription in subs]
+            else:
+                targets = [(subscription, date) for subscription in by_date.get(date, ())]
+
+        for subscription, target_date in targets:
+            event = {"id": next(self._ids), "shop_id": shop_id, "date": target_date}
+            if changes is None:
+                event["type"] = "refresh"
+            else:
+                event["type"] = "slots"
+                event["changes"] = changes
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop is closed; its stream is gone
+                self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": self._count,
+                "max_subscribers": self.max_subscribers,
+                "shops": len(self._subscribers)
+            }
+
+
+slot_event_hub = SlotEventHub()
@@ -1,15 +1,116 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from fastapi import HTTPException
 from jose import jwt
 from passlib.context import CryptContext
-from src.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from src.core.config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# deprecated="auto" + bcrypt__rounds: hashes made with another cost report needs_update
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
-def hash_password(password: str) -> str:
+
+# Run in the worker processes: module-level so they can be pickled
+def _hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def _verify_and_update(plain: str, hashed: str):
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+class PasswordHasher:
+    """
+    bcrypt off the request threads: calls run in a process pool, so a login burst uses
+    separate cores instead of holding the GIL and the threadpool that serves everything else.
+    At most `max_pending` calls may be queued or running; beyond that callers get a 503 right
+    away rather than waiting behind the burst.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _executor_or_none(self):
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: forking a process that runs threads (logging, scheduler) can deadlock the child
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many password checks in progress, try again shortly",
+                    headers={"Retry-After": "1"}
+                )
+            self.pending += 1
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+
+    def run(self, func, *args):
+        """Blocking call, for the sync services (already on a threadpool thread)."""
+        self._acquire()
+        try:
+            executor = self._executor_or_none()
+            return func(*args) if executor is None else executor.submit(func, *args).result()
+        finally:
+            self._release()
+
+    async def run_async(self, func, *args):
+        """Awaitable call for the async stack; no threadpool thread is held while waiting."""
+        self._acquire()
+        try:
+            executor = self._executor_or_none()
+            if executor is None:
+                return func(*args)
+            return await asyncio.wrap_future(executor.submit(func, *args))
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "pending": self.pending, "max_pending": self.max_pending, "rejected": self.rejected}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password: str) -> str:
+    return password_hasher.run(_hash, password)
+
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return verify_and_update_password(plain, hashed)[0]
+
+def verify_and_update_password(plain: str, hashed: str):
+    """(valid, new_hash): new_hash is set when `hashed` used outdated parameters and should be stored."""
+    return password_hasher.run(_verify_and_update, plain, hashed)
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.run_async(_hash, password)
+
+async def verify_and_update_password_async(plain: str, hashed: str):
+    return await password_hasher.run_async(_verify_and_update, plain, hashed)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from src.core.config import SLOT_CACHE_MAX_ENTRIES, SLOT_CACHE_TTL_SECONDS, REPLICA_LAG_GRACE_SECONDS
+
+
+class SlotCache:
+    """
+    Size-bounded LRU cache of serialized slot lists, keyed by (shop_id, date, variant).
+
+    Entries are dropped precisely through `invalidate` when a booking, hold, generation
+    run or barber change touches a shop/date. Every entry also carries an expiry
+    (at most `ttl_seconds`) as a safety net for writes made by other worker processes.
+
+    A fill whose read started before the shop's last invalidation (plus `fill_grace_seconds`
+    of replica lag) is dropped, so a slow or lagging read never re-caches pre-write data.
+    """
+
+    def __init__(self, max_entries: int = SLOT_CACHE_MAX_ENTRIES, ttl_seconds: int = SLOT_CACHE_TTL_SECONDS,
+                 clock=time.monotonic, fill_grace_seconds: float = REPLICA_LAG_GRACE_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.fill_grace_seconds = fill_grace_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # (shop_id, date, variant) -> (expires_at, value)
+        self._keys_by_shop = {}        # shop_id -> set of keys, for shop-wide invalidation
+        self._invalidated_at = {}      # shop_id -> clock() of its last invalidation
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_fills = 0
+
+    def get(self, shop_id: int, date: str, variant=None):
+        key = (shop_id, date, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def now(self) -> float:
+        """Clock reading to pass as `read_started` to `put`."""
+        return self._clock()
+
+    def put(self, shop_id: int, date: str, value, variant=None, ttl_seconds: float = None, read_started: float = None):
+        key = (shop_id, date, variant)
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        with self._lock:
+            invalidated_at = self._invalidated_at.get(shop_id)
+            if read_started is not None and invalidated_at is not None \
+                    and read_started < invalidated_at + self.fill_grace_seconds:
+                self.stale_fills += 1
+                return
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            self._keys_by_shop.setdefault(shop_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, shop_id: int, dates=None):
+        """Drop the cached lists of `shop_id` for the given dates, or for every date when dates is None."""
+        dates = None if dates is None else {str(d) for d in dates}
+        with self._lock:
+            self._invalidated_at[shop_id] = self._clock()
+            for key in list(self._keys_by_shop.get(shop_id, ())):
+                if dates is None or key[1] in dates:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_shop.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_fills": self.stale_fills
+            }
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        shop_keys = self._keys_by_shop.get(key[0])
+        if shop_keys is not None:
+            shop_keys.discard(key)
+            if not shop_keys:
+                del self._keys_by_shop[key[0]]
+
+
+slot_cache = SlotCache()
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from src.core.config import SLOT_ENGINE
+from src.core.slot_cache import slot_cache
+from src.core.versioning import version_stamps
+from src.core.pubsub import slot_event_hub
+
+
+def slot_change(slot_id: int, barber_id: int, slot_date, slot_time, status: str) -> dict:
+    """One slot status delta as pushed to slot stream subscribers."""
+    return {
+        "slot_id": slot_id,
+        "barber_id": barber_id,
+        "slot_date": str(slot_date),
+        "slot_time": str(slot_time),
+        "status": status
+    }
+
+
+def publish_slot_change(shop_id: int, dates=None, changes=None):
+    """
+    Single entry point for every write that changes what a shop's slot listing shows.
+    `dates` is an iterable of dates (or ISO strings); None means every date of the shop.
+    `changes` optionally lists the affected slots (see `slot_change`) so stream
+    subscribers get the deltas; without it they are told to refresh.
+    """
+    slot_cache.invalidate(shop_id, dates)
+    if dates is None:
+        version_stamps.bump(("shop_slots", shop_id))
+        slot_event_hub.publish(shop_id)
+        return
+
+    dates = {str(d) for d in dates}
+    version_stamps.bump(*[("slots", shop_id, d) for d in dates])
+
+    by_date = None
+    if changes is not None:
+        by_date = {}
+        for change in changes:
+            by_date.setdefault(change["slot_date"], []).append(change)
+    for d in dates:
+        slot_event_hub.publish(shop_id, d, None if by_date is None else by_date.get(d, []))
+
+
+def publish_barber_change(shop_id: int):
+    """A barber of the shop was added, edited or removed: barber list and every slot listing change."""
+    version_stamps.bump(("barbers", shop_id))
+    publish_slot_change(shop_id)
+
+
+def publish_shop_change():
+    """The shop list changed (a shop was created or edited)."""
+    version_stamps.bump(("shops",))
+
+
+def slot_listing_scopes(shop_id: int, date: str):
+    return ("shop_slots", shop_id), ("slots", shop_id, date)
+
+
+def slot_listing_variant(date: str, *parts) -> str | None:
+    """ETag variant of a slot listing: the representation (`parts`) plus the clock, see `_clock_variant`."""
+    return _variant([*parts, _clock_variant(date, date)])
+
+
+def calendar_variant(start_date, end_date) -> str | None:
+    return _variant([_clock_variant(start_date, end_date)])
+
+
+def _clock_variant(start_date, end_date) -> str | None:
+    """
+    Virtual-engine listings drop today's slots as their start time passes, with no write to
+    bump a stamp. For ranges that include today the current minute is part of the variant.
+    """
+    if SLOT_ENGINE != "virtual":
+        return None
+    now = datetime.now()
+    if str(start_date) <= now.date().isoformat() <= str(end_date):
+        return now.strftime("%H%M")
+    return None
+
+
+def _variant(parts) -> str | None:
+    return "-".join(str(part) for part in parts if part is not None) or None
+
+
+def calendar_scopes(shop_id: int, start_date, end_date):
+    scopes = [("shop_slots", shop_id)]
+    day = start_date
+    while day <= end_date:
+        scopes.append(("slots", shop_id, str(day)))
+        day += timedelta(days=1)
+    return scopes
@@ -0,0 +1,133 @@
+import hashlib
+import itertools
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from fastapi import Request, Response
+from src.core.config import VERSION_STAMPS_MAX_ENTRIES, VERSION_STAMPS_MAX_AGE_SECONDS, REPLICA_LAG_GRACE_SECONDS
+
+
+class VersionStamps:
+    """
+    Cheap per-scope version counters, bumped on write and read by GET endpoints to build
+    ETag/Last-Modified headers without touching the database.
+
+    Scopes are tuples such as ("shops",), ("barbers", shop_id) or ("slots", shop_id, date).
+    Versions come from one process-wide monotonic counter, and scopes dropped by the LRU
+    bound fall back to a floor that is at least their last version, so a stamp never
+    repeats for different content written through this process.
+
+    The counters are per process, so a 304 is only exact with a single worker. A write
+    handled by another worker process never bumps this process's stamps, and this process
+    would keep answering 304 for the old content. The ETag therefore also carries the current
+    `max_age_seconds` window, which bounds that staleness like the slot cache TTL does for
+    cached listings. It also carries a per-process boot id, so ETags from other processes
+    (or from before a restart) never match here.
+    """
+
+    def __init__(self, max_entries: int = VERSION_STAMPS_MAX_ENTRIES,
+                 max_age_seconds: int = VERSION_STAMPS_MAX_AGE_SECONDS, clock=time.time):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._boot_id = f"{time.time_ns():x}"
+        self._counter = itertools.count(1)
+        self._versions = OrderedDict()  # scope -> (version, modified_at)
+        self._floor = (0, datetime.now(timezone.utc))
+        self._lock = threading.Lock()
+
+    def bump(self, *scopes):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = (next(self._counter), now)
+                self._versions.move_to_end(scope)
+            while len(self._versions) > self.max_entries:
+                _, evicted = self._versions.popitem(last=False)
+                self._floor = max(self._floor, evicted)
+
+    def stamp(self, *scopes):
+        """Return (etag, last_modified) covering all given scopes."""
+        with self._lock:
+            entries = [self._versions.get(scope, self._floor) for scope in scopes]
+        window = int(self._clock() // self.max_age_seconds) if self.max_age_seconds else 0
+        etag = f'W/"{self._boot_id}.{window}-' + "-".join(str(version) for version, _ in entries) + '"'
+        last_modified = max(modified_at for _, modified_at in entries)
+        return etag, last_modified
+
+
+version_stamps = VersionStamps()
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Keyset cursors as they appear in an ETag: "...-<variant>.next-<cursor>"
+_CURSOR_IN_ETAG = re.compile(r"\.next-([\w:-]+)")
+
+
+def conditional_get(request: Request, response: Response, *scopes, variant: str = None, paged: bool = False):
+    """
+    Put ETag/Last-Modified for `scopes` on `response`. Returns a bare 304 response when
+    the client's If-None-Match already matches, so the caller can skip its query entirely.
+    `variant` distinguishes different representations of the same data.
+
+    With `paged`, the page's next cursor is part of the validator: `set_next_cursor` appends
+    it to the ETag once the page is read. An If-None-Match naming the current stamp plus a
+    cursor gets a 304 that repeats the cursor in X-Next-Cursor; the scopes did not change, so
+    neither did the page's end. Every page can be revalidated, not only the last one.
+
+    Within REPLICA_LAG_GRACE_SECONDS of a change the body may still come from a lagging
+    replica, so no validators are handed out: a stale body must not be cached under the new ETag.
+    """
+    etag, last_modified = version_stamps.stamp(*scopes)
+    if variant:
+        etag = f'{etag[:-1]}-{variant}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "no-cache"
+    }
+    if REPLICA_LAG_GRACE_SECONDS and datetime.now(timezone.utc) - last_modified < timedelta(seconds=REPLICA_LAG_GRACE_SECONDS):
+        headers = {"Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        if "*" in candidates or etag in candidates or etag[2:] in candidates:
+            return Response(status_code=304, headers=headers)
+        if paged:
+            for tag in candidates:
+                cursor = _page_cursor(tag, etag)
+                if cursor is not None:
+                    if "ETag" in headers:
+                        headers["ETag"] = f'{etag[:-1]}.next-{cursor}"'
+                    headers[NEXT_CURSOR_HEADER] = cursor
+                    return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+def _page_cursor(tag: str, etag: str):
+    """The cursor of an If-None-Match tag that is `etag` plus ".next-<cursor>", else None."""
+    opaque = tag[2:] if tag.startswith("W/") else tag
+    prefix = etag[2:-1]  # `etag` without W/ and its closing quote
+    if not (opaque.startswith(prefix) and opaque.endswith('"')):
+        return None
+    match = _CURSOR_IN_ETAG.fullmatch(opaque[len(prefix):-1])
+    return match.group(1) if match else None
+
+
+def set_next_cursor(response: Response, next_cursor):
+    """Send a page's next cursor in X-Next-Cursor and in the ETag from `conditional_get(..., paged=True)`."""
+    response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+    etag = response.headers.get("ETag")
+    if etag:
+        response.headers["ETag"] = f'{etag[:-1]}.next-{next_cursor}"'
+
+
+def query_variant(*values) -> str:
+    """Short digest of query parameters for `variant`; raw values may hold characters an ETag cannot."""
+    return hashlib.sha256(repr(values).encode()).hexdigest()[:16]
+
@@ -0,0 +1,59 @@
+from contextlib import asynccontextmanager
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.core.config import ASYNC_DATABASE_URL, ASYNC_DATABASE_REPLICA_URL
+from src.core.logger import logger
+from src.db.pool import PoolMetrics, instrument_engine, pool_options
+from src.db.routing import READ_METHODS, client_key, read_your_writes
+
+async_pool_metrics = PoolMetrics("async")
+
+try:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **pool_options(AsyncAdaptedQueuePool, async_pool_metrics)
+    )
+    instrument_engine(async_engine.sync_engine, async_pool_metrics)
+    logger.info("Async database engine created successfully")
+
+    async_replica_engine = async_engine
+    if ASYNC_DATABASE_REPLICA_URL:
+        async_replica_pool_metrics = PoolMetrics("async_replica")
+        async_replica_engine = create_async_engine(
+            ASYNC_DATABASE_REPLICA_URL, **pool_options(AsyncAdaptedQueuePool, async_replica_pool_metrics)
+        )
+        instrument_engine(async_replica_engine.sync_engine, async_replica_pool_metrics)
+except Exception as e:
+    logger.error(f"Failed to create async database engine: {e}")
+    raise
+
+# expire_on_commit=False: attributes stay readable after commit without an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+AsyncReplicaSessionLocal = async_sessionmaker(
+    async_replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+@asynccontextmanager
+async def _async_session(factory):
+    db = factory()
+    try:
+        yield db
+    except Exception as e:
+        logger.error(f"Error during async DB session: {e}")
+        raise
+    finally:
+        await db.close()
+
+
+async def get_async_db(request: Request):
+    if request.method not in READ_METHODS:
+        read_your_writes.mark(client_key(request))
+    async with _async_session(AsyncSessionLocal) as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    factory = AsyncSessionLocal if read_your_writes.is_sticky(client_key(request)) else AsyncReplicaSessionLocal
+    async with _async_session(factory) as db:
+        yield db
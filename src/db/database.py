@@ -1,21 +1,44 @@
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from src.core.config import DATABASE_URL
-from src.core.logger import logger
+from sqlalchemy.pool import QueuePool
+from src.core.config import DATABASE_URL, DATABASE_REPLICA_URL, DB_ECHO
+from src.core.logger import logger, enable_sql_logging
+from src.db.pool import PoolMetrics, instrument_engine, pool_options
+from src.db.routing import READ_METHODS, client_key, read_your_writes
+
+pool_metrics = PoolMetrics("primary")
+
+if DB_ECHO:
+    enable_sql_logging()
 
 try:
-    engine = create_engine(DATABASE_URL, echo=True)
+    engine = create_engine(DATABASE_URL, **pool_options(QueuePool, pool_metrics))
+    instrument_engine(engine, pool_metrics)
     logger.info("Database engine created successfully")
+
+    # GET routes read from the replica when one is configured, otherwise from the primary
+    replica_engine = engine
+    if DATABASE_REPLICA_URL:
+        replica_pool_metrics = PoolMetrics("replica")
+        replica_engine = create_engine(
+            DATABASE_REPLICA_URL, **pool_options(QueuePool, replica_pool_metrics)
+        )
+        instrument_engine(replica_engine, replica_pool_metrics)
+        logger.info("Replica database engine created successfully")
 except Exception as e:
     logger.error(f"Failed to create database engine: {e}")
     raise
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
 Base = declarative_base()
 
-def get_db():
-    logger.info("Creating new database session...")
-    db = SessionLocal()
+
+def _session(factory):
+    # Lifecycle lines are DEBUG: below the logger's level they are discarded before any formatting
+    logger.debug("Creating new database session...", extra={"category": "db.session"})
+    db = factory()
     try:
         yield db
     except Exception as e:
@@ -23,4 +46,19 @@ def get_db():
         raise
     finally:
         db.close()
-        logger.info("Database session closed")
+        logger.debug("Database session closed", extra={"category": "db.session"})
+
+
+def get_db(request: Request):
+    """Primary session. Write requests make the client read from the primary for a short while."""
+    if request.method not in READ_METHODS:
+        read_your_writes.mark(client_key(request))
+    yield from _session(SessionLocal)
+
+
+def get_read_db(request: Request):
+    """Replica session for read-only routes, or the primary right after this client wrote."""
+    if read_your_writes.is_sticky(client_key(request)):
+        yield from _session(SessionLocal)
+    else:
+        yield from _session(ReplicaSessionLocal)
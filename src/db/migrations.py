@@ -0,0 +1,169 @@
+from contextlib import contextmanager
+from sqlalchemy import bindparam, inspect, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+from src.db.database import engine
+from src.db.models import Barber, BarberSlot, Booking, Shop
+from src.core.logger import logger
+
+# Columns added to tables that already existed in deployed databases. `create_all` only
+# creates missing tables, so these are added with ALTER TABLE; each is nullable or has a
+# server default, so existing rows stay valid.
+ADDED_COLUMNS = (
+    Barber.__table__.c.slots_generated_until,
+    BarberSlot.__table__.c.city,
+    BarberSlot.__table__.c.version,
+    BarberSlot.__table__.c.held_by,
+    BarberSlot.__table__.c.held_until,
+    BarberSlot.__table__.c.duration_minutes,
+)
+
+# Indexes the models declare; the search/pagination ones came after their tables existed
+ADDED_INDEXES = tuple(Shop.__table__.indexes) + tuple(BarberSlot.__table__.indexes)
+
+SLOT_UNIQUE_COLUMNS = ("barber_id", "slot_date", "slot_time")
+
+
+@contextmanager
+def _migration_lock(connection):
+    """Workers starting together take turns; the others then find nothing left to do."""
+    if connection.dialect.name != "mysql":
+        yield
+        return
+    connection.execute(text("SELECT GET_LOCK('schema_migrations', 60)"))
+    try:
+        yield
+    finally:
+        connection.execute(text("SELECT RELEASE_LOCK('schema_migrations')"))
+
+
+def add_missing_columns(connection) -> list:
+    """ALTER TABLE ... ADD COLUMN for every ADDED_COLUMNS entry the table lacks. Returns their names."""
+    inspector = inspect(connection)
+    added = []
+    for column in ADDED_COLUMNS:
+        table = column.table.name
+        if column.name in {existing["name"] for existing in inspector.get_columns(table)}:
+            continue
+        spec = CreateColumn(column).compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {spec}"))
+        # SQLite (tests) cannot add a foreign key to an existing table
+        if connection.dialect.name == "mysql":
+            for foreign_key in column.foreign_keys:
+                target = foreign_key.column
+                on_delete = f" ON DELETE {foreign_key.ondelete}" if foreign_key.ondelete else ""
+                connection.execute(text(
+                    f"ALTER TABLE {table} ADD FOREIGN KEY ({column.name}) "
+                    f"REFERENCES {target.table.name} ({target.name}){on_delete}"
+                ))
+        added.append(f"{table}.{column.name}")
+    return added
+
+
+def merge_duplicate_slots(connection) -> int:
+    """
+    Collapse barber_slots rows that share (barber_id, slot_date, slot_time), so uq_barber_slot
+    can be added. Per group a booked row is kept if there is one, else the oldest; bookings of
+    the other rows are moved onto it rather than deleted with them. Returns the rows removed.
+    """
+    slots = BarberSlot.__table__
+    groups = (
+        select(slots.c.barber_id, slots.c.slot_date, slots.c.slot_time)
+        .group_by(slots.c.barber_id, slots.c.slot_date, slots.c.slot_time)
+        .having(text("COUNT(*) > 1"))
+        .subquery()
+    )
+    rows = connection.execute(
+        select(slots.c.slot_id, slots.c.barber_id, slots.c.slot_date, slots.c.slot_time, slots.c.is_booked)
+        .join(groups, (slots.c.barber_id == groups.c.barber_id)
+              & (slots.c.slot_date == groups.c.slot_date)
+              & (slots.c.slot_time == groups.c.slot_time))
+        .order_by(slots.c.slot_id)
+    ).all()
+
+    by_key = {}
+    for row in rows:
+        by_key.setdefault((row.barber_id, row.slot_date, row.slot_time), []).append(row)
+
+    moves = []
+    for group in by_key.values():
+        keep = next((row for row in group if row.is_booked), group[0])
+        moves += [{"keep": keep.slot_id, "drop": row.slot_id} for row in group if row.slot_id != keep.slot_id]
+    if not moves:
+        return 0
+
+    bookings = Booking.__table__
+    connection.execute(
+        bookings.update().where(bookings.c.slot_id == bindparam("drop")).values(slot_id=bindparam("keep")),
+        moves
+    )
+    dropped = [move["drop"] for move in moves]
+    connection.execute(slots.delete().where(slots.c.slot_id.in_(dropped)))
+    return len(dropped)
+
+
+def add_slot_unique_constraint(connection) -> bool:
+    """Create uq_barber_slot (as a unique index, which works on every dialect) once duplicates are merged."""
+    inspector = inspect(connection)
+    names = {constraint["name"] for constraint in inspector.get_unique_constraints(BarberSlot.__tablename__)}
+    names.update(index["name"] for index in inspector.get_indexes(BarberSlot.__tablename__))
+    if "uq_barber_slot" in names:
+        return False
+
+    merged = merge_duplicate_slots(connection)
+    if merged:
+        logger.warning(f"[MIGRATION] Merged {merged} duplicate slot row(s) before adding uq_barber_slot")
+    connection.execute(text(
+        f"CREATE UNIQUE INDEX uq_barber_slot ON {BarberSlot.__tablename__} ({', '.join(SLOT_UNIQUE_COLUMNS)})"
+    ))
+    return True
+
+
+def add_missing_indexes(connection) -> list:
+    inspector = inspect(connection)
+    added = []
+    for index in ADDED_INDEXES:
+        if index.name in {existing["name"] for existing in inspector.get_indexes(index.table.name)}:
+            continue
+        index.create(connection)
+        added.append(index.name)
+    return added
+
+
+def backfill_slot_cities(db) -> int:
+    """Copy the shop's city onto slots created before barber_slots.city existed."""
+    return db.query(BarberSlot).filter(BarberSlot.city == None).update(
+        {BarberSlot.city: select(Shop.city).where(Shop.shop_id == BarberSlot.shop_id).scalar_subquery()},
+        synchronize_session=False
+    )
+
+
+def run_startup_migrations(bind=engine):
+    """
+    Bring a database created by an older release up to the current models, right after
+    `create_all`: add columns, uq_barber_slot and indexes, then backfill data. Every step
+    checks the live schema first, so it is a few catalog reads once everything is applied.
+    A failure is logged and raised: the app must not serve requests against an old schema.
+    """
+    try:
+        with bind.connect() as connection, _migration_lock(connection):
+            with connection.begin():
+                columns = add_missing_columns(connection)
+            with connection.begin():
+                unique_added = add_slot_unique_constraint(connection)
+            with connection.begin():
+                indexes = add_missing_indexes(connection)
+            with Session(bind=connection) as db:
+                backfilled = backfill_slot_cities(db)
+                db.commit()
+
+        if columns or unique_added or indexes:
+            logger.info(
+                f"[MIGRATION] Added columns {columns or '-'}, indexes {indexes or '-'}"
+                f"{', uq_barber_slot' if unique_added else ''}"
+            )
+        if backfilled:
+            logger.info(f"[MIGRATION] Backfilled city on {backfilled} slot(s)")
+    except Exception as e:
+        logger.error(f"[MIGRATION ERROR] {str(e)}")
+        raise
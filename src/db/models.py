@@ -1,4 +1,4 @@
-from sqlalchemy import Column,UniqueConstraint, Integer, String, DateTime, Date, Time, Boolean, Text, ForeignKey, DECIMAL, Enum
+from sqlalchemy import Column,UniqueConstraint, Index, Integer, String, DateTime, Date, Time, Boolean, Text, ForeignKey, DECIMAL, Enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from src.db.database import Base
@@ -36,6 +36,14 @@ class Shop(Base):
     owner = relationship("User")
     barbers = relationship("Barber", back_populates="shop", cascade="all, delete")
 
+    # Keyset pagination (ORDER BY shop_id) under each supported filter combination
+    __table_args__ = (
+        Index("ix_shops_city_shop_id", "city", "shop_id"),
+        Index("ix_shops_state_shop_id", "state", "shop_id"),
+        Index("ix_shops_is_open_shop_id", "is_open", "shop_id"),
+        Index("ix_shops_city_state_is_open_shop_id", "city", "state", "is_open", "shop_id"),
+    )
+
 
 class Barber(Base):
     __tablename__ = "barbers"
@@ -47,6 +55,7 @@ class Barber(Base):
     end_time = Column(Time, nullable=False)
     is_available = Column(Boolean, default=True)
     generate_daily = Column(Boolean, default=False)
+    slots_generated_until = Column(Date, nullable=True)  # last date the slot agent materialized; NULL = regenerate
     created_at = Column(DateTime, default=datetime.utcnow)
     shop = relationship("Shop", back_populates="barbers")
     slots = relationship("BarberSlot", back_populates="barber", cascade="all, delete")
@@ -60,15 +69,26 @@ class BarberSlot(Base):
     slot_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     barber_id = Column(Integer, ForeignKey("barbers.barber_id", ondelete="CASCADE"), nullable=False)
     shop_id = Column(Integer, ForeignKey("shops.shop_id", ondelete="CASCADE"), nullable=False) 
+    city = Column(String(100), nullable=True)  # copy of shops.city, so city-wide search stays on one index
 
     slot_date = Column(Date, nullable=False)
     slot_time = Column(Time, nullable=False)
+    duration_minutes = Column(Integer, nullable=True)  # slot length; NULL on rows from before it was stored = SLOT_DURATION_MINUTES
     is_booked = Column(Boolean, default=False)
     status = Column(String(20), default="available")
+    version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on every claim (optimistic locking)
+    held_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    held_until = Column(DateTime, nullable=True)  # status "held" is only honoured until this time
     created_at = Column(DateTime, default=datetime.utcnow)
 
     barber = relationship("Barber", back_populates="slots")
 
+    __table_args__ = (
+        UniqueConstraint("barber_id", "slot_date", "slot_time", name="uq_barber_slot"),
+        # City-wide search: open slots of a city and day, already in slot_time order
+        Index("ix_barber_slots_city_date_status_time", "city", "slot_date", "status", "slot_time"),
+    )
+
 
 class Booking(Base):
     __tablename__ = "bookings"
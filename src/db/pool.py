@@ -0,0 +1,113 @@
+import threading
+import time
+from sqlalchemy import event, exc
+from src.core.config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING, DB_POOL_RECYCLE
+from src.core.logger import logger
+from src.core.metrics import Histogram
+
+# Connection lifetime buckets, in seconds
+LIFETIME_BUCKETS_S = (1, 10, 60, 300, 900, 1800, 3600, 7200, 14400)
+
+
+class PoolMetrics:
+    """Checkout latency, timeouts and connection lifetimes of one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkout_ms = Histogram()  # queue wait, plus connect time when a new connection is opened
+        self.lifetime_s = Histogram(LIFETIME_BUCKETS_S)
+        self.timeouts = 0
+        self.opened = 0
+        self.closed = 0
+        self._pool_getter = None
+        self._lock = threading.Lock()
+
+    def count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self) -> dict:
+        pool = self._pool_getter() if self._pool_getter else None
+        live = {}
+        if pool is not None and hasattr(pool, "checkedout"):
+            # QueuePool.overflow() starts at -pool_size: it counts connections opened beyond the pool
+            live = {
+                "size": pool.size(),
+                "open": pool.size() + pool.overflow(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0)
+            }
+        return {
+            "name": self.name,
+            **live,
+            "timeouts": self.timeouts,
+            "opened": self.opened,
+            "closed": self.closed,
+            "checkout_ms": self.checkout_ms.snapshot(),
+            "connection_lifetime_s": self.lifetime_s.snapshot()
+        }
+
+
+# Every instrumented engine, by name, for /internal/pool and the periodic log line
+pool_registry = {}
+
+
+def instrumented_pool_class(base, metrics: PoolMetrics):
+    """Subclass of the pool class `base` that times every checkout into `metrics`."""
+
+    class InstrumentedPool(base):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            except exc.TimeoutError:
+                metrics.count("timeouts")
+                raise
+            finally:
+                metrics.checkout_ms.observe((time.perf_counter() - start) * 1000)
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+def pool_options(base, metrics: PoolMetrics) -> dict:
+    """create_engine keyword arguments for a configured, instrumented pool."""
+    return {
+        "poolclass": instrumented_pool_class(base, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE
+    }
+
+
+def instrument_engine(engine, metrics: PoolMetrics):
+    """Track connection lifetimes of `engine` (a sync Engine) and register it."""
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        connection_record.info["opened_at"] = time.monotonic()
+        metrics.count("opened")
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_connection, connection_record):
+        opened_at = connection_record.info.pop("opened_at", None)
+        if opened_at is not None:
+            metrics.lifetime_s.observe(time.monotonic() - opened_at)
+        metrics.count("closed")
+
+    metrics._pool_getter = lambda: engine.pool
+    pool_registry[metrics.name] = metrics
+    return engine
+
+
+def log_pool_metrics():
+    for metrics in pool_registry.values():
+        stats = metrics.snapshot()
+        logger.info(
+            f"[DB POOL] {stats['name']}: checked_out={stats.get('checked_out')} overflow={stats.get('overflow')} "
+            f"size={stats.get('size')} timeouts={stats['timeouts']} "
+            f"checkout_p95={stats['checkout_ms']['p95']}ms checkout_max={stats['checkout_ms']['max']}ms"
+        )
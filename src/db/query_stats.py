@@ -0,0 +1,110 @@
+import functools
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.core.config import QUERY_DEBUG, QUERY_NPLUSONE_THRESHOLD
+from src.core.logger import logger
+
+# Expanded IN lists ("IN (%s, %s, %s)") collapse to one shape whatever their length
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:%s|\?|%\(\w+\)s)(?:\s*,\s*(?:%s|\?|%\(\w+\)s))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    """Statements, DB time and repeated statement shapes of one request or job."""
+
+    def __init__(self, label: str, parent: "QueryStats" = None):
+        self.label = label
+        self.parent = parent  # an enclosing unit (e.g. a test's query_budget around a request) also counts
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes = {}  # statement shape -> times executed
+
+    def record(self, statement: str, duration_ms: float):
+        self.count += 1
+        self.total_ms += duration_ms
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        if self.parent is not None:
+            self.parent.record(statement, duration_ms)
+
+    def repeated(self, threshold: int = QUERY_NPLUSONE_THRESHOLD) -> dict:
+        """Shapes executed at least `threshold` times: the signature of an N+1 loop."""
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+    def summary(self) -> str:
+        return f"{self.label}: {self.count} statements, {self.total_ms:.1f}ms"
+
+
+# Set by the access middleware for requests and by `tracked_job` for scheduler jobs. Sync
+# routes run in a threadpool copy of the context and the async stack's run_sync greenlets
+# inherit it, so every statement of the unit lands in the same QueryStats.
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_query_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.record(statement, (time.perf_counter() - started.pop()) * 1000)
+
+
+def report(stats: QueryStats):
+    """Log an N+1 warning for repeated shapes; with QUERY_DEBUG, also the unit's summary."""
+    repeated = stats.repeated()
+    if repeated:
+        worst, times = max(repeated.items(), key=lambda item: item[1])
+        logger.warning(f"[N+1] {stats.summary()}; {times}x {worst[:200]}")
+    elif QUERY_DEBUG:
+        logger.info(f"[DB QUERIES] {stats.summary()}")
+
+
+def debug_headers(stats: QueryStats) -> list:
+    """X-DB-* headers (ASGI form) for QUERY_DEBUG responses."""
+    headers = [
+        (b"x-db-queries", str(stats.count).encode()),
+        (b"x-db-time-ms", f"{stats.total_ms:.1f}".encode())
+    ]
+    repeated = stats.repeated()
+    if repeated:
+        headers.append((b"x-db-n-plus-one", str(max(repeated.values())).encode()))
+    return headers
+
+
+@contextmanager
+def track_queries(label: str):
+    stats = QueryStats(label, parent=current_query_stats.get())
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+
+def tracked_job(name: str, func):
+    """Wrap a scheduler job so its statements are counted and N+1 loops reported."""
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        with track_queries(f"job:{name}") as stats:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                report(stats)
+
+    return run
+
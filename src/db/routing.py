@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import OrderedDict
+from fastapi import Request
+from src.core.config import READ_YOUR_WRITES_SECONDS, READ_YOUR_WRITES_MAX_CLIENTS
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def client_key(request: Request) -> str:
+    """
+    Who "you" is for read-your-writes: the X-Client-Id header when the app sends one
+    (stable across networks), otherwise the client address.
+    """
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "unknown")
+
+
+class ReadYourWrites:
+    """
+    Remembers clients that recently sent a write, so their reads go to the primary until
+    the replica has caught up. Bounded: the least recently writing clients are forgotten first.
+    """
+
+    def __init__(self, window_seconds: float = READ_YOUR_WRITES_SECONDS,
+                 max_clients: int = READ_YOUR_WRITES_MAX_CLIENTS, clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.max_clients = max_clients
+        self._clock = clock
+        self._until = OrderedDict()  # client key -> sticky until
+        self._lock = threading.Lock()
+
+    def mark(self, key: str):
+        with self._lock:
+            self._until[key] = self._clock() + self.window_seconds
+            self._until.move_to_end(key)
+            while len(self._until) > self.max_clients:
+                self._until.popitem(last=False)
+
+    def is_sticky(self, key: str) -> bool:
+        with self._lock:
+            until = self._until.get(key)
+            if until is None:
+                return False
+            if until <= self._clock():
+                del self._until[key]
+                return False
+            return True
+
+
+read_your_writes = ReadYourWrites()
@@ -0,0 +1,242 @@
+# Async request stack: same paths and contracts as the sync routers, on AsyncSession.
+# Mounted by main.py when ASYNC_STACK_ENABLED (under ASYNC_STACK_PREFIX).
+from datetime import date as date_cls, time, timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal
+from src.db.async_database import get_async_db, get_async_read_db
+from src.core.idempotency import run_idempotent_async
+from src.core.versioning import conditional_get, query_variant, set_next_cursor
+from src.core.slot_events import slot_listing_scopes, slot_listing_variant, calendar_scopes, calendar_variant
+from src.core.config import SHOP_PAGE_SIZE, SHOP_PAGE_MAX_SIZE, SLOT_HORIZON_DAYS
+from src.schemas.user_schema import UserCreate, OTPRequest, OTPVerify, UserLogin, ShopResponse, SlotResponse, BookingRequest
+from src.schemas.shop_schemas import (
+    ShopCreate, HoldRequest, ReleaseHoldRequest, AvailabilityBitmap, CalendarDay, SlotSearchResult
+)
+from src.schemas.barber_schemas import BarberCreate
+from src.schemas.availability_schemas import BarberAvailabilityCreate
+from src.services.shop_service import ShopService
+from src.services.booking_service import SlotNotFoundError, SlotAlreadyBookedError, SlotConflictError
+from src.services.async_services import (
+    AsyncUserService, AsyncShopService, AsyncBarberService, AsyncAvailabilityService, AsyncBookingService
+)
+
+router = APIRouter()
+
+
+# ============================================
+# Users
+# ============================================
+@router.post("/users/register", tags=["Users"])
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncUserService.register_user(db, user.username, user.email, user.password, user.phone_number, user.role)
+
+@router.post("/users/send-verification-otp", tags=["Users"])
+async def send_verification_otp(request: OTPRequest, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncUserService.send_verification_otp(db, request.email)
+
+@router.post("/users/verify-email", tags=["Users"])
+async def verify_email(request: OTPVerify, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncUserService.verify_email(db, request.email, request.otp)
+
+@router.post("/users/login", tags=["Users"])
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncUserService.login_with_password(db, user.email, user.password, user.role)
+
+@router.get("/users/get_user", tags=["Users"])
+async def get_user(email: str, db: AsyncSession = Depends(get_async_read_db)):
+    return await AsyncUserService.get_user(db, email)
+
+@router.post("/users/otp-login", tags=["Users"])
+async def send_otp(request: OTPRequest, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncUserService.send_login_otp(db, request.email, request.role)
+
+@router.post("/users/verify-otp-login", tags=["Users"])
+async def verify_otp(request: OTPVerify, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncUserService.verify_login_otp(db, request.email, request.otp, request.role)
+
+
+# ============================================
+# Shops and slots
+# ============================================
+@router.get("/shops/", response_model=List[ShopResponse], tags=["Shops"])
+async def get_shops(
+    request: Request,
+    response: Response,
+    cursor: int | None = Query(None, ge=0, description="shop_id of the last shop on the previous page"),
+    limit: int = Query(SHOP_PAGE_SIZE, ge=1, le=SHOP_PAGE_MAX_SIZE),
+    city: str | None = None,
+    state: str | None = None,
+    is_open: bool | None = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    not_modified = conditional_get(
+        request, response, ("shops",), variant=query_variant(cursor, limit, city, state, is_open), paged=True
+    )
+    if not_modified:
+        return not_modified
+
+    shops, next_cursor = await AsyncShopService.get_shops_for_user(
+        db, user_id=None, city=city, state=state, is_open=is_open, cursor=cursor, limit=limit
+    )
+    if next_cursor is not None:
+        set_next_cursor(response, next_cursor)
+    return shops
+
+
+@router.get("/shops/{shop_id}/slots/", response_model=List[SlotResponse] | AvailabilityBitmap, tags=["Shops"])
+async def get_slots(
+    request: Request,
+    response: Response,
+    shop_id: int,
+    date: str = Query(..., description="Date in YYYY-MM-DD format"),
+    duration: int | None = Query(None, ge=5, le=480, description="Slot length in minutes (virtual slot engine only)"),
+    format: Literal["json", "bitmap"] = "json",
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    date = ShopService.normalize_date(date)
+    not_modified = conditional_get(
+        request, response, *slot_listing_scopes(shop_id, date), variant=slot_listing_variant(date, format, duration)
+    )
+    if not_modified:
+        return not_modified
+    if format == "bitmap":
+        return await AsyncShopService.get_availability_bitmap(db, shop_id, date, duration)
+    return await AsyncShopService.get_available_slots(db, shop_id, date, duration)
+
+
+@router.get("/shops/{shop_id}/calendar/", response_model=List[CalendarDay], tags=["Shops"])
+async def get_calendar(
+    request: Request,
+    response: Response,
+    shop_id: int,
+    start_date: date_cls = Query(..., description="First date, YYYY-MM-DD"),
+    end_date: date_cls | None = Query(None, description="Last date (inclusive), YYYY-MM-DD"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    end_date = end_date or start_date + timedelta(days=SLOT_HORIZON_DAYS - 1)
+    ShopService.check_calendar_range(start_date, end_date)
+    not_modified = conditional_get(
+        request, response, *calendar_scopes(shop_id, start_date, end_date),
+        variant=calendar_variant(start_date, end_date)
+    )
+    if not_modified:
+        return not_modified
+    return await AsyncShopService.get_calendar(db, shop_id, start_date, end_date)
+
+
+@router.get("/owner/{owner_id}", tags=["Shops"])
+async def get_shops_by_owner(owner_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    return await AsyncShopService.get_shops_by_owner(db, owner_id)
+
+
+@router.post("/shops/book-slots/", tags=["Shops"])
+async def shop_book_slots(
+    request: BookingRequest,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await run_idempotent_async(idempotency_key, request.user_id, request, lambda: AsyncShopService.book_slots(
+        db, request.user_id, request.barber_id, request.shop_id, request.slot_ids
+    ))
+
+
+@router.post("/shops/hold-slots/", tags=["Shops"])
+async def hold_slots(request: HoldRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await AsyncShopService.hold_slots(
+            db, request.user_id, request.barber_id, request.shop_id, request.slot_ids, request.hold_seconds
+        )
+    except SlotNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except SlotAlreadyBookedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except SlotConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.post("/shops/release-slots/", tags=["Shops"])
+async def release_slots(request: ReleaseHoldRequest, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncShopService.release_holds(db, request.user_id, request.shop_id, request.slot_ids)
+
+
+@router.post("/create", tags=["Shops"])
+async def create_shop(shop: ShopCreate, owner_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncShopService.create_shop_if_not_exists(db, owner_id, shop)
+
+
+@router.get("/search/slots/", response_model=List[SlotSearchResult], tags=["Search"])
+async def search_slots(
+    response: Response,
+    city: str,
+    date: str | None = Query(None, description="YYYY-MM-DD, defaults to today"),
+    start_time: time | None = None,
+    end_time: time | None = None,
+    cursor: str | None = None,
+    limit: int = Query(SHOP_PAGE_SIZE, ge=1, le=SHOP_PAGE_MAX_SIZE),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    slots, next_cursor = await AsyncShopService.search_available_slots(
+        db, city, date, start_time, end_time, cursor, limit
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return slots
+
+
+# ============================================
+# Barbers and availability
+# ============================================
+@router.post("/barbers/add/{shop_id}", tags=["Barbers"])
+async def add_barber(shop_id: int, barber: BarberCreate, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncBarberService.add_barber(db, shop_id, barber)
+
+@router.delete("/barbers/delete/{barber_id}", tags=["Barbers"])
+async def delete_barber(barber_id: int, owner_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncBarberService.delete_barber(db, barber_id, owner_id)
+
+@router.put("/barbers/update/{barber_id}", tags=["Barbers"])
+async def update_barber(barber_id: int, owner_id: int, barber_data: BarberCreate, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncBarberService.update_barber(db, barber_id, owner_id, barber_data)
+
+@router.get("/barbers/available/{shop_id}", tags=["Barbers"])
+async def get_available_barbers(request: Request, response: Response, shop_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    not_modified = conditional_get(request, response, ("barbers", shop_id))
+    if not_modified:
+        return not_modified
+    return await AsyncBarberService.get_available_barbers(db, shop_id)
+
+@router.post("/availability/add/{barber_id}", tags=["Availability"])
+async def add_availability(barber_id: int, data: BarberAvailabilityCreate, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncAvailabilityService.add_or_update_availability(db, barber_id, data)
+
+
+# ============================================
+# Bookings
+# ============================================
+@router.post("/book-slots/", tags=["Bookings"])
+async def book_slots(
+    request: BookingRequest,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    async def book():
+        try:
+            booked_slots = await AsyncBookingService.book_slots(
+                db, request.user_id, request.barber_id, request.shop_id, request.slot_ids
+            )
+        except (SlotConflictError, SlotAlreadyBookedError) as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception:
+            raise HTTPException(status_code=500, detail="Internal Server Error")
+        return {
+            "message": f"{len(booked_slots)} slots booked successfully",
+            "user_id": request.user_id,
+            "barber_id": request.barber_id,
+            "shop_id": request.shop_id,
+            "booked_slots": booked_slots
+        }
+
+    return await run_idempotent_async(idempotency_key, request.user_id, request, book)
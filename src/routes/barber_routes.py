@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
-from src.db.database import get_db
+from src.db.database import get_db, get_read_db
 from src.schemas.barber_schemas import BarberCreate
 from src.services.barber_service import BarberService
+from src.core.versioning import conditional_get
 
 router = APIRouter(prefix="/barbers", tags=["Barbers"])
 
@@ -32,7 +33,12 @@ def update_barber(
 
 @router.get("/available/{shop_id}")
 def get_available_barbers(
+    request: Request,
+    response: Response,
     shop_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
+    not_modified = conditional_get(request, response, ("barbers", shop_id))
+    if not_modified:
+        return not_modified
     return BarberService.get_available_barbers(db, shop_id)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from src.db.database import get_db
-from src.services.booking_service import BookingService
+from src.services.booking_service import BookingService, SlotAlreadyBookedError, SlotConflictError
+from src.core.idempotency import run_idempotent
 from typing import List
 
 router = APIRouter()
@@ -16,23 +17,32 @@ class BookingRequest(BaseModel):
 
 
 @router.post("/book-slots/")
-def book_slots(request: BookingRequest, db: Session = Depends(get_db)):
-    try:
-        booked_slots = BookingService.book_slots(
-            db=db,
-            user_id=request.user_id,
-            barber_id=request.barber_id,
-            shop_id=request.shop_id,
-            slot_ids=request.slot_ids
-        )
-        return {
-            "message": f"{len(booked_slots)} slots booked successfully",
-            "user_id": request.user_id,
-            "barber_id": request.barber_id,
-            "shop_id": request.shop_id,
-            "booked_slots": booked_slots
-        }
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+def book_slots(
+    request: BookingRequest,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db)
+):
+    def book():
+        try:
+            booked_slots = BookingService.book_slots(
+                db=db,
+                user_id=request.user_id,
+                barber_id=request.barber_id,
+                shop_id=request.shop_id,
+                slot_ids=request.slot_ids
+            )
+            return {
+                "message": f"{len(booked_slots)} slots booked successfully",
+                "user_id": request.user_id,
+                "barber_id": request.barber_id,
+                "shop_id": request.shop_id,
+                "booked_slots": booked_slots
+            }
+        except (SlotConflictError, SlotAlreadyBookedError) as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    return run_idempotent(idempotency_key, request.user_id, request, book)
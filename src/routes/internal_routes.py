@@ -0,0 +1,69 @@
+from fastapi import APIRouter, HTTPException
+from src.core.slot_cache import slot_cache
+from src.core.pubsub import slot_event_hub
+from src.db.pool import pool_registry
+from src.core.logger import logging_stats
+from src.core.profiling import load_profile
+from src.core.security import password_hasher
+from src.utils.email import mail_queue
+
+router = APIRouter(prefix="/internal", tags=["Internal"])
+
+
+@router.get("/cache/slots")
+def get_slot_cache_stats():
+    """
+    Hit/miss counters of the per-(shop, date) slot listing cache.
+    """
+    return slot_cache.stats()
+
+
+@router.get("/streams/slots")
+def get_slot_stream_stats():
+    """
+    Live slot stream subscribers of this worker.
+    """
+    return slot_event_hub.stats()
+
+
+@router.get("/pool")
+def get_pool_stats():
+    """
+    Live pool state and checkout/lifetime histograms of every database engine in this worker.
+    """
+    return {name: metrics.snapshot() for name, metrics in pool_registry.items()}
+
+
+@router.get("/logging")
+def get_logging_stats():
+    """
+    Log queue depth, records dropped on a full queue, and records sampled out or rate limited per category.
+    """
+    return logging_stats()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    """
+    Summary of a saved request profile (id from the X-Profile-Id response header).
+    """
+    profile = load_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@router.get("/password-hasher")
+def get_password_hasher_stats():
+    """
+    bcrypt pool workers, calls queued or running, and calls rejected because the pool was saturated.
+    """
+    return password_hasher.stats()
+
+
+@router.get("/mail")
+def get_mail_stats():
+    """
+    Outbound mail queue: queued/retrying messages, delivery counters and enqueue-to-sent latency.
+    """
+    return mail_queue.stats()
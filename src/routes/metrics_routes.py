@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from src.core.metrics import render_prometheus
+
+router = APIRouter(tags=["Internal"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """
+    Prometheus scrape endpoint: request counts and latency histograms per route template, for this worker.
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,30 @@
+from datetime import time
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session
+from typing import List
+from src.db.database import get_read_db
+from src.core.config import SHOP_PAGE_SIZE, SHOP_PAGE_MAX_SIZE
+from src.schemas.shop_schemas import SlotSearchResult
+from src.services.search_service import SlotSearchService
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+# Open slots across every shop of a city, earliest first; the next page's cursor is sent in X-Next-Cursor
+@router.get("/slots/", response_model=List[SlotSearchResult])
+def search_slots(
+    response: Response,
+    city: str,
+    date: str | None = Query(None, description="YYYY-MM-DD, defaults to today"),
+    start_time: time | None = None,
+    end_time: time | None = None,
+    cursor: str | None = None,
+    limit: int = Query(SHOP_PAGE_SIZE, ge=1, le=SHOP_PAGE_MAX_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    slots, next_cursor = SlotSearchService.search_available_slots(
+        db, city, date, start_time, end_time, cursor, limit
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return slots
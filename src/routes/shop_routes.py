@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, Query
+import asyncio
+import json
+from datetime import date as date_cls, timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal
 from pydantic import BaseModel
-from src.db.database import get_db
+from src.db.database import get_db, get_read_db
 from src.services.shop_service import ShopService
+from src.core.idempotency import run_idempotent
+from src.core.versioning import conditional_get, query_variant, set_next_cursor
+from src.core.slot_events import slot_listing_scopes, slot_listing_variant, calendar_scopes, calendar_variant
+from src.core.config import SHOP_PAGE_SIZE, SHOP_PAGE_MAX_SIZE, SLOT_HORIZON_DAYS, SLOT_STREAM_HEARTBEAT_SECONDS
+from src.core.pubsub import slot_event_hub
 from src.schemas.user_schema import ShopResponse,SlotResponse ,BookingRequest
-from src.schemas.shop_schemas import ShopCreate
+from src.schemas.shop_schemas import ShopCreate, HoldRequest, ReleaseHoldRequest, AvailabilityBitmap, CalendarDay
 from src.services.shop_service import ShopService
+from src.services.hold_service import SlotHoldService
+from src.services.booking_service import SlotNotFoundError, SlotAlreadyBookedError, SlotConflictError
 
 router = APIRouter(prefix="/shops", tags=["Shops"])
 
@@ -14,20 +26,116 @@ router = APIRouter()
 
 
 
-# Get all shops
+# Get all shops, one keyset page at a time; the next page's cursor is sent in X-Next-Cursor
 @router.get("/shops/", response_model=List[ShopResponse])
-def get_shops(db: Session = Depends(get_db)):
-    return ShopService.get_shops_for_user(db, user_id=None)
+def get_shops(
+    request: Request,
+    response: Response,
+    cursor: int | None = Query(None, ge=0, description="shop_id of the last shop on the previous page"),
+    limit: int = Query(SHOP_PAGE_SIZE, ge=1, le=SHOP_PAGE_MAX_SIZE),
+    city: str | None = None,
+    state: str | None = None,
+    is_open: bool | None = None,
+    db: Session = Depends(get_read_db)
+):
+    not_modified = conditional_get(
+        request, response, ("shops",), variant=query_variant(cursor, limit, city, state, is_open), paged=True
+    )
+    if not_modified:
+        return not_modified
+
+    shops, next_cursor = ShopService.get_shops_for_user(
+        db, user_id=None, city=city, state=state, is_open=is_open, cursor=cursor, limit=limit
+    )
+    if next_cursor is not None:
+        set_next_cursor(response, next_cursor)
+    return shops
+
+
+# Get available slots for a shop; format=bitmap returns per-barber masks instead of one object per slot
+@router.get("/shops/{shop_id}/slots/", response_model=List[SlotResponse] | AvailabilityBitmap)
+def get_slots(
+    request: Request,
+    response: Response,
+    shop_id: int,
+    date: str = Query(..., description="Date in YYYY-MM-DD format"),
+    duration: int | None = Query(None, ge=5, le=480, description="Slot length in minutes (virtual slot engine only)"),
+    format: Literal["json", "bitmap"] = "json",
+    db: Session = Depends(get_read_db)
+):
+    date = ShopService.normalize_date(date)
+    not_modified = conditional_get(
+        request, response, *slot_listing_scopes(shop_id, date), variant=slot_listing_variant(date, format, duration)
+    )
+    if not_modified:
+        return not_modified
+    if format == "bitmap":
+        return ShopService.get_availability_bitmap(db, shop_id, date, duration)
+    return ShopService.get_available_slots(db, shop_id, date, duration)
+
+
+# Live slot status changes for a shop and date as Server-Sent Events
+@router.get("/shops/{shop_id}/slots/stream")
+async def stream_slots(
+    shop_id: int,
+    date: str = Query(..., description="Date in YYYY-MM-DD format")
+):
+    """
+    Event types: "slots" carries a list of changed slots (slot_id, barber_id, slot_date,
+    slot_time, status); "refresh" means re-fetch GET /shops/{shop_id}/slots/.
+    Comment lines are sent as keep-alives while nothing changes.
+    """
+    date = ShopService.normalize_date(date)
+    try:
+        subscription = slot_event_hub.subscribe(shop_id, date)
+    except OverflowError:
+        raise HTTPException(status_code=503, detail="Too many live subscribers, fall back to polling")
+
+    async def events():
+        try:
+            yield f"retry: 3000\nevent: ready\ndata: {json.dumps({'shop_id': shop_id, 'date': date})}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), SLOT_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                event_id = f"id: {event['id']}\n" if "id" in event else ""
+                yield f"{event_id}event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            slot_event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(slot_event_hub.unsubscribe, subscription)  # if the stream never started
+    )
 
 
-# Get available slots for a shop
-@router.get("/shops/{shop_id}/slots/", response_model=List[SlotResponse])
-def get_slots(shop_id: int, date: str = Query(..., description="Date in YYYY-MM-DD format"), db: Session = Depends(get_db)):
-    return ShopService.get_available_slots(db, shop_id, date)
+# Per-day, per-barber slot counts for a date range (defaults to the booking horizon)
+@router.get("/shops/{shop_id}/calendar/", response_model=List[CalendarDay])
+def get_calendar(
+    request: Request,
+    response: Response,
+    shop_id: int,
+    start_date: date_cls = Query(..., description="First date, YYYY-MM-DD"),
+    end_date: date_cls | None = Query(None, description="Last date (inclusive), YYYY-MM-DD"),
+    db: Session = Depends(get_read_db)
+):
+    end_date = end_date or start_date + timedelta(days=SLOT_HORIZON_DAYS - 1)
+    ShopService.check_calendar_range(start_date, end_date)
+    not_modified = conditional_get(
+        request, response, *calendar_scopes(shop_id, start_date, end_date),
+        variant=calendar_variant(start_date, end_date)
+    )
+    if not_modified:
+        return not_modified
+    return ShopService.get_calendar(db, shop_id, start_date, end_date)
 
 
 @router.get("/owner/{owner_id}")
-def get_shops_by_owner(owner_id: int, db: Session = Depends(get_db)):
+def get_shops_by_owner(owner_id: int, db: Session = Depends(get_read_db)):
     """
     Get all shops belonging to a specific owner.
     """
@@ -35,13 +143,37 @@ def get_shops_by_owner(owner_id: int, db: Session = Depends(get_db)):
 
 # Book slots
 @router.post("/shops/book-slots/")
-def book_slots(request: BookingRequest, db: Session = Depends(get_db)):
-    return ShopService.book_slots(
+def book_slots(
+    request: BookingRequest,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db)
+):
+    return run_idempotent(idempotency_key, request.user_id, request, lambda: ShopService.book_slots(
         db, user_id=request.user_id, barber_id=request.barber_id,
         shop_id=request.shop_id, slot_ids=request.slot_ids
-    )
+    ))
+
+
+
+# Hold slots for a customer during checkout
+@router.post("/shops/hold-slots/")
+def hold_slots(request: HoldRequest, db: Session = Depends(get_db)):
+    try:
+        return SlotHoldService.hold_slots(
+            db, user_id=request.user_id, barber_id=request.barber_id,
+            shop_id=request.shop_id, slot_ids=request.slot_ids, hold_seconds=request.hold_seconds
+        )
+    except SlotNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except SlotAlreadyBookedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except SlotConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 
+@router.post("/shops/release-slots/")
+def release_slots(request: ReleaseHoldRequest, db: Session = Depends(get_db)):
+    return SlotHoldService.release_holds(db, request.user_id, request.shop_id, request.slot_ids)
 
 
 @router.post("/create")
@@ -1,23 +1,107 @@
+import threading
 from datetime import datetime, timedelta
+from sqlalchemy import and_, insert, not_, or_
 from src.db.database import SessionLocal
 from src.db.models import Barber, BarberSlot, Shop
+from src.core.config import SLOT_HORIZON_DAYS, SLOT_DURATION_MINUTES, SLOT_ENGINE
 from src.core.logger import logger
+from src.core.slot_events import publish_slot_change, slot_change
+from src.core.pubsub import slot_event_hub
+
+SLOT_DURATION = timedelta(minutes=SLOT_DURATION_MINUTES)
+
+
+def _candidate_slot_times(day, start_time, end_time, now_dt):
+    """Yield the start times of the fixed-length slots between start_time and end_time that are not in the past."""
+    current_slot_start = datetime.combine(day, start_time)
+    end_dt = datetime.combine(day, end_time)
+
+    while current_slot_start + SLOT_DURATION <= end_dt:
+        if current_slot_start + SLOT_DURATION > now_dt:
+            yield current_slot_start.time()
+        current_slot_start += SLOT_DURATION
+
+
+def insert_slots_ignoring_duplicates(db, rows):
+    """
+    Write all slot rows with a single multi-row INSERT.
+    Rows that collide with uq_barber_slot (e.g. created by a concurrent run) are skipped by the database.
+    """
+    stmt = (
+        insert(BarberSlot)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+    db.execute(stmt, rows)
+
+
+def _new_slot_changes(db, shop_id, rows):
+    """
+    Stream deltas for slot rows just bulk-inserted for one shop. Their ids are only known
+    after the insert, so they are read back, and only for dates someone is subscribed to.
+    """
+    watched = {row["slot_date"] for row in rows if slot_event_hub.has_subscribers(shop_id, str(row["slot_date"]))}
+    if not watched:
+        return []
+
+    keys = {(row["barber_id"], row["slot_date"], row["slot_time"]) for row in rows if row["slot_date"] in watched}
+    inserted = db.query(
+        BarberSlot.slot_id, BarberSlot.barber_id, BarberSlot.slot_date, BarberSlot.slot_time
+    ).filter(
+        BarberSlot.shop_id == shop_id,
+        BarberSlot.slot_date.in_(watched),
+        BarberSlot.barber_id.in_({key[0] for key in keys})
+    ).all()
+    return [
+        slot_change(row.slot_id, row.barber_id, row.slot_date, row.slot_time, "available")
+        for row in inserted
+        if (row.barber_id, row.slot_date, row.slot_time) in keys
+    ]
+
 
 def generate_barber_slots(single_barber_id: int = None):
-    """Generate 1-hour slots for barbers directly from barbers table with fixed time intervals."""
+    """
+    Keep SLOT_DURATION_MINUTES-long slots materialized for every day of the booking horizon
+    (today .. today + SLOT_HORIZON_DAYS - 1), directly from the barbers table.
+
+    Each barber carries a `slots_generated_until` watermark, so a run only walks the
+    days that became visible at the edge of the window since the last run, plus the
+    whole window for barbers whose watermark was cleared because their hours changed.
+    The work is set-based: one query for the barbers that need generation joined with
+    their shops, one query for the slots that already exist in the affected date range,
+    one bulk insert for everything missing and one bulk watermark update.
+    """
     db = SessionLocal()
     try:
         today = datetime.today().date()
         now_dt = datetime.now()
-        slot_duration = timedelta(hours=1)
+        horizon_end = today + timedelta(days=SLOT_HORIZON_DAYS - 1)
 
-        # Fetch barbers eligible for daily slot generation
-        query = db.query(Barber).filter(
-            Barber.generate_daily == True,
-            Barber.is_available == True
+        # Fetch eligible barbers (shop open) that have days missing from the horizon
+        query = (
+            db.query(
+                Barber.barber_id,
+                Barber.barber_name,
+                Barber.shop_id,
+                Barber.start_time,
+                Barber.end_time,
+                Barber.slots_generated_until,
+                Shop.city
+            )
+            .join(Shop, Shop.shop_id == Barber.shop_id)
+            .filter(
+                Barber.generate_daily == True,
+                Barber.is_available == True,
+                Shop.is_open == True
+            )
         )
         if single_barber_id:
             query = query.filter(Barber.barber_id == single_barber_id)
+        else:
+            query = query.filter(or_(
+                Barber.slots_generated_until == None,
+                Barber.slots_generated_until < horizon_end
+            ))
 
         barbers = query.all()
 
@@ -25,58 +109,269 @@ def generate_barber_slots(single_barber_id: int = None):
             logger.info("[SLOT AGENT] No barbers found for slot generation")
             return
 
+        # Work out which days each barber still needs
+        first_days = {}
         for barber in barbers:
-            # Ensure shop is open
-            shop = db.query(Shop).filter(Shop.shop_id == barber.shop_id).first()
-            if not shop or not getattr(shop, "is_open", True):
-                logger.info(f"[SLOT AGENT] Shop closed. Skipping {barber.barber_name}.")
-                continue
+            watermark = barber.slots_generated_until
+            if single_barber_id or watermark is None or watermark < today:
+                first_days[barber.barber_id] = today
+            else:
+                first_days[barber.barber_id] = watermark + timedelta(days=1)
+
+        range_start = min(first_days.values())
 
+        # Fetch the slots that already exist in the affected range in one round trip,
+        # only for the barbers being generated
+        existing_query = db.query(
+            BarberSlot.barber_id, BarberSlot.slot_date, BarberSlot.slot_time
+        ).filter(
+            BarberSlot.barber_id.in_(list(first_days)),
+            BarberSlot.slot_date >= range_start,
+            BarberSlot.slot_date <= horizon_end
+        )
+
+        existing = {(row.barber_id, row.slot_date, row.slot_time) for row in existing_query.all()}
+
+        new_rows = []
+        for barber in barbers:
             # Validate barber start/end times
             if not barber.start_time or not barber.end_time:
                 logger.warning(f"[SLOT AGENT] Barber {barber.barber_name} missing start/end time, skipping")
                 continue
 
-            start_dt = datetime.combine(today, barber.start_time)
-            end_dt = datetime.combine(today, barber.end_time)
-
-            # Start from barber's start_time and generate fixed 1-hour slots
-            current_slot_start = start_dt
-
-            while current_slot_start + slot_duration <= end_dt:
-                # Skip past slots
-                if current_slot_start + slot_duration <= now_dt:
-                    current_slot_start += slot_duration
-                    continue
-
-                slot_time = current_slot_start.time()
-
-                # Check if slot already exists
-                exists = db.query(BarberSlot).filter(
-                    BarberSlot.barber_id == barber.barber_id,
-                    BarberSlot.slot_date == today,
-                    BarberSlot.slot_time == slot_time
-                ).first()
-
-                if not exists:
-                    new_slot = BarberSlot(
-                        barber_id=barber.barber_id,
-                        shop_id=barber.shop_id,
-                        slot_date=today,
-                        slot_time=slot_time,
-                        status="available",
-                        is_booked=False
-                    )
-                    db.add(new_slot)
-                    logger.info(f"[SLOT AGENT] Created slot for {barber.barber_name} at {slot_time}")
-
-                current_slot_start += slot_duration
+            day = first_days[barber.barber_id]
+            while day <= horizon_end:
+                for slot_time in _candidate_slot_times(day, barber.start_time, barber.end_time, now_dt):
+                    if (barber.barber_id, day, slot_time) in existing:
+                        continue
+
+                    new_rows.append({
+                        "barber_id": barber.barber_id,
+                        "shop_id": barber.shop_id,
+                        "city": barber.city,
+                        "slot_date": day,
+                        "slot_time": slot_time,
+                        "duration_minutes": SLOT_DURATION_MINUTES,
+                        "status": "available",
+                        "is_booked": False
+                    })
+                day += timedelta(days=1)
+
+        if new_rows:
+            insert_slots_ignoring_duplicates(db, new_rows)
+
+        # Advance the watermark for every barber walked in this run
+        db.query(Barber).filter(
+            Barber.barber_id.in_(list(first_days))
+        ).update({Barber.slots_generated_until: horizon_end}, synchronize_session=False)
 
         db.commit()
-        logger.info("[SLOT AGENT] Slots generation completed successfully")
+
+        changed = {}
+        for row in new_rows:
+            changed.setdefault(row["shop_id"], []).append(row)
+        for shop_id, rows in changed.items():
+            publish_slot_change(shop_id, {row["slot_date"] for row in rows}, _new_slot_changes(db, shop_id, rows))
+
+        logger.info(
+            f"[SLOT AGENT] Slots generation completed successfully: "
+            f"{len(new_rows)} new slot(s) for {len(barbers)} barber(s) up to {horizon_end}"
+        )
 
     except Exception as e:
         db.rollback()
         logger.error(f"[SLOT AGENT ERROR] {str(e)}")
     finally:
         db.close()
+
+
+def regenerate_barber_slots(barber_id: int, start_date=None, end_date=None):
+    """
+    Bring one barber's slots in [start_date, end_date] in line with their current schedule.
+
+    Missing slots are inserted and unbooked future slots that now fall outside the
+    barber's hours (or belong to a barber/shop that is no longer available) are retired.
+    Booked slots are never touched, and neither are slots a customer is holding during
+    checkout: those dates are regenerated again once the last such hold has lapsed.
+    Defaults to the whole booking horizon.
+    """
+    db = SessionLocal()
+    try:
+        today = datetime.today().date()
+        now_dt = datetime.now()
+        horizon_end = today + timedelta(days=SLOT_HORIZON_DAYS - 1)
+        start_date = max(start_date or today, today)
+        end_date = min(end_date or horizon_end, horizon_end)
+
+        barber = (
+            db.query(
+                Barber.barber_id,
+                Barber.barber_name,
+                Barber.shop_id,
+                Barber.start_time,
+                Barber.end_time,
+                Barber.is_available,
+                Barber.generate_daily,
+                Shop.is_open,
+                Shop.city
+            )
+            .join(Shop, Shop.shop_id == Barber.shop_id)
+            .filter(Barber.barber_id == barber_id)
+            .first()
+        )
+        if not barber:
+            logger.info(f"[SLOT AGENT] Barber {barber_id} no longer exists, nothing to regenerate")
+            return
+
+        eligible = bool(
+            barber.generate_daily and barber.is_available and barber.is_open
+            and barber.start_time and barber.end_time
+        )
+
+        desired = set()
+        if eligible:
+            day = start_date
+            while day <= end_date:
+                for slot_time in _candidate_slot_times(day, barber.start_time, barber.end_time, now_dt):
+                    desired.add((day, slot_time))
+                day += timedelta(days=1)
+
+        existing = db.query(
+            BarberSlot.slot_id,
+            BarberSlot.slot_date,
+            BarberSlot.slot_time,
+            BarberSlot.is_booked,
+            BarberSlot.status,
+            BarberSlot.held_until
+        ).filter(
+            BarberSlot.barber_id == barber_id,
+            BarberSlot.slot_date >= start_date,
+            BarberSlot.slot_date <= end_date
+        ).all()
+
+        existing_keys = {(row.slot_date, row.slot_time) for row in existing}
+        new_rows = [
+            {
+                "barber_id": barber.barber_id,
+                "shop_id": barber.shop_id,
+                "city": barber.city,
+                "slot_date": day,
+                "slot_time": slot_time,
+                "duration_minutes": SLOT_DURATION_MINUTES,
+                "status": "available",
+                "is_booked": False
+            }
+            for day, slot_time in sorted(desired - existing_keys)
+        ]
+
+        # Retire unbooked slots that are still ahead of us but no longer within the barber's hours
+        utc_now = datetime.utcnow()
+        outside = [
+            row for row in existing
+            if not row.is_booked
+            and (row.slot_date, row.slot_time) not in desired
+            and datetime.combine(row.slot_date, row.slot_time) + SLOT_DURATION > now_dt
+        ]
+        held, retired = [], []
+        for row in outside:
+            live_hold = row.status == "held" and row.held_until is not None and row.held_until > utc_now
+            (held if live_hold else retired).append(row)
+        retired_ids = [row.slot_id for row in retired]
+
+        if new_rows:
+            insert_slots_ignoring_duplicates(db, new_rows)
+        if retired_ids:
+            db.query(BarberSlot).filter(
+                BarberSlot.slot_id.in_(retired_ids),
+                BarberSlot.is_booked == False,
+                not_(and_(BarberSlot.status == "held", BarberSlot.held_until > utc_now))
+            ).delete(synchronize_session=False)
+
+        if eligible and start_date <= today and end_date >= horizon_end:
+            db.query(Barber).filter(Barber.barber_id == barber_id).update(
+                {Barber.slots_generated_until: horizon_end}, synchronize_session=False
+            )
+
+        db.commit()
+
+        changed_dates = {row["slot_date"] for row in new_rows}
+        changed_dates.update(row.slot_date for row in retired)
+        if changed_dates:
+            changes = _new_slot_changes(db, barber.shop_id, new_rows)
+            changes += [
+                slot_change(row.slot_id, barber.barber_id, row.slot_date, row.slot_time, "removed") for row in retired
+            ]
+            publish_slot_change(barber.shop_id, changed_dates, changes)
+
+        if held:
+            # Kept for the customer checking out; retired after the hold unless it was booked
+            hold_ends_in = (max(row.held_until for row in held) - utc_now).total_seconds()
+            _regenerate_later(
+                barber_id, min(row.slot_date for row in held), max(row.slot_date for row in held), hold_ends_in + 1
+            )
+
+        logger.info(
+            f"[SLOT AGENT] Regenerated slots for {barber.barber_name} ({start_date} - {end_date}): "
+            f"{len(new_rows)} added, {len(retired_ids)} retired, {len(held)} kept while held"
+        )
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"[SLOT AGENT ERROR] Regeneration for barber {barber_id} failed: {str(e)}")
+    finally:
+        db.close()
+
+
+# ============================================
+# Targeted regeneration queue
+# ============================================
+_pending_regenerations = {}  # barber_id -> (start_date, end_date)
+_pending_lock = threading.Lock()
+_pending_event = threading.Event()
+_worker_thread = None
+
+
+def enqueue_slot_regeneration(barber_id: int, start_date=None, end_date=None):
+    """
+    Schedule `regenerate_barber_slots` for one barber on the background worker.
+    Requests for a barber that is already queued are merged into a single date range.
+    A no-op under the virtual slot engine, which computes slots from the schedule itself.
+    """
+    global _worker_thread
+
+    if SLOT_ENGINE == "virtual":
+        return
+
+    with _pending_lock:
+        if barber_id in _pending_regenerations:
+            queued_start, queued_end = _pending_regenerations[barber_id]
+            start_date = None if queued_start is None or start_date is None else min(queued_start, start_date)
+            end_date = None if queued_end is None or end_date is None else max(queued_end, end_date)
+        _pending_regenerations[barber_id] = (start_date, end_date)
+
+        if _worker_thread is None or not _worker_thread.is_alive():
+            _worker_thread = threading.Thread(
+                target=_regeneration_worker, name="slot-regeneration", daemon=True
+            )
+            _worker_thread.start()
+
+    _pending_event.set()
+
+
+def _regenerate_later(barber_id: int, start_date, end_date, delay_seconds: float):
+    """Queue a regeneration after `delay_seconds`, e.g. once holds that blocked retiring a slot lapse."""
+    timer = threading.Timer(delay_seconds, enqueue_slot_regeneration, (barber_id, start_date, end_date))
+    timer.daemon = True
+    timer.start()
+
+
+def _regeneration_worker():
+    while True:
+        _pending_event.wait()
+        with _pending_lock:
+            batch = dict(_pending_regenerations)
+            _pending_regenerations.clear()
+            _pending_event.clear()
+
+        for barber_id, (start_date, end_date) in batch.items():
+            regenerate_barber_slots(barber_id, start_date, end_date)
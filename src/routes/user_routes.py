@@ -1,7 +1,7 @@
 # src/routes/user_routes.py
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from src.db.database import get_db
+from src.db.database import get_db, get_read_db
 from src.schemas.user_schema import UserCreate, OTPRequest, OTPVerify, UserLogin
 from src.services.user_service import UserService
 
@@ -25,7 +25,7 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.get("/get_user")
-def get_user(email: str, db: Session = Depends(get_db)):
+def get_user(email: str, db: Session = Depends(get_read_db)):
     user = UserService.get_user(db, email)
     return user
 
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import time
 
 class ShopCreate(BaseModel):
@@ -8,3 +9,54 @@ class ShopCreate(BaseModel):
     state: str
     open_time: time
     close_time: time
+
+
+class HoldRequest(BaseModel):
+    user_id: int
+    barber_id: int
+    shop_id: int
+    slot_ids: List[int]
+    hold_seconds: Optional[int] = Field(None, gt=0)  # defaults to SLOT_HOLD_SECONDS, capped at SLOT_HOLD_MAX_SECONDS
+
+class ReleaseHoldRequest(BaseModel):
+    user_id: int
+    shop_id: int
+    slot_ids: List[int]
+
+class SlotSearchResult(BaseModel):
+    slot_id: int
+    shop_id: int
+    shop_name: str
+    barber_id: int
+    barber_name: str
+    slot_date: str
+    slot_time: str
+
+class BarberLookup(BaseModel):
+    barber_id: int
+    barber_name: str
+    offset_minutes: int  # start of bit 0, in minutes after midnight
+    step_minutes: int    # minutes between consecutive bits
+    slot_ids: List[int]  # one per set bit of free | booked | held, lowest bit first
+
+class AvailabilityBitmap(BaseModel):
+    shop_id: int
+    date: str
+    barbers: List[BarberLookup]
+    free: List[str]    # hex bitmasks, aligned with `barbers`
+    booked: List[str]
+    held: List[str]
+
+class CalendarBarber(BaseModel):
+    barber_id: int
+    barber_name: str
+    free: int
+    booked: int
+    held: int
+
+class CalendarDay(BaseModel):
+    date: str
+    free: int
+    booked: int
+    held: int
+    barbers: List[CalendarBarber]
@@ -0,0 +1,239 @@
+"""
+Async versions of the services, for the async request stack (ASYNC_STACK_ENABLED).
+
+Reads on the hot path are written against AsyncSession directly. Multi-statement write
+flows reuse the sync service code through `AsyncSession.run_sync`, which runs it in a
+greenlet on the async connection: the event loop is never blocked on MySQL and both
+stacks keep one implementation of the booking/hold/schedule rules. Password hashing is
+awaited on the bcrypt process pool; OTP emails only go onto the mail queue.
+"""
+import asyncio
+import random
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db.models import User, Barber
+from src.core.security import hash_password_async, verify_and_update_password_async
+from src.core.logger import logger
+from src.core.config import SHOP_PAGE_SIZE, OTP_TTL_SECONDS, BOOKING_MAX_RETRIES
+from src.core.otp_store import otp_store, verification_key, login_key, OTP_VALID, OTP_EXPIRED, OTP_MISSING
+from src.utils.email import send_email_otp
+from src.services.shop_service import ShopService, booking_http_errors
+from src.services.barber_service import BarberService
+from src.services.availability_service import BarberAvailabilityService
+from src.services.booking_service import BookingService, SlotConflictError, VersionConflict, retry_backoff
+from src.services.hold_service import SlotHoldService
+from src.services.search_service import SlotSearchService
+
+
+class AsyncUserService:
+
+    @staticmethod
+    async def _user_by(db: AsyncSession, column, value):
+        return (await db.execute(select(User).where(column == value))).scalars().first()
+
+    @staticmethod
+    async def register_user(db: AsyncSession, username: str, email: str, password: str, phone_number: str | None, role: str):
+        if await AsyncUserService._user_by(db, User.email, email):
+            raise HTTPException(status_code=400, detail="Email already registered")
+        if await AsyncUserService._user_by(db, User.phone_number, phone_number):
+            raise HTTPException(status_code=400, detail="phone number already registered")
+
+        hashed_pw = await hash_password_async(password)
+        db.add(User(username=username, email=email, hashed_password=hashed_pw, phone_number=phone_number, role=role))
+        await db.commit()
+
+        logger.info(f"[REGISTER] User registered: {email}")
+        return {"msg": "User registered successfully"}
+
+    @staticmethod
+    async def get_user(db: AsyncSession, email: str):
+        user = await AsyncUserService._user_by(db, User.email, email)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "phone_number": user.phone_number
+        }
+
+    @staticmethod
+    async def send_verification_otp(db: AsyncSession, email: str):
+        otp = str(random.randint(100000, 999999))
+        otp_store.put(verification_key(email), otp, OTP_TTL_SECONDS)
+        send_email_otp(email, otp)
+        return {"msg": "Verification OTP sent"}
+
+    @staticmethod
+    async def verify_email(db: AsyncSession, email: str, otp: str):
+        outcome = otp_store.verify(verification_key(email), otp)
+        if outcome == OTP_MISSING:
+            raise HTTPException(status_code=404, detail="Email not found")
+        if outcome == OTP_EXPIRED:
+            raise HTTPException(status_code=400, detail="OTP expired")
+        if outcome != OTP_VALID:
+            raise HTTPException(status_code=400, detail="Invalid OTP")
+        return {"msg": "Email verified successfully"}
+
+    @staticmethod
+    async def login_with_password(db: AsyncSession, email: str, password: str, role: str):
+        user = await AsyncUserService._user_by(db, User.email, email)
+        if not user or user.role != role:
+            raise HTTPException(status_code=401, detail="Invalid email or role")
+        valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+        if not valid:
+            raise HTTPException(status_code=401, detail="Invalid email or password")
+        if new_hash:
+            user.hashed_password = new_hash
+            await db.commit()
+            logger.info(f"[LOGIN] Password rehashed: {email}")
+
+        logger.info(f"[LOGIN] Success: {email}")
+        return {
+            "msg": "Login successful",
+            "user_id": user.id,
+            "role": user.role
+        }
+
+    @staticmethod
+    async def send_login_otp(db: AsyncSession, email: str, role: str):
+        user = await AsyncUserService._user_by(db, User.email, email)
+        if not user or user.role != role:
+            raise HTTPException(status_code=401, detail="Invalid email or role")
+
+        otp = str(random.randint(100000, 999999))
+        otp_store.put(login_key(user.email), otp, OTP_TTL_SECONDS)
+        send_email_otp(user.email, otp)
+        return {"msg": f"OTP sent successfully for {role}"}
+
+    @staticmethod
+    async def verify_login_otp(db: AsyncSession, email: str, otp: str, role: str):
+        user = await AsyncUserService._user_by(db, User.email, email)
+        if not user or user.role != role:
+            raise HTTPException(status_code=401, detail="Invalid email or role")
+        outcome = otp_store.verify(login_key(user.email), otp)
+        if outcome == OTP_EXPIRED:
+            raise HTTPException(status_code=400, detail="OTP expired")
+        if outcome != OTP_VALID:
+            raise HTTPException(status_code=400, detail="Invalid OTP")
+
+        logger.info(f"[OTP LOGIN] Success: {email} ({role})")
+        return {
+            "msg": f"Login successful as {role}",
+            "user_id": user.id,
+            "role": user.role
+        }
+
+
+class AsyncShopService:
+
+    @staticmethod
+    async def get_shops_for_user(db: AsyncSession, user_id: int = None, city: str = None, state: str = None,
+                                 is_open: bool = None, cursor: int = None, limit: int = SHOP_PAGE_SIZE):
+        rows = (await db.execute(ShopService.shops_page_statement(user_id, city, state, is_open, cursor, limit))).all()
+        return ShopService.shops_page(rows, cursor, limit)
+
+    @staticmethod
+    async def get_available_slots(db: AsyncSession, shop_id: int, date: str, slot_minutes: int = None):
+        # Served from slot_cache when warm, in which case no connection is checked out
+        return await db.run_sync(ShopService.get_available_slots, shop_id, date, slot_minutes)
+
+    @staticmethod
+    async def get_availability_bitmap(db: AsyncSession, shop_id: int, date: str, slot_minutes: int = None):
+        return await db.run_sync(ShopService.get_availability_bitmap, shop_id, date, slot_minutes)
+
+    @staticmethod
+    async def get_calendar(db: AsyncSession, shop_id: int, start_date, end_date):
+        return await db.run_sync(ShopService.get_calendar, shop_id, start_date, end_date)
+
+    @staticmethod
+    async def get_shops_by_owner(db: AsyncSession, owner_id: int):
+        return await db.run_sync(ShopService.get_shops_by_owner, owner_id)
+
+    @staticmethod
+    async def create_shop_if_not_exists(db: AsyncSession, owner_id: int, shop_data):
+        return await db.run_sync(ShopService.create_shop_if_not_exists, owner_id, shop_data)
+
+    @staticmethod
+    async def book_slots(db: AsyncSession, user_id: int, barber_id: int, shop_id: int, slot_ids: list[int]):
+        with booking_http_errors():
+            booked_slots = await AsyncBookingService.book_slots(db, user_id, barber_id, shop_id, slot_ids)
+        return ShopService.booking_response(user_id, barber_id, shop_id, booked_slots)
+
+    @staticmethod
+    async def hold_slots(db: AsyncSession, user_id: int, barber_id: int, shop_id: int, slot_ids: list[int],
+                         hold_seconds: int = None):
+        return await db.run_sync(SlotHoldService.hold_slots, user_id, barber_id, shop_id, slot_ids, hold_seconds)
+
+    @staticmethod
+    async def release_holds(db: AsyncSession, user_id: int, shop_id: int, slot_ids: list[int]):
+        return await db.run_sync(SlotHoldService.release_holds, user_id, shop_id, slot_ids)
+
+    @staticmethod
+    async def search_available_slots(db: AsyncSession, city: str, date: str = None, start_time=None,
+                                     end_time=None, cursor: str = None, limit: int = SHOP_PAGE_SIZE):
+        return await db.run_sync(
+            SlotSearchService.search_available_slots, city, date, start_time, end_time, cursor, limit
+        )
+
+
+class AsyncBarberService:
+
+    @staticmethod
+    async def add_barber(db: AsyncSession, shop_id: int, data):
+        return await db.run_sync(BarberService.add_barber, shop_id, data)
+
+    @staticmethod
+    async def update_barber(db: AsyncSession, barber_id: int, owner_id: int, data):
+        return await db.run_sync(BarberService.update_barber, barber_id, owner_id, data)
+
+    @staticmethod
+    async def delete_barber(db: AsyncSession, barber_id: int, owner_id: int):
+        return await db.run_sync(BarberService.delete_barber, barber_id, owner_id)
+
+    @staticmethod
+    async def get_available_barbers(db: AsyncSession, shop_id: int):
+        barbers = (await db.execute(
+            select(Barber.barber_id, Barber.barber_name, Barber.start_time, Barber.end_time, Barber.is_available)
+            .where(Barber.shop_id == shop_id, Barber.is_available == True)
+        )).all()
+
+        if not barbers:
+            raise HTTPException(status_code=404, detail="No available barbers found for this shop")
+
+        return [
+            {
+                "barber_id": barber.barber_id,
+                "name": barber.barber_name,
+                "start_time": str(barber.start_time),
+                "end_time": str(barber.end_time),
+                "is_available": barber.is_available
+            }
+            for barber in barbers
+        ]
+
+
+class AsyncAvailabilityService:
+
+    @staticmethod
+    async def add_or_update_availability(db: AsyncSession, barber_id: int, data):
+        return await db.run_sync(BarberAvailabilityService.add_or_update_availability, barber_id, data)
+
+
+class AsyncBookingService:
+
+    @staticmethod
+    async def book_slots(db: AsyncSession, user_id: int, barber_id: int, shop_id: int, slot_ids: list,
+                         mode: str = None):
+        """
+        Same contract as BookingService.book_slots. Each attempt runs through run_sync; the
+        optimistic mode's backoff between attempts is awaited, so the event loop keeps serving.
+        """
+        for attempt in range(BOOKING_MAX_RETRIES + 1):
+            try:
+                return await db.run_sync(BookingService.book_once, user_id, barber_id, shop_id, slot_ids, mode)
+            except VersionConflict:
+                if attempt < BOOKING_MAX_RETRIES:
+                    await asyncio.sleep(retry_backoff(slot_ids, attempt))
+        raise SlotConflictError("Slots are being booked by another request, please retry")
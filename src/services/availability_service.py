@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from src.db.models import Barber
 from src.schemas.availability_schemas import BarberAvailabilityCreate
+from src.routes.slot_generator import enqueue_slot_regeneration
+from src.core.slot_events import publish_barber_change
 
 class BarberAvailabilityService:
     @staticmethod
@@ -26,15 +28,27 @@ class BarberAvailabilityService:
                     detail="Barber does not belong to this shop"
                 )
 
+            schedule_before = (barber.start_time, barber.end_time, barber.is_available, barber.generate_daily)
+
             # Update barber record directly
             barber.start_time = data.start_time
             barber.end_time = data.end_time
             barber.is_available = data.is_available
             if hasattr(data, "generate_daily"):
                 barber.generate_daily = data.generate_daily
+
+            schedule_changed = (
+                (barber.start_time, barber.end_time, barber.is_available, barber.generate_daily) != schedule_before
+            )
+            if schedule_changed:
+                barber.slots_generated_until = None  # slot agent re-walks the whole booking horizon
             db.commit()
             db.refresh(barber)
 
+            if schedule_changed:
+                publish_barber_change(barber.shop_id)
+                enqueue_slot_regeneration(barber.barber_id)
+
             return {
                 "msg": "Barber availability updated successfully",
                 "barber_id": barber.barber_id
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from src.db.models import Barber, Shop
 from src.schemas.barber_schemas import BarberCreate, BarberUpdate
+from src.routes.slot_generator import enqueue_slot_regeneration
+from src.core.slot_events import publish_barber_change
 from fastapi import HTTPException
 
 class BarberService:
@@ -23,6 +25,10 @@ class BarberService:
         db.add(barber)
         db.commit()
         db.refresh(barber)
+
+        publish_barber_change(shop_id)
+        if barber.generate_daily:
+            enqueue_slot_regeneration(barber.barber_id)
         return {"msg": "Barber added successfully", "barber_id": barber.barber_id}
 
     @staticmethod
@@ -35,14 +41,26 @@ class BarberService:
         if shop.owner_id != owner_id:
             raise HTTPException(status_code=403, detail="Not authorized to update this barber")
 
+        schedule_before = (barber.start_time, barber.end_time, barber.is_available, barber.generate_daily)
+
         barber.barber_name = data.barber_name or barber.barber_name
         barber.start_time = data.start_time or barber.start_time
         barber.end_time = data.end_time or barber.end_time
         barber.is_available = data.is_available if data.is_available is not None else barber.is_available
         barber.generate_daily = data.everyday if data.everyday is not None else barber.generate_daily  # ✅ Update daily
 
+        schedule_changed = (
+            (barber.start_time, barber.end_time, barber.is_available, barber.generate_daily) != schedule_before
+        )
+        if schedule_changed:
+            barber.slots_generated_until = None  # slot agent re-walks the whole booking horizon
+
         db.commit()
         db.refresh(barber)
+
+        publish_barber_change(barber.shop_id)  # barber name/hours show up in every date's listing
+        if schedule_changed:
+            enqueue_slot_regeneration(barber.barber_id)
         return {"msg": "Barber updated successfully", "barber": {
             "barber_id": barber.barber_id,
             "name": barber.barber_name,
@@ -66,6 +84,7 @@ class BarberService:
 
         db.delete(barber)  # ✅ No need to delete related slots/bookings manually
         db.commit()
+        publish_barber_change(shop.shop_id)
 
         return {"msg": "Barber and all related records deleted successfully"}
     
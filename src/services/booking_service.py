@@ -1,48 +1,251 @@
-from sqlalchemy.orm import Session
+import random
+import time
 from datetime import datetime
+from sqlalchemy import and_, insert, or_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from src.db.models import BarberSlot, Booking
+from src.core.config import BOOKING_CONCURRENCY_MODE, BOOKING_MAX_RETRIES, BOOKING_RETRY_BACKOFF_MS
+from src.core.logger import logger
+from src.core.slot_events import publish_slot_change, slot_change
+from src.services.virtual_slot_service import VirtualSlotService, SlotUnavailableError
+
+# MySQL lock wait timeout / deadlock
+LOCK_CONFLICT_ERROR_CODES = (1205, 1213)
+
+
+class SlotNotFoundError(ValueError):
+    pass
+
+
+class SlotAlreadyBookedError(ValueError):
+    pass
+
+
+class SlotConflictError(Exception):
+    """The slots stayed contended after all retries; the client may try again."""
+    pass
+
+
+class SlotHeldError(SlotConflictError):
+    """Another customer holds the slot during checkout."""
+    pass
+
+
+class VersionConflict(Exception):
+    """An optimistic claim lost a race. The transaction was rolled back; the booking can be retried."""
+    pass
+
 
 class BookingService:
     @staticmethod
-    def book_slots(db: Session, user_id: int, barber_id: int, shop_id: int, slot_ids: list):
-        booked_slots = []
-
-        for slot_id in slot_ids:
-            # Fetch slot
-            slot = db.query(BarberSlot).filter(
-                BarberSlot.slot_id == slot_id,
-                BarberSlot.barber_id == barber_id
-            ).first()
-
-            if not slot:
-                raise ValueError(f"Slot {slot_id} not found")
-
-            if slot.is_booked:
-                raise ValueError(f"Slot {slot_id} is already booked")
-
-            # Mark slot as booked
-            slot.is_booked = True
-            slot.status = "booked"
-
-            # Create booking record
-            booking = Booking(
-                user_id=user_id,
-                barber_id=barber_id,
-                shop_id=shop_id,
-                slot_id=slot.slot_id,
-                booking_date=slot.slot_date,
-                booking_time=slot.slot_time,
-                status="booked",
-                created_at=datetime.utcnow()
+    def book_slots(db: Session, user_id: int, barber_id: int, shop_id: int, slot_ids: list, mode: str = None):
+        """
+        Book all requested slots of one barber atomically.
+
+        mode="pessimistic" claims the slots with a single conditional UPDATE
+        (`... WHERE is_booked = false`), which row-locks them until commit.
+        mode="optimistic" reads the slots without locks and claims them with
+        `... WHERE version = :seen`, retrying with backoff when another request got there first.
+        In both modes the bookings are written with one multi-row INSERT and either every
+        slot is booked or nothing changes. Defaults to BOOKING_CONCURRENCY_MODE.
+        """
+        for attempt in range(BOOKING_MAX_RETRIES + 1):
+            try:
+                return BookingService.book_once(db, user_id, barber_id, shop_id, slot_ids, mode)
+            except VersionConflict:
+                if attempt < BOOKING_MAX_RETRIES:
+                    time.sleep(retry_backoff(slot_ids, attempt))
+        raise SlotConflictError("Slots are being booked by another request, please retry")
+
+    @staticmethod
+    def book_once(db: Session, user_id: int, barber_id: int, shop_id: int, slot_ids: list, mode: str = None):
+        """
+        One booking attempt in one transaction, virtual ids included: a retry after a
+        VersionConflict starts over from the rollback and materializes them again.
+        """
+        slot_ids = list(dict.fromkeys(slot_ids))
+        if not slot_ids:
+            return []
+
+        slot_ids = materialize(db, user_id, shop_id, barber_id, slot_ids)
+
+        mode = mode or BOOKING_CONCURRENCY_MODE
+        try:
+            if mode == "optimistic":
+                slots = BookingService._claim_optimistic(db, user_id, barber_id, shop_id, slot_ids)
+            else:
+                slots = BookingService._claim_pessimistic(db, user_id, barber_id, shop_id, slot_ids)
+
+            db.execute(insert(Booking), [
+                {
+                    "user_id": user_id,
+                    "barber_id": barber_id,
+                    "shop_id": shop_id,
+                    "slot_id": slot_id,
+                    "booking_date": slots[slot_id].slot_date,
+                    "booking_time": slots[slot_id].slot_time,
+                    "status": "booked"
+                }
+                for slot_id in slot_ids
+            ])
+            db.commit()
+            publish_slot_change(shop_id, {row.slot_date for row in slots.values()}, [
+                slot_change(slot_id, barber_id, row.slot_date, row.slot_time, "booked")
+                for slot_id, row in slots.items()
+            ])
+        except OperationalError as e:
+            db.rollback()
+            if getattr(e.orig, "args", (None,))[0] in LOCK_CONFLICT_ERROR_CODES:
+                raise SlotConflictError("Slots are being booked by another request, please retry")
+            raise
+        except SQLAlchemyError:
+            db.rollback()
+            raise
+
+        return [
+            {
+                "slot_id": slot_id,
+                "slot_date": str(slots[slot_id].slot_date),
+                "slot_time": str(slots[slot_id].slot_time),
+                "status": "booked"
+            }
+            for slot_id in slot_ids
+        ]
+
+    @staticmethod
+    def _claim_pessimistic(db: Session, user_id: int, barber_id: int, shop_id: int, slot_ids: list):
+        now = datetime.utcnow()
+        # Savepoint after materialization: a partial claim is undone without losing the rows it created
+        claim = db.begin_nested()
+        claimed = db.execute(
+            update(BarberSlot)
+            .where(
+                BarberSlot.slot_id.in_(slot_ids),
+                BarberSlot.barber_id == barber_id,
+                BarberSlot.shop_id == shop_id,
+                BarberSlot.is_booked == False,
+                not_held_by_others(user_id, now)
+            )
+            .values(is_booked=True, status="booked", held_by=None, held_until=None, version=BarberSlot.version + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        if claimed != len(slot_ids):
+            claim.rollback()
+            error = claim_error(db, user_id, barber_id, shop_id, slot_ids, now)
+            db.rollback()
+            raise error
+        claim.commit()
+
+        return {
+            row.slot_id: row
+            for row in db.query(BarberSlot.slot_id, BarberSlot.slot_date, BarberSlot.slot_time)
+            .filter(BarberSlot.slot_id.in_(slot_ids))
+            .all()
+        }
+
+    @staticmethod
+    def _claim_optimistic(db: Session, user_id: int, barber_id: int, shop_id: int, slot_ids: list):
+        now = datetime.utcnow()
+        slots = {
+            row.slot_id: row
+            for row in db.query(
+                BarberSlot.slot_id,
+                BarberSlot.slot_date,
+                BarberSlot.slot_time,
+                BarberSlot.is_booked,
+                BarberSlot.status,
+                BarberSlot.held_by,
+                BarberSlot.held_until,
+                BarberSlot.version
+            ).filter(
+                BarberSlot.slot_id.in_(slot_ids),
+                BarberSlot.barber_id == barber_id,
+                BarberSlot.shop_id == shop_id
+            ).all()
+        }
+        if len(slots) != len(slot_ids) or any(
+            row.is_booked or _held_by_other(row, user_id, now) for row in slots.values()
+        ):
+            error = claim_error(db, user_id, barber_id, shop_id, slot_ids, now)
+            db.rollback()
+            raise error
+
+        claimed = db.execute(
+            update(BarberSlot)
+            .where(
+                or_(*[
+                    and_(BarberSlot.slot_id == row.slot_id, BarberSlot.version == row.version)
+                    for row in slots.values()
+                ]),
+                BarberSlot.is_booked == False
             )
+            .values(is_booked=True, status="booked", held_by=None, held_until=None, version=BarberSlot.version + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        if claimed != len(slot_ids):
+            # Someone changed one of the slots between our read and write: start over on a fresh snapshot
+            db.rollback()
+            raise VersionConflict()
+        return slots
+
+
+def retry_backoff(slot_ids: list, attempt: int) -> float:
+    """Seconds to wait before retrying a booking that lost `attempt + 1` races: exponential, jittered."""
+    backoff = BOOKING_RETRY_BACKOFF_MS * (2 ** attempt) * random.uniform(0.5, 1.5)
+    logger.info(f"[BOOKING] Version conflict on slots {slot_ids}, retry {attempt + 1} in {backoff:.0f}ms")
+    return backoff / 1000
+
+
+def materialize(db: Session, user_id: int, shop_id: int, barber_id: int, slot_ids: list):
+    """VirtualSlotService.materialize_slots with its errors raised as booking errors (after a rollback)."""
+    try:
+        return VirtualSlotService.materialize_slots(db, shop_id, barber_id, slot_ids, user_id)
+    except SlotUnavailableError as e:
+        db.rollback()
+        raise SlotHeldError(str(e)) if e.held else SlotAlreadyBookedError(str(e))
+    except ValueError as e:
+        db.rollback()
+        raise SlotNotFoundError(str(e))
+
+
+def not_held_by_others(user_id: int, now: datetime):
+    """SQL condition: the slot is not held, held by this user, or the hold has lapsed."""
+    return or_(
+        BarberSlot.status != "held",
+        BarberSlot.held_by == user_id,
+        BarberSlot.held_until <= now
+    )
+
+
+def _held_by_other(row, user_id: int, now: datetime) -> bool:
+    return row.status == "held" and row.held_by != user_id and row.held_until is not None and row.held_until > now
 
-            db.add(booking)
-            booked_slots.append({
-                "slot_id": slot.slot_id,
-                "slot_date": str(slot.slot_date),
-                "slot_time": str(slot.slot_time),
-                "status": booking.status
-            })
 
-        db.commit()
-        return booked_slots
+def claim_error(db: Session, user_id: int, barber_id: int, shop_id: int, slot_ids: list, now: datetime):
+    """
+    Work out why a claim did not match every slot. Call it before rolling the transaction back
+    (after undoing the partial claim), so slots materialized from virtual ids are still there.
+    """
+    found = {
+        row.slot_id: row
+        for row in db.query(
+            BarberSlot.slot_id, BarberSlot.is_booked, BarberSlot.status, BarberSlot.held_by, BarberSlot.held_until
+        ).filter(
+            BarberSlot.slot_id.in_(slot_ids),
+            BarberSlot.barber_id == barber_id,
+            BarberSlot.shop_id == shop_id
+        ).all()
+    }
+    for slot_id in slot_ids:
+        if slot_id not in found:
+            return SlotNotFoundError(f"Slot {slot_id} not found")
+    for slot_id in slot_ids:
+        if found[slot_id].is_booked:
+            return SlotAlreadyBookedError(f"Slot {slot_id} is already booked")
+    for slot_id in slot_ids:
+        if _held_by_other(found[slot_id], user_id, now):
+            return SlotHeldError(f"Slot {slot_id} is held by another customer")
+    return SlotAlreadyBookedError("Slots were booked by another request, please retry")
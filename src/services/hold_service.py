@@ -0,0 +1,171 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from src.db.database import SessionLocal
+from src.db.models import BarberSlot
+from src.core.config import SLOT_HOLD_SECONDS, SLOT_HOLD_MAX_SECONDS
+from src.core.logger import logger
+from src.core.slot_events import publish_slot_change, slot_change
+from src.services.booking_service import claim_error, materialize, not_held_by_others
+
+
+class HoldExpiryQueue:
+    """
+    Min-heap of hold expiry times created by this process.
+    Lets the frequent sweep skip the database entirely while no hold is due.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def push(self, expires_at: datetime):
+        with self._lock:
+            heapq.heappush(self._heap, expires_at)
+
+    def pop_due(self, now: datetime) -> int:
+        """Drop every expiry <= now and return how many there were."""
+        due = 0
+        with self._lock:
+            while self._heap and self._heap[0] <= now:
+                heapq.heappop(self._heap)
+                due += 1
+        return due
+
+    def __len__(self):
+        return len(self._heap)
+
+
+hold_expiry_queue = HoldExpiryQueue()
+
+
+class SlotHoldService:
+
+    @staticmethod
+    def hold_slots(db: Session, user_id: int, barber_id: int, shop_id: int, slot_ids: list[int],
+                   hold_seconds: int = None):
+        """
+        Hold slots for `user_id` for a short time with one conditional UPDATE.
+        Holding again before expiry extends the user's own hold.
+        """
+        slot_ids = list(dict.fromkeys(slot_ids))
+        hold_seconds = min(hold_seconds or SLOT_HOLD_SECONDS, SLOT_HOLD_MAX_SECONDS)
+        now = datetime.utcnow()
+        held_until = now + timedelta(seconds=hold_seconds)
+
+        slot_ids = materialize(db, user_id, shop_id, barber_id, slot_ids)
+
+        # Savepoint after materialization: a partial claim is undone without losing the rows it created
+        claim = db.begin_nested()
+        claimed = db.execute(
+            update(BarberSlot)
+            .where(
+                BarberSlot.slot_id.in_(slot_ids),
+                BarberSlot.barber_id == barber_id,
+                BarberSlot.shop_id == shop_id,
+                BarberSlot.is_booked == False,
+                not_held_by_others(user_id, now)
+            )
+            .values(status="held", held_by=user_id, held_until=held_until, version=BarberSlot.version + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        if claimed != len(slot_ids):
+            claim.rollback()
+            error = claim_error(db, user_id, barber_id, shop_id, slot_ids, now)
+            db.rollback()
+            raise error
+        claim.commit()
+
+        rows = db.query(BarberSlot.slot_id, BarberSlot.slot_date, BarberSlot.slot_time).filter(
+            BarberSlot.slot_id.in_(slot_ids)
+        ).all()
+        db.commit()
+        hold_expiry_queue.push(held_until)
+        publish_slot_change(shop_id, {row.slot_date for row in rows}, [
+            slot_change(row.slot_id, barber_id, row.slot_date, row.slot_time, "held") for row in rows
+        ])
+
+        return {
+            "message": f"{len(slot_ids)} slots held",
+            "user_id": user_id,
+            "slot_ids": slot_ids,
+            "held_until": held_until.isoformat()
+        }
+
+    @staticmethod
+    def release_holds(db: Session, user_id: int, shop_id: int, slot_ids: list[int]):
+        rows = db.query(
+            BarberSlot.slot_id, BarberSlot.barber_id, BarberSlot.slot_date, BarberSlot.slot_time
+        ).filter(
+            BarberSlot.slot_id.in_(slot_ids),
+            BarberSlot.shop_id == shop_id,
+            BarberSlot.held_by == user_id,
+            BarberSlot.is_booked == False
+        ).all()
+        released = db.execute(
+            update(BarberSlot)
+            .where(
+                BarberSlot.slot_id.in_(slot_ids),
+                BarberSlot.shop_id == shop_id,
+                BarberSlot.held_by == user_id,
+                BarberSlot.is_booked == False
+            )
+            .values(status="available", held_by=None, held_until=None, version=BarberSlot.version + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if released:
+            publish_slot_change(shop_id, {row.slot_date for row in rows}, [
+                slot_change(row.slot_id, row.barber_id, row.slot_date, row.slot_time, "available") for row in rows
+            ])
+        return {"message": f"{released} slots released"}
+
+
+def sweep_expired_holds(force: bool = False):
+    """
+    Release lapsed holds with one bulk UPDATE.
+
+    Without `force` the database is only touched when a hold created by this process is
+    due; the periodic forced sweep also catches holds from other workers or before a restart.
+    """
+    now = datetime.utcnow()
+    if not hold_expiry_queue.pop_due(now) and not force:
+        return
+
+    db = SessionLocal()
+    try:
+        lapsed = (
+            BarberSlot.status == "held",
+            BarberSlot.is_booked == False,
+            BarberSlot.held_until <= now
+        )
+        affected = db.query(
+            BarberSlot.slot_id, BarberSlot.barber_id, BarberSlot.shop_id, BarberSlot.slot_date, BarberSlot.slot_time
+        ).filter(*lapsed).all()
+        if not affected:
+            return
+
+        released = db.execute(
+            update(BarberSlot)
+            .where(*lapsed)
+            .values(status="available", held_by=None, held_until=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        changes = {}
+        for row in affected:
+            changes.setdefault(row.shop_id, []).append(
+                slot_change(row.slot_id, row.barber_id, row.slot_date, row.slot_time, "available")
+            )
+        for shop_id, shop_changes in changes.items():
+            publish_slot_change(shop_id, {change["slot_date"] for change in shop_changes}, shop_changes)
+        if released:
+            logger.info(f"[HOLD SWEEP] Released {released} expired hold(s)")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"[HOLD SWEEP ERROR] {str(e)}")
+    finally:
+        db.close()
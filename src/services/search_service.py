@@ -0,0 +1,130 @@
+from datetime import date as date_cls, datetime, time
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from src.db.models import Shop, Barber, BarberSlot
+from src.core.config import SLOT_ENGINE, SHOP_PAGE_SIZE
+from src.services.virtual_slot_service import VirtualSlotService, parse_date
+
+
+class SlotSearchService:
+
+    @staticmethod
+    def search_available_slots(db: Session, city: str, date: str = None, start_time: time = None,
+                               end_time: time = None, cursor: str = None, limit: int = SHOP_PAGE_SIZE):
+        """
+        Open slots of every barber in `city` starting within [start_time, end_time),
+        earliest first. Pages are keyed on (slot_time, slot_id); `cursor` is the
+        "HH:MM:SS_slot_id" of the last result of the previous page.
+        Returns (slots, next_cursor); next_cursor is None on the last page.
+        """
+        slot_date = parse_date(date) if date else date_cls.today()
+        after = SlotSearchService._parse_cursor(cursor) if cursor else None
+
+        # Slots that already started today are not "available now"
+        now = datetime.now()
+        if slot_date == now.date():
+            current = now.time().replace(microsecond=0)
+            start_time = max(start_time, current) if start_time else current
+
+        if SLOT_ENGINE == "virtual":
+            slots = SlotSearchService._search_virtual(db, city, slot_date, start_time, end_time, after, limit + 1)
+        else:
+            slots = SlotSearchService._search_materialized(db, city, slot_date, start_time, end_time, after, limit + 1)
+
+        next_cursor = None
+        if len(slots) > limit:
+            last = slots[limit - 1]
+            next_cursor = f"{last['slot_time']}_{last['slot_id']}"
+        return slots[:limit], next_cursor
+
+    @staticmethod
+    def _parse_cursor(cursor: str):
+        try:
+            slot_time, slot_id = cursor.split("_", 1)
+            return time.fromisoformat(slot_time), int(slot_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    @staticmethod
+    def _search_materialized(db: Session, city: str, slot_date: date_cls, start_time, end_time, after, limit: int):
+        """One range scan of ix_barber_slots_city_date_status_time, already in (slot_time, slot_id) order."""
+        query = (
+            db.query(
+                BarberSlot.slot_id,
+                BarberSlot.slot_date,
+                BarberSlot.slot_time,
+                Shop.shop_id,
+                Shop.shop_name,
+                Barber.barber_id,
+                Barber.barber_name
+            )
+            .join(Shop, Shop.shop_id == BarberSlot.shop_id)
+            .join(Barber, Barber.barber_id == BarberSlot.barber_id)
+            .filter(
+                BarberSlot.city == city,
+                BarberSlot.slot_date == slot_date,
+                BarberSlot.status == "available",
+                Shop.is_open == True,
+                Barber.is_available == True
+            )
+        )
+        if start_time is not None:
+            query = query.filter(BarberSlot.slot_time >= start_time)
+        if end_time is not None:
+            query = query.filter(BarberSlot.slot_time < end_time)
+        if after is not None:
+            query = query.filter(or_(
+                BarberSlot.slot_time > after[0],
+                and_(BarberSlot.slot_time == after[0], BarberSlot.slot_id > after[1])
+            ))
+
+        rows = query.order_by(BarberSlot.slot_time, BarberSlot.slot_id).limit(limit).all()
+        return [
+            {
+                "slot_id": row.slot_id,
+                "shop_id": row.shop_id,
+                "shop_name": row.shop_name,
+                "barber_id": row.barber_id,
+                "barber_name": row.barber_name,
+                "slot_date": str(row.slot_date),
+                "slot_time": str(row.slot_time)
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _search_virtual(db: Session, city: str, slot_date: date_cls, start_time, end_time, after, limit: int):
+        """
+        The virtual engine has no slot rows to index, so the city's open slots are computed
+        from its barbers' hours, bookings and holds, each read once for the whole city.
+        """
+        shops = {
+            row.barber_id: row
+            for row in db.query(Barber.barber_id, Shop.shop_id, Shop.shop_name)
+            .join(Shop, Shop.shop_id == Barber.shop_id)
+            .filter(Shop.city == city, Shop.is_open == True)
+        }
+
+        matches = []
+        for slot in VirtualSlotService.compute_city_slots(db, city, slot_date):
+            slot_time = time.fromisoformat(slot["slot_time"])
+            if start_time is not None and slot_time < start_time:
+                continue
+            if end_time is not None and slot_time >= end_time:
+                continue
+            if after is not None and (slot_time, slot["slot_id"]) <= after:
+                continue
+            shop = shops[slot["barber_id"]]
+            matches.append((slot_time, slot["slot_id"], {
+                "slot_id": slot["slot_id"],
+                "shop_id": shop.shop_id,
+                "shop_name": shop.shop_name,
+                "barber_id": slot["barber_id"],
+                "barber_name": slot["barber_name"],
+                "slot_date": slot_date.isoformat(),
+                "slot_time": slot["slot_time"]
+            }))
+
+        matches.sort(key=lambda match: (match[0], match[1]))
+        return [match[2] for match in matches[:limit]]
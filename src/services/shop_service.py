@@ -1,24 +1,84 @@
+from contextlib import contextmanager
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from datetime import datetime
+from datetime import date as date_cls, datetime, timedelta
+from sqlalchemy import and_, case, func, select
 from src.db.models import Shop, Barber, BarberSlot, Booking
 from src.core.logger import logger
+from src.core.config import SLOT_ENGINE, SHOP_PAGE_SIZE, SLOT_DURATION_MINUTES, CALENDAR_MAX_DAYS
+from src.core.slot_cache import slot_cache
+from src.core.bitmap import DayAvailability
+from src.core.slot_events import publish_shop_change
 from sqlalchemy.orm import Session
 from src.schemas.shop_schemas import ShopCreate
+from src.services.virtual_slot_service import VirtualSlotService
+from src.services.booking_service import (
+    BookingService, SlotNotFoundError, SlotAlreadyBookedError, SlotConflictError
+)
+
+
+@contextmanager
+def booking_http_errors():
+    """Raise the booking engine's errors as the HTTP errors of the shop booking endpoint."""
+    try:
+        yield
+    except SlotNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except SlotAlreadyBookedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except SlotConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 
 class ShopService:
 
     @staticmethod
-    def get_shops_for_user(db: Session, user_id: int):
+    def get_shops_for_user(db: Session, user_id: int = None, city: str = None, state: str = None,
+                           is_open: bool = None, cursor: int = None, limit: int = SHOP_PAGE_SIZE):
         """
-        Fetch shops owned by a user or all shops (if user is customer)
+        Fetch one page of shops owned by a user, or of all shops (if user_id is None),
+        ordered by shop_id and starting after `cursor` (the last shop_id of the previous page).
+        Returns (shops, next_cursor); next_cursor is None on the last page.
         """
-        shops = db.query(Shop).all()
-        if not shops:
+        rows = db.execute(ShopService.shops_page_statement(user_id, city, state, is_open, cursor, limit)).all()
+        return ShopService.shops_page(rows, cursor, limit)
+
+    @staticmethod
+    def shops_page_statement(user_id: int = None, city: str = None, state: str = None,
+                             is_open: bool = None, cursor: int = None, limit: int = SHOP_PAGE_SIZE):
+        """SELECT of one shop page; shared by the sync and async stacks."""
+        stmt = select(
+            Shop.shop_id,
+            Shop.shop_name,
+            Shop.address,
+            Shop.city,
+            Shop.state,
+            Shop.open_time,
+            Shop.close_time,
+            Shop.is_open
+        )
+        if user_id is not None:
+            stmt = stmt.where(Shop.owner_id == user_id)
+        if city is not None:
+            stmt = stmt.where(Shop.city == city)
+        if state is not None:
+            stmt = stmt.where(Shop.state == state)
+        if is_open is not None:
+            stmt = stmt.where(Shop.is_open == is_open)
+        if cursor is not None:
+            stmt = stmt.where(Shop.shop_id > cursor)
+
+        # One extra row tells us whether another page exists
+        return stmt.order_by(Shop.shop_id).limit(limit + 1)
+
+    @staticmethod
+    def shops_page(rows, cursor: int = None, limit: int = SHOP_PAGE_SIZE):
+        """Turn the rows of `shops_page_statement` into (shops, next_cursor)."""
+        if not rows and cursor is None:
             raise HTTPException(status_code=404, detail="No shops found")
 
-        return [
+        next_cursor = rows[limit - 1].shop_id if len(rows) > limit else None
+        shops = [
             {
                 "shop_id": shop.shop_id,
                 "shop_name": shop.shop_name,
@@ -28,18 +88,160 @@ class ShopService:
                 "open_time": str(shop.open_time),
                 "close_time": str(shop.close_time),
                 "is_open": shop.is_open
-            } for shop in shops
+            } for shop in rows[:limit]
         ]
+        return shops, next_cursor
 
     @staticmethod
-    def get_available_slots(db: Session, shop_id: int, date: str):
+    def get_available_slots(db: Session, shop_id: int, date: str, slot_minutes: int = None):
+        slots = ShopService.listing_slots(db, shop_id, date, slot_minutes)
+        if not slots:
+            raise HTTPException(status_code=404, detail="No available slots for this shop on the selected date")
+        return slots
+
+    @staticmethod
+    def get_availability_bitmap(db: Session, shop_id: int, date: str, slot_minutes: int = None):
+        """Compact form of the slot listing: a barber lookup table plus free/booked/held masks."""
+        listing = ShopService.cached_listing(db, shop_id, date, slot_minutes)
+        if not len(listing):
+            raise HTTPException(status_code=404, detail="No available slots for this shop on the selected date")
+        if not isinstance(listing, DayAvailability):
+            raise HTTPException(status_code=422, detail="This listing cannot be represented as a bitmap")
+        return {"shop_id": shop_id, "date": ShopService.normalize_date(date), **listing.to_bitmap()}
+
+    @staticmethod
+    def get_calendar(db: Session, shop_id: int, start_date: date_cls, end_date: date_cls):
+        """
+        Per-day, per-barber free/booked/held counts for [start_date, end_date] with one
+        grouped query over barber_slots. Slot detail is fetched per day from the slot listing.
+        """
+        ShopService.check_calendar_range(start_date, end_date)
+
+        if SLOT_ENGINE == "virtual":
+            counts = ShopService._virtual_calendar_counts(db, shop_id, start_date, end_date)
+        else:
+            # Holds that lapsed but were not swept yet count as free, like in the listing
+            now = datetime.utcnow()
+            held = and_(BarberSlot.status == "held", BarberSlot.held_until > now)
+            free = and_(BarberSlot.is_booked == False, ~held)
+            rows = (
+                db.query(
+                    BarberSlot.slot_date,
+                    Barber.barber_id,
+                    Barber.barber_name,
+                    func.sum(case((free, 1), else_=0)).label("free"),
+                    func.sum(case((BarberSlot.is_booked == True, 1), else_=0)).label("booked"),
+                    func.sum(case((and_(BarberSlot.is_booked == False, held), 1), else_=0)).label("held")
+                )
+                .join(Barber, BarberSlot.barber_id == Barber.barber_id)
+                .filter(
+                    BarberSlot.shop_id == shop_id,
+                    BarberSlot.slot_date >= start_date,
+                    BarberSlot.slot_date <= end_date
+                )
+                .group_by(BarberSlot.slot_date, Barber.barber_id, Barber.barber_name)
+                .order_by(BarberSlot.slot_date, Barber.barber_id)
+                .all()
+            )
+            counts = [
+                (row.slot_date, row.barber_id, row.barber_name, int(row.free), int(row.booked), int(row.held))
+                for row in rows
+            ]
+
+        days = {}
+        for slot_date, barber_id, barber_name, free, booked, held in counts:
+            day = days.setdefault(slot_date, {"date": str(slot_date), "free": 0, "booked": 0, "held": 0, "barbers": []})
+            day["free"] += free
+            day["booked"] += booked
+            day["held"] += held
+            day["barbers"].append({
+                "barber_id": barber_id,
+                "barber_name": barber_name,
+                "free": free,
+                "booked": booked,
+                "held": held
+            })
+        return list(days.values())
+
+    @staticmethod
+    def check_calendar_range(start_date: date_cls, end_date: date_cls):
+        if end_date < start_date:
+            raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+        if (end_date - start_date).days >= CALENDAR_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"Date range is limited to {CALENDAR_MAX_DAYS} days")
+
+    @staticmethod
+    def _virtual_calendar_counts(db: Session, shop_id: int, start_date: date_cls, end_date: date_cls):
+        """The virtual engine has no rows to group, so counts come from each day's cached listing masks."""
+        counts = []
+        day = start_date
+        while day <= end_date:
+            listing = ShopService.cached_listing(db, shop_id, day.isoformat())
+            if isinstance(listing, DayAvailability):
+                for barber in listing.barbers:
+                    counts.append((day, barber.barber_id, barber.barber_name,
+                                   barber.free.bit_count(), barber.booked.bit_count(), barber.held.bit_count()))
+            else:
+                tallies = {}
+                for slot in listing:
+                    entry = tallies.setdefault(slot["barber_id"], [slot["barber_name"], 0, 0, 0])
+                    entry[{"available": 1, "held": 3}.get(slot["status"], 2)] += 1
+                counts.extend((day, barber_id, *entry) for barber_id, entry in tallies.items())
+            day += timedelta(days=1)
+        return counts
+
+    @staticmethod
+    def listing_slots(db: Session, shop_id: int, date: str, slot_minutes: int = None):
+        """The slot listing as one dict per slot (possibly empty)."""
+        listing = ShopService.cached_listing(db, shop_id, date, slot_minutes)
+        return listing.slots() if isinstance(listing, DayAvailability) else listing
+
+    @staticmethod
+    def cached_listing(db: Session, shop_id: int, date: str, slot_minutes: int = None):
+        """
+        Slot listing for a shop and date, served read-through from `slot_cache`.
+        Writes that change the listing invalidate it via `publish_slot_change`.
+        It is cached as a compact DayAvailability (bitmasks per barber); the rare listing
+        a bitmap cannot reproduce exactly is cached as the plain list instead.
+        `slot_minutes` only applies to the virtual engine; materialized rows have a fixed length.
+        """
+        date = ShopService.normalize_date(date)
+        if SLOT_ENGINE != "virtual":
+            slot_minutes = None
+        variant = slot_minutes
+        listing = slot_cache.get(shop_id, date, variant)
+        if listing is None:
+            read_started = slot_cache.now()
+            if SLOT_ENGINE == "virtual":
+                slots, valid_for = VirtualSlotService.compute_slots(db, shop_id, date, slot_minutes)
+            else:
+                slots, valid_for = ShopService._load_available_slots(db, shop_id, date)
+            try:
+                listing = DayAvailability.from_slots(slots, slot_minutes or SLOT_DURATION_MINUTES)
+            except ValueError:
+                listing = slots
+            slot_cache.put(shop_id, date, listing, variant, ttl_seconds=valid_for, read_started=read_started)
+        return listing
+
+    @staticmethod
+    def normalize_date(date: str) -> str:
+        """Canonical YYYY-MM-DD form used for cache keys and version stamps."""
+        try:
+            return datetime.fromisoformat(date).date().isoformat()
+        except ValueError:
+            return date  # left as-is: the query simply matches nothing
+
+    @staticmethod
+    def _load_available_slots(db: Session, shop_id: int, date: str):
+        """Return (slots, seconds until the earliest hold in the listing lapses or None)."""
         results = (
             db.query(
                 BarberSlot.slot_id,
                 Barber.barber_id,        # include barber_id
                 Barber.barber_name,
                 BarberSlot.slot_time,
-                BarberSlot.status
+                BarberSlot.status,
+                BarberSlot.held_until
             )
             .join(Barber, BarberSlot.barber_id == Barber.barber_id)
             .filter(BarberSlot.shop_id == shop_id, BarberSlot.slot_date == date)
@@ -47,21 +249,20 @@ class ShopService:
             .all()
         )
 
-        if not results:
-            raise HTTPException(status_code=404, detail="No available slots for this shop on the selected date")
-
-        # Build list including barber_id
-        return [
+        # Build list including barber_id; holds that lapsed but were not swept yet are free again
+        now = datetime.utcnow()
+        slots = [
             {
                 "slot_id": row.slot_id,
                 "barber_id": row.barber_id,       # <-- important
                 "barber_name": row.barber_name,
                 "slot_time": str(row.slot_time),
-                "status": row.status
+                "status": "available" if row.status == "held" and row.held_until and row.held_until <= now else row.status
             }
             for row in results
         ]
-
+        lapses = [row.held_until for row in results if row.status == "held" and row.held_until and row.held_until > now]
+        return slots, (min(lapses) - now).total_seconds() if lapses else None
         
     @staticmethod
     def create_shop_if_not_exists(db, owner_id, shop_data):
@@ -92,6 +293,7 @@ class ShopService:
         db.add(new_shop)
         db.commit()
         db.refresh(new_shop)
+        publish_shop_change()
 
         return {"message": "Shop created successfully", "shop_id": new_shop.shop_id}
 
@@ -99,39 +301,12 @@ class ShopService:
               
     @staticmethod
     def book_slots(db: Session, user_id: int, barber_id: int, shop_id: int, slot_ids: list[int]):
-        booked_slots = []
-
-        for slot_id in slot_ids:
-            slot = db.query(BarberSlot).filter(BarberSlot.slot_id == slot_id, BarberSlot.shop_id == shop_id).first()
-            if not slot:
-                raise HTTPException(status_code=404, detail=f"Slot {slot_id} not found")
-            if slot.is_booked:
-                raise HTTPException(status_code=400, detail=f"Slot {slot_id} already booked")
-
-            # mark slot booked
-            slot.is_booked = True
-            slot.status = "booked"
-
-            # create booking record
-            booking = Booking(
-                user_id=user_id,
-                barber_id=barber_id,
-                shop_id=shop_id,
-                slot_id=slot.slot_id,
-                booking_date=slot.slot_date,
-                booking_time=slot.slot_time,
-                status="booked",
-            )
-            db.add(booking)
-
-            booked_slots.append({
-                "slot_id": slot.slot_id,
-                "slot_date": str(slot.slot_date),
-                "slot_time": str(slot.slot_time),
-                "status": booking.status
-            })
+        with booking_http_errors():
+            booked_slots = BookingService.book_slots(db, user_id, barber_id, shop_id, slot_ids)
+        return ShopService.booking_response(user_id, barber_id, shop_id, booked_slots)
 
-        db.commit()
+    @staticmethod
+    def booking_response(user_id: int, barber_id: int, shop_id: int, booked_slots: list):
         return {
             "message": f"{len(booked_slots)} slots booked successfully",
             "user_id": user_id,
@@ -1,12 +1,13 @@
-from datetime import datetime, timedelta, timezone
 import random
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from src.db.models import User, EmailVerification
+from src.db.models import User
 from src.repositories.user_repo import UserRepository
-from src.core.security import hash_password, verify_password
+from src.core.security import hash_password, verify_and_update_password
 from src.utils.email import send_email_otp
 from src.core.logger import logger
+from src.core.config import OTP_TTL_SECONDS
+from src.core.otp_store import otp_store, verification_key, login_key, OTP_VALID, OTP_EXPIRED, OTP_MISSING
 
 class UserService:
 
@@ -37,34 +38,23 @@ class UserService:
         }
 
 
+    # OTPs live in otp_store (no DB writes); `db` stays in the signatures for the routes
     @staticmethod
     def send_verification_otp(db: Session, email: str):
         otp = str(random.randint(100000, 999999))
-        expiry = datetime.now(timezone.utc) + timedelta(minutes=5)
-
-        record = UserRepository.get_email_verification(db, email)
-        if record:
-            record.otp_code = otp
-            record.otp_expiry = expiry
-        else:
-            record = EmailVerification(email=email, otp_code=otp, otp_expiry=expiry)
-
-        UserRepository.create_or_update_email_verification(db, record)
+        otp_store.put(verification_key(email), otp, OTP_TTL_SECONDS)
         send_email_otp(email, otp)
         return {"msg": "Verification OTP sent"}
 
     @staticmethod
     def verify_email(db: Session, email: str, otp: str):
-        record = UserRepository.get_email_verification(db, email)
-        if not record:
+        outcome = otp_store.verify(verification_key(email), otp)
+        if outcome == OTP_MISSING:
             raise HTTPException(status_code=404, detail="Email not found")
-        if record.otp_code != otp:
-            raise HTTPException(status_code=400, detail="Invalid OTP")
-        if datetime.now(timezone.utc) > record.otp_expiry.replace(tzinfo=timezone.utc):
-            UserRepository.delete_email_verification(db, record)
+        if outcome == OTP_EXPIRED:
             raise HTTPException(status_code=400, detail="OTP expired")
-
-        UserRepository.delete_email_verification(db, record)
+        if outcome != OTP_VALID:
+            raise HTTPException(status_code=400, detail="Invalid OTP")
         return {"msg": "Email verified successfully"}
 
     @staticmethod
@@ -72,8 +62,14 @@ class UserService:
         user = UserRepository.get_user_by_email(db, email)
         if not user or user.role != role:
             raise HTTPException(status_code=401, detail="Invalid email or role")
-        if not verify_password(password, user.hashed_password):
+        valid, new_hash = verify_and_update_password(password, user.hashed_password)
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid email or password")
+        if new_hash:
+            # Stored with outdated bcrypt parameters (e.g. BCRYPT_ROUNDS changed)
+            user.hashed_password = new_hash
+            UserRepository.update_user(db, user)
+            logger.info(f"[LOGIN] Password rehashed: {email}")
 
         logger.info(f"[LOGIN] Success: {email}")
         return {
@@ -90,13 +86,7 @@ class UserService:
             raise HTTPException(status_code=401, detail="Invalid email or role")
 
         otp = str(random.randint(100000, 999999))
-        expiry = datetime.now(timezone.utc) + timedelta(minutes=5)
-
-        user.otp_code = otp
-        user.otp_expiry = expiry
-        user.otp_channel = "email"
-
-        UserRepository.update_user(db, user)
+        otp_store.put(login_key(user.email), otp, OTP_TTL_SECONDS)
         send_email_otp(user.email, otp)
 
         return {"msg": f"OTP sent successfully for {role}"}
@@ -107,13 +97,11 @@ class UserService:
         user = UserRepository.get_user_by_email(db, email)
         if not user or user.role != role:
             raise HTTPException(status_code=401, detail="Invalid email or role")
-        if user.otp_code != otp:
-            raise HTTPException(status_code=400, detail="Invalid OTP")
-        if datetime.now(timezone.utc) > user.otp_expiry.replace(tzinfo=timezone.utc):
+        outcome = otp_store.verify(login_key(user.email), otp)
+        if outcome == OTP_EXPIRED:
             raise HTTPException(status_code=400, detail="OTP expired")
-
-        user.otp_code, user.otp_expiry = None, None
-        UserRepository.update_user(db, user)
+        if outcome != OTP_VALID:
+            raise HTTPException(status_code=400, detail="Invalid OTP")
 
         logger.info(f"[OTP LOGIN] Success: {email} ({role})")
         return {
@@ -0,0 +1,397 @@
+from bisect import bisect_left, bisect_right
+from datetime import date as date_cls, datetime, time, timedelta
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, true, update
+from sqlalchemy.orm import Session
+from src.db.models import Shop, Barber, BarberSlot, BarberAvailability, Booking
+from src.core.config import SLOT_DURATION_MINUTES
+from src.routes.slot_generator import insert_slots_ignoring_duplicates
+
+# Virtual slots have no row in barber_slots yet, so they get a negative id that encodes
+# (barber_id, date, start minute, duration). Bits: barber_id << 35 | days since epoch << 20 |
+# duration << 11 | minute; durations up to 511 minutes, and ids stay below 2**53 (exact in
+# JSON clients) for barber ids below 2**18.
+VIRTUAL_SLOT_EPOCH = date_cls(2020, 1, 1)
+
+
+def encode_virtual_slot_id(barber_id: int, slot_date: date_cls, start_minute: int,
+                           duration: int = SLOT_DURATION_MINUTES) -> int:
+    days = (slot_date - VIRTUAL_SLOT_EPOCH).days
+    return -((barber_id << 35) | (days << 20) | (duration << 11) | start_minute)
+
+
+def decode_virtual_slot_id(slot_id: int):
+    value = -slot_id
+    barber_id = value >> 35
+    slot_date = VIRTUAL_SLOT_EPOCH + timedelta(days=(value >> 20) & 0x7FFF)
+    duration = (value >> 11) & 0x1FF
+    start_minute = value & 0x7FF
+    return barber_id, slot_date, start_minute, duration
+
+
+def _to_minutes(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def _to_time(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
+
+
+def parse_date(value) -> date_cls:
+    """A date or YYYY-MM-DD string as a date; anything else is a 400."""
+    if isinstance(value, date_cls):
+        return value
+    try:
+        return date_cls.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date, expected YYYY-MM-DD")
+
+
+def _length(row) -> int:
+    """Minutes a booked or held slot row occupies."""
+    return row.duration_minutes or SLOT_DURATION_MINUTES
+
+
+def _not_before(slot_date: date_cls) -> int:
+    """First start minute that is not in the past on `slot_date` (past dates: none)."""
+    now_dt = datetime.now()
+    if slot_date < now_dt.date():
+        return 24 * 60
+    if slot_date > now_dt.date():
+        return 0
+    return now_dt.hour * 60 + now_dt.minute + (1 if now_dt.second or now_dt.microsecond else 0)
+
+
+class SlotUnavailableError(ValueError):
+    """A virtual slot within working hours that overlaps a booking or another customer's hold."""
+
+    def __init__(self, message: str, held: bool = False):
+        super().__init__(message)
+        self.held = held
+
+
+class IntervalSet:
+    """
+    Sorted, non-overlapping half-open [start, end) intervals, in minutes since midnight.
+    Adding merges overlapping/adjacent intervals, subtracting splits them.
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in intervals:
+            self.add(start, end)
+
+    def add(self, start: int, end: int):
+        if start >= end:
+            return
+        # Every interval touching [start, end] is merged into one
+        lo = bisect_left(self._ends, start)
+        hi = bisect_right(self._starts, end)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+
+    def subtract(self, start: int, end: int):
+        if start >= end:
+            return
+        lo = bisect_right(self._ends, start)
+        hi = bisect_left(self._starts, end)
+        if lo >= hi:
+            return
+        remainder = []
+        if self._starts[lo] < start:
+            remainder.append((self._starts[lo], start))
+        if self._ends[hi - 1] > end:
+            remainder.append((end, self._ends[hi - 1]))
+        self._starts[lo:hi] = [s for s, _ in remainder]
+        self._ends[lo:hi] = [e for _, e in remainder]
+
+    def contains(self, start: int, end: int) -> bool:
+        i = bisect_right(self._starts, start) - 1
+        return i >= 0 and self._ends[i] >= end
+
+    def slots(self, duration: int, not_before: int = 0):
+        """Yield the start minute of every `duration`-long slot that fits, stepping from each interval start."""
+        for start, end in self:
+            current = start
+            while current + duration <= end:
+                if current >= not_before:
+                    yield current
+                current += duration
+
+    def __iter__(self):
+        return iter(zip(self._starts, self._ends))
+
+    def __bool__(self):
+        return bool(self._starts)
+
+    def __repr__(self):
+        return f"IntervalSet({list(self)!r})"
+
+
+class VirtualSlotService:
+    """
+    Availability engine that computes slots on the fly from barber hours, per-date
+    BarberAvailability overrides and existing bookings. barber_slots is only read
+    for the few rows currently held during checkout.
+    """
+
+    @staticmethod
+    def _working_hours(db: Session, shop_id: int, slot_date: date_cls, barber_id: int = None, city: str = None):
+        """
+        Return {barber_id: (barber_name, IntervalSet)} of working hours for the date, overrides applied.
+        With `city`, the barbers of every open shop in the city instead of those of `shop_id`.
+        """
+        query = (
+            db.query(
+                Barber.barber_id,
+                Barber.barber_name,
+                Barber.start_time,
+                Barber.end_time,
+                Barber.generate_daily,
+                BarberAvailability.is_available.label("override_available"),
+                BarberAvailability.start_time.label("override_start"),
+                BarberAvailability.end_time.label("override_end"),
+                BarberAvailability.id.label("override_id")
+            )
+            .join(Shop, Shop.shop_id == Barber.shop_id)
+            .outerjoin(BarberAvailability, and_(
+                BarberAvailability.barber_id == Barber.barber_id,
+                BarberAvailability.available_date == slot_date
+            ))
+            .filter(
+                Shop.city == city if city is not None else Barber.shop_id == shop_id,
+                Barber.is_available == True,
+                Shop.is_open == True
+            )
+        )
+        if barber_id is not None:
+            query = query.filter(Barber.barber_id == barber_id)
+
+        hours = {}
+        for row in query.all():
+            if row.override_id is not None:
+                if not row.override_available:
+                    continue
+                start = row.override_start or row.start_time
+                end = row.override_end or row.end_time
+            elif row.generate_daily:
+                start, end = row.start_time, row.end_time
+            else:
+                continue
+
+            if not start or not end:
+                continue
+            hours[row.barber_id] = (row.barber_name, IntervalSet([(_to_minutes(start), _to_minutes(end))]))
+        return hours
+
+    @staticmethod
+    def _taken(db: Session, shop_id: int, slot_date: date_cls, barber_ids: list):
+        """
+        Return (bookings, live holds) of the barbers on the date, each with the duration_minutes of its slot.
+        `shop_id` may be None when the barbers span several shops.
+        """
+        if not barber_ids:
+            return [], []
+
+        bookings = (
+            db.query(Booking.slot_id, Booking.barber_id, Booking.booking_time, BarberSlot.duration_minutes)
+            .outerjoin(BarberSlot, BarberSlot.slot_id == Booking.slot_id)
+            .filter(
+                Booking.shop_id == shop_id if shop_id is not None else true(),
+                Booking.booking_date == slot_date,
+                Booking.barber_id.in_(barber_ids),
+                Booking.status == "booked"
+            )
+            .all()
+        )
+        holds = (
+            db.query(
+                BarberSlot.slot_id,
+                BarberSlot.barber_id,
+                BarberSlot.slot_time,
+                BarberSlot.duration_minutes,
+                BarberSlot.held_by,
+                BarberSlot.held_until
+            )
+            .filter(
+                BarberSlot.shop_id == shop_id if shop_id is not None else true(),
+                BarberSlot.slot_date == slot_date,
+                BarberSlot.barber_id.in_(barber_ids),
+                BarberSlot.status == "held",
+                BarberSlot.is_booked == False,
+                BarberSlot.held_until > datetime.utcnow()
+            )
+            .all()
+        )
+        return bookings, holds
+
+    @staticmethod
+    def get_available_slots(db: Session, shop_id: int, date, slot_minutes: int = None):
+        slots, _ = VirtualSlotService.compute_slots(db, shop_id, date, slot_minutes)
+        if not slots:
+            raise HTTPException(status_code=404, detail="No available slots for this shop on the selected date")
+        return slots
+
+    @staticmethod
+    def compute_slots(db: Session, shop_id: int, date, slot_minutes: int = None):
+        """Return (slots, seconds until the listing changes by itself or None): a hold lapses, or today's first open slot starts."""
+        slot_date = parse_date(date)
+        slot_minutes = slot_minutes or SLOT_DURATION_MINUTES
+
+        hours = VirtualSlotService._working_hours(db, shop_id, slot_date)
+        bookings, holds = VirtualSlotService._taken(db, shop_id, slot_date, list(hours))
+        entries = VirtualSlotService._entries(slot_date, slot_minutes, hours, bookings, holds)
+
+        valid_for = None
+        if holds:
+            valid_for = (min(row.held_until for row in holds) - datetime.utcnow()).total_seconds()
+        # Today's listing also changes when the earliest open slot starts and drops out
+        open_starts = [start for _, start, slot in entries if slot["status"] == "available"]
+        if open_starts and slot_date == datetime.now().date():
+            starts_in = (datetime.combine(slot_date, _to_time(min(open_starts))) - datetime.now()).total_seconds()
+            valid_for = starts_in if valid_for is None else min(valid_for, starts_in)
+        return [entry[2] for entry in entries], valid_for
+
+    @staticmethod
+    def compute_city_slots(db: Session, city: str, date, slot_minutes: int = None):
+        """
+        Open slots of every barber of the open shops in `city`, ordered by (barber_id, slot_time).
+        The same three set-based reads as `compute_slots`, however many shops the city has.
+        """
+        slot_date = parse_date(date)
+        hours = VirtualSlotService._working_hours(db, None, slot_date, city=city)
+        bookings, holds = VirtualSlotService._taken(db, None, slot_date, list(hours))
+        entries = VirtualSlotService._entries(slot_date, slot_minutes or SLOT_DURATION_MINUTES, hours, bookings, holds)
+        return [slot for _, _, slot in entries if slot["status"] == "available"]
+
+    @staticmethod
+    def _entries(slot_date: date_cls, slot_minutes: int, hours: dict, bookings: list, holds: list):
+        """(barber_id, start minute, slot) of the booked, held and open slots, ordered by barber and start."""
+        not_before = _not_before(slot_date)
+        entries = []
+        taken = [(row.slot_id, row.barber_id, row.booking_time, _length(row), "booked") for row in bookings]
+        taken += [(row.slot_id, row.barber_id, row.slot_time, _length(row), "held") for row in holds]
+        for slot_id, barber_id, slot_time, length, status in taken:
+            barber_name, free = hours[barber_id]
+            start = _to_minutes(slot_time)
+            free.subtract(start, start + length)
+            entries.append((barber_id, start, {
+                "slot_id": slot_id,
+                "barber_id": barber_id,
+                "barber_name": barber_name,
+                "slot_time": str(slot_time),
+                "status": status
+            }))
+
+        for barber_id, (barber_name, free) in hours.items():
+            for start in free.slots(slot_minutes, not_before):
+                entries.append((barber_id, start, {
+                    "slot_id": encode_virtual_slot_id(barber_id, slot_date, start, slot_minutes),
+                    "barber_id": barber_id,
+                    "barber_name": barber_name,
+                    "slot_time": str(_to_time(start)),
+                    "status": "available"
+                }))
+
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        return entries
+
+    @staticmethod
+    def materialize_slots(db: Session, shop_id: int, barber_id: int, slot_ids: list[int], user_id: int = None) -> list[int]:
+        """
+        Turn virtual (negative) slot ids into real barber_slots rows so they can be booked.
+        Real ids are passed through untouched; nothing is queried when there are no virtual ids.
+        The caller's transaction is used, so the rows are only kept if the booking commits.
+
+        A virtual id is checked against the same free intervals `compute_slots` lists from:
+        [start, start + duration) (both from the id) has to lie within working hours, must not
+        overlap a booking or a live hold of anyone but `user_id`, and must not have started.
+        The row is stored with that duration, so it occupies the same interval once booked.
+        Raises ValueError for ids that do not decode to a slot of this barber or are in the
+        past, SlotUnavailableError for slots that are taken.
+        """
+        virtual_ids = [slot_id for slot_id in slot_ids if slot_id < 0]
+        if not virtual_ids:
+            return slot_ids
+
+        keys = {}
+        durations = {}
+        by_date = {}
+        for slot_id in virtual_ids:
+            slot_barber_id, slot_date, start, duration = decode_virtual_slot_id(slot_id)
+            if slot_barber_id != barber_id or not duration:
+                raise ValueError(f"Slot {slot_id} not found")
+            keys[slot_id] = (slot_date, start)
+            durations[(slot_date, start)] = duration
+            by_date.setdefault(slot_date, []).append((slot_id, start, duration))
+
+        for slot_date, starts in by_date.items():
+            hours = VirtualSlotService._working_hours(db, shop_id, slot_date, barber_id)
+            if barber_id not in hours:
+                raise ValueError(f"Slot {starts[0][0]} not found")
+            working = hours[barber_id][1]
+            not_booked = IntervalSet(working)
+            free = IntervalSet(working)
+            bookings, holds = VirtualSlotService._taken(db, shop_id, slot_date, [barber_id])
+            for row in bookings:
+                start = _to_minutes(row.booking_time)
+                not_booked.subtract(start, start + _length(row))
+                free.subtract(start, start + _length(row))
+            for row in holds:
+                if row.held_by != user_id:
+                    start = _to_minutes(row.slot_time)
+                    free.subtract(start, start + _length(row))
+
+            not_before = _not_before(slot_date)
+            for slot_id, start, duration in starts:
+                end = start + duration
+                if not working.contains(start, end):
+                    raise ValueError(f"Slot {slot_id} not found")
+                if start < not_before:
+                    raise ValueError(f"Slot {slot_id} is in the past")
+                if not not_booked.contains(start, end):
+                    raise SlotUnavailableError(f"Slot {slot_id} is already booked")
+                if not free.contains(start, end):
+                    raise SlotUnavailableError(f"Slot {slot_id} is held by another customer", held=True)
+                # Slots of one request must not overlap each other either
+                not_booked.subtract(start, end)
+                free.subtract(start, end)
+
+        city = db.query(Shop.city).filter(Shop.shop_id == shop_id).scalar()
+        insert_slots_ignoring_duplicates(db, [
+            {
+                "barber_id": barber_id,
+                "shop_id": shop_id,
+                "city": city,
+                "slot_date": slot_date,
+                "slot_time": _to_time(start),
+                "duration_minutes": durations[(slot_date, start)],
+                "status": "available",
+                "is_booked": False
+            }
+            for slot_date, start in keys.values()
+        ])
+
+        rows = db.query(BarberSlot.slot_id, BarberSlot.slot_date, BarberSlot.slot_time, BarberSlot.duration_minutes).filter(
+            BarberSlot.barber_id == barber_id,
+            or_(*[
+                and_(BarberSlot.slot_date == slot_date, BarberSlot.slot_time == _to_time(start))
+                for slot_date, start in keys.values()
+            ])
+        ).all()
+        real_ids = {(row.slot_date, _to_minutes(row.slot_time)): row.slot_id for row in rows}
+
+        # A free row left at the same start (released hold, cancelled booking) takes the new length
+        resized = [
+            {"slot_id": row.slot_id, "duration_minutes": durations[(row.slot_date, _to_minutes(row.slot_time))]}
+            for row in rows
+            if row.duration_minutes != durations[(row.slot_date, _to_minutes(row.slot_time))]
+        ]
+        if resized:
+            db.execute(update(BarberSlot), resized)
+
+        return [real_ids[keys[slot_id]] if slot_id < 0 else slot_id for slot_id in slot_ids]
@@ -1,22 +1,248 @@
-import smtplib, os
+import heapq
+import itertools
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
 from fastapi import HTTPException
 from src.core.logger import logger
-from src.core.config import SMTP_EMAIL, SMTP_PASSWORD
+from src.core.metrics import Histogram
+from src.core.config import (
+    SMTP_EMAIL, SMTP_PASSWORD, SMTP_HOST, SMTP_PORT, SMTP_STARTTLS, SMTP_TIMEOUT_SECONDS,
+    MAIL_WORKERS, MAIL_QUEUE_SIZE, MAIL_BATCH_SIZE, MAIL_MAX_ATTEMPTS, MAIL_RETRY_BASE_SECONDS, MAIL_IDLE_SECONDS,
+    OTP_TTL_SECONDS
+)
 
-def send_email_otp(receiver_email: str, otp: str):
-    sender_email = SMTP_EMAIL
-    app_password = SMTP_PASSWORD
+# Delivery latency buckets (enqueue -> accepted by the SMTP server), in milliseconds
+DELIVERY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
 
-    subject = "Your OTP Verification Code"
-    body = f"Your OTP is {otp}. It will expire in 5 minutes."
-    message = f"Subject: {subject}\n\n{body}"
 
+def smtp_connection() -> smtplib.SMTP:
+    """Open and authenticate a connection to the configured SMTP server."""
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_SECONDS)
     try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
+        if SMTP_STARTTLS:
             server.starttls()
-            server.login(sender_email, app_password)
-            server.sendmail(sender_email, receiver_email, message)
-        logger.info(f"[EMAIL OTP] Sent OTP to {receiver_email}")
-    except Exception as e:
-        logger.error(f"[EMAIL OTP] Failed to send OTP: {e}")
-        raise HTTPException(status_code=500, detail="Failed to send OTP. Try again later.")
+        if SMTP_EMAIL and SMTP_PASSWORD:
+            server.login(SMTP_EMAIL, SMTP_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+class OutgoingMail:
+    def __init__(self, receiver: str, subject: str, body: str, sender: str):
+        message = EmailMessage()
+        message["From"] = sender
+        message["To"] = receiver
+        message["Subject"] = subject
+        message.set_content(body)
+        self.receiver = receiver
+        self.message = message.as_string()
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+
+
+class MailQueue:
+    """
+    Outbound mail, delivered off the request path.
+
+    `enqueue` only puts the message on a bounded queue. Worker threads each keep one
+    authenticated SMTP connection open across messages, drain up to `batch_size` messages per
+    wake-up, and close the connection after `idle_seconds` without work. Transient failures are
+    retried with exponential backoff (retries wait in a min-heap, like hold expiries); refused
+    recipients are not retried. `connection_factory` is injectable so tests can use a stand-in.
+    """
+
+    def __init__(self, connection_factory=smtp_connection, sender: str = SMTP_EMAIL, workers: int = MAIL_WORKERS,
+                 queue_size: int = MAIL_QUEUE_SIZE, batch_size: int = MAIL_BATCH_SIZE,
+                 max_attempts: int = MAIL_MAX_ATTEMPTS, retry_base_seconds: float = MAIL_RETRY_BASE_SECONDS,
+                 idle_seconds: float = MAIL_IDLE_SECONDS):
+        self.connection_factory = connection_factory
+        self.sender = sender or "noreply@localhost"
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.idle_seconds = idle_seconds
+        self.delivery_ms = Histogram(DELIVERY_BUCKETS_MS)
+        self.counters = {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0, "rejected": 0, "connections": 0}
+        self._queue = queue.Queue(queue_size)
+        self._retries = []  # (due at, seq, mail)
+        self._seq = itertools.count()
+        self._unfinished = 0
+        self._idle = threading.Condition()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopping = threading.Event()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"mail-worker-{index}", daemon=True)
+                for index in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Give queued messages up to `timeout` seconds to go out, then stop the workers."""
+        if self._threads:
+            self.wait_idle(timeout)
+        self._stopping.set()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)  # wake a worker blocked on the queue
+            except queue.Full:
+                pass
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def enqueue(self, receiver: str, subject: str, body: str):
+        self.start()
+        mail = OutgoingMail(receiver, subject, body, self.sender)
+        with self._idle:
+            self._unfinished += 1
+        try:
+            self._queue.put_nowait(mail)
+        except queue.Full:
+            self._done()
+            self._count("rejected")
+            raise HTTPException(status_code=503, detail="Email service is busy. Try again later.")
+        self._count("enqueued")
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until every enqueued message was sent or given up on."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def _done(self):
+        with self._idle:
+            self._unfinished -= 1
+            if self._unfinished == 0:
+                self._idle.notify_all()
+
+    def _next_batch(self) -> list:
+        now = time.monotonic()
+        batch = []
+        with self._lock:
+            while self._retries and self._retries[0][0] <= now and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(self._retries)[2])
+            next_retry = self._retries[0][0] - now if self._retries else None
+
+        if not batch:
+            # Wake up for the next retry, and at least once a second to notice stop()
+            timeout = min(1.0, next_retry) if next_retry is not None else 1.0
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return [mail for mail in batch if mail is not None]
+
+    def _work(self):
+        connection, last_used = None, time.monotonic()
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if batch:
+                for mail in batch:
+                    connection = self._deliver(connection, mail)
+                last_used = time.monotonic()
+            elif connection is not None and time.monotonic() - last_used >= self.idle_seconds:
+                connection = self._close(connection)
+        self._close(connection)
+
+    def _connect(self):
+        connection = self.connection_factory()
+        self._count("connections")
+        return connection
+
+    def _close(self, connection):
+        if connection is not None:
+            try:
+                connection.quit()
+            except Exception:
+                pass
+        return None
+
+    def _deliver(self, connection, mail: OutgoingMail):
+        """Send one message; returns the connection to use for the next one."""
+        mail.attempts += 1
+        try:
+            try:
+                if connection is None:
+                    connection = self._connect()
+                connection.sendmail(self.sender, [mail.receiver], mail.message)
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped our idle connection: reconnect once before counting a failure
+                connection = self._connect()
+                connection.sendmail(self.sender, [mail.receiver], mail.message)
+        except smtplib.SMTPRecipientsRefused as e:
+            logger.error(f"[EMAIL] Recipient refused {mail.receiver}: {e}")
+            self._count("failed")
+            self._done()
+            return connection
+        except (smtplib.SMTPException, OSError) as e:
+            self._retry_or_fail(mail, e)
+            return self._close(connection)
+
+        self.delivery_ms.observe((time.monotonic() - mail.enqueued_at) * 1000)
+        self._count("sent")
+        self._done()
+        logger.info(f"[EMAIL] Sent to {mail.receiver}")
+        return connection
+
+    def _retry_or_fail(self, mail: OutgoingMail, error: Exception):
+        if mail.attempts >= self.max_attempts:
+            logger.error(f"[EMAIL] Giving up on {mail.receiver} after {mail.attempts} attempts: {error}")
+            self._count("failed")
+            self._done()
+            return
+        delay = self.retry_base_seconds * 2 ** (mail.attempts - 1)
+        logger.warning(f"[EMAIL] Send to {mail.receiver} failed ({error}), retry in {delay:.0f}s")
+        with self._lock:
+            heapq.heappush(self._retries, (time.monotonic() + delay, next(self._seq), mail))
+            self.counters["retried"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters, retrying = dict(self.counters), len(self._retries)
+        return {
+            **counters,
+            "queued": self._queue.qsize(),
+            "retrying": retrying,
+            "workers": len(self._threads),
+            "delivery_ms": self.delivery_ms.snapshot()
+        }
+
+
+mail_queue = MailQueue()
+
+
+def expires_in(seconds: int) -> str:
+    """`seconds` as "N minutes" when it is a whole number of minutes, else "N seconds"."""
+    if seconds % 60 == 0:
+        minutes = seconds // 60
+        return f"{minutes} minute{'' if minutes == 1 else 's'}"
+    return f"{seconds} second{'' if seconds == 1 else 's'}"
+
+
+def send_email_otp(receiver_email: str, otp: str):
+    subject = "Your OTP Verification Code"
+    body = f"Your OTP is {otp}. It will expire in {expires_in(OTP_TTL_SECONDS)}."
+    mail_queue.enqueue(receiver_email, subject, body)
+    logger.info(f"[EMAIL OTP] Queued OTP for {receiver_email}")
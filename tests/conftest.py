@@ -0,0 +1,44 @@
+import pytest
+from datetime import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.db.database import Base
+from src.db.models import User, Shop, Barber
+from src.routes import slot_generator
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory SQLite database with all tables."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def shop(db):
+    """An open shop with one barber working 09:00 - 17:00 and two customers (user ids 2 and 3)."""
+    owner = User(username="owner", email="owner@example.com", role="shop_owner")
+    db.add_all([owner, User(username="alice", role="customer"), User(username="bob", role="customer")])
+    db.flush()
+    new_shop = Shop(owner_id=owner.id, shop_name="Fade", address="1 Main St", city="Hyderabad", state="TS",
+                    open_time=time(9), close_time=time(17), is_open=True)
+    db.add(new_shop)
+    db.flush()
+    barber = Barber(barber_name="Ravi", shop_id=new_shop.shop_id, start_time=time(9), end_time=time(17),
+                    is_available=True, generate_daily=True)
+    db.add(barber)
+    db.commit()
+    return {"shop_id": new_shop.shop_id, "barber_id": barber.barber_id, "alice": 2, "bob": 3}
+
+
+@pytest.fixture
+def agent_sessions(db, monkeypatch):
+    """Point the slot agent's own sessions (it opens SessionLocal itself) at the test database."""
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    monkeypatch.setattr(slot_generator, "SessionLocal", factory)
+    return factory
@@ -0,0 +1,20 @@
+from contextlib import contextmanager
+from src.db.query_stats import track_queries
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeats: int = None):
+    """
+    Fail when the block runs more than `max_queries` statements, or (with `max_repeats`)
+    repeats one statement shape more than that many times.
+
+        with query_budget(3):
+            client.get(f"/shops/{shop_id}/slots/", params={"date": day})
+    """
+    with track_queries("query_budget") as stats:
+        yield stats
+    shapes = "\n".join(f"  {count}x {shape}" for shape, count in sorted(stats.shapes.items(), key=lambda item: -item[1]))
+    assert stats.count <= max_queries, f"{stats.count} statements, budget {max_queries}:\n{shapes}"
+    if max_repeats is not None:
+        worst = max(stats.shapes.values(), default=0)
+        assert worst <= max_repeats, f"a statement ran {worst} times, budget {max_repeats}:\n{shapes}"
@@ -0,0 +1,104 @@
+import pytest
+from datetime import date, timedelta
+from src.core.bitmap import BarberDayMask, DayAvailability
+from src.core.config import SLOT_DURATION_MINUTES
+from src.core.slot_cache import SlotCache
+from src.routes.slot_generator import generate_barber_slots
+from src.services import shop_service
+from src.services.shop_service import ShopService
+from src.services.virtual_slot_service import encode_virtual_slot_id
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def _slot(slot_id, barber_id, slot_time, status="available"):
+    return {"slot_id": slot_id, "barber_id": barber_id, "barber_name": f"b{barber_id}",
+            "slot_time": slot_time, "status": status}
+
+
+def test_round_trip_keeps_listing():
+    slots = [
+        _slot(1, 1, "09:00:00"),
+        _slot(2, 1, "10:00:00", "booked"),
+        _slot(3, 1, "12:00:00", "held"),
+        _slot(7, 2, "09:30:00"),
+        _slot(8, 2, "10:30:00"),
+    ]
+    day = DayAvailability.from_slots(slots, 60)
+
+    assert day.slots() == slots
+    assert len(day) == 5
+
+
+def test_masks_and_lookup_table():
+    day = DayAvailability.from_slots([
+        _slot(1, 1, "09:00:00", "booked"),
+        _slot(2, 1, "10:00:00"),
+        _slot(3, 1, "11:00:00"),
+    ], 60)
+    bitmap = day.to_bitmap()
+
+    assert bitmap["barbers"] == [{"barber_id": 1, "barber_name": "b1", "offset_minutes": 540, "step_minutes": 60,
+                                  "slot_ids": [1, 2, 3]}]
+    assert bitmap["free"] == ["6"]
+    assert bitmap["booked"] == ["1"]
+    assert bitmap["held"] == ["0"]
+
+
+def test_finer_grid_when_starts_are_off_step():
+    day = DayAvailability.from_slots([_slot(1, 1, "09:00:00"), _slot(2, 1, "09:30:00")], 60)
+
+    assert day.barbers[0].step == 30
+    assert [slot["slot_time"] for slot in day.slots()] == ["09:00:00", "09:30:00"]
+
+
+def test_first_free_and_window():
+    barber = BarberDayMask(1, "b1", offset=540, step=60, free=0b10110)
+
+    assert barber.any_free()
+    assert barber.first_free() == 600
+    assert barber.free_in_window(600, 720) == 0b00110
+    assert barber.free_in_window(0, 540) == 0
+    assert BarberDayMask(1, "b1", 540, 60).first_free() is None
+
+
+def test_unrepresentable_listing_is_rejected():
+    with pytest.raises(ValueError):
+        DayAvailability.from_slots([_slot(1, 1, "09:00:00", "cancelled")], 60)
+    with pytest.raises(ValueError):
+        DayAvailability.from_slots([_slot(1, 1, "09:00:00"), _slot(2, 1, "09:00:00")], 60)
+
+
+@pytest.fixture
+def listing_engine(monkeypatch):
+    def use(engine):
+        monkeypatch.setattr(shop_service, "SLOT_ENGINE", engine)
+        monkeypatch.setattr(shop_service, "slot_cache", SlotCache())
+    return use
+
+
+def test_materialized_bitmap_ignores_duration(db, shop, agent_sessions, listing_engine):
+    listing_engine("materialized")
+    generate_barber_slots()
+
+    # The 45-minute request must neither change the grid nor be cached for the default one
+    odd = ShopService.get_availability_bitmap(db, shop["shop_id"], TOMORROW.isoformat(), 45)
+    plain = ShopService.get_availability_bitmap(db, shop["shop_id"], TOMORROW.isoformat())
+
+    assert odd == plain
+    [barber] = plain["barbers"]
+    assert barber["step_minutes"] == SLOT_DURATION_MINUTES
+    assert len(barber["slot_ids"]) == int(plain["free"][0], 16).bit_count()
+
+
+def test_virtual_bitmap_slot_ids_can_be_booked(db, shop, listing_engine):
+    listing_engine("virtual")
+
+    bitmap = ShopService.get_availability_bitmap(db, shop["shop_id"], TOMORROW.isoformat(), 30)
+    [barber] = bitmap["barbers"]
+    assert barber["step_minutes"] == 30
+    assert barber["slot_ids"][0] == encode_virtual_slot_id(shop["barber_id"], TOMORROW, 9 * 60, 30)
+
+    [booked] = ShopService.book_slots(db, shop["alice"], shop["barber_id"], shop["shop_id"],
+                                      barber["slot_ids"][:1])["booked_slots"]
+    assert booked["slot_time"] == "09:00:00"
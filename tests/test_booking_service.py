@@ -0,0 +1,134 @@
+import pytest
+from datetime import date, time, timedelta
+from fastapi import HTTPException
+from sqlalchemy import event
+from src.db.models import BarberSlot, Booking
+from src.services import booking_service
+from src.services.booking_service import BookingService, SlotAlreadyBookedError, SlotHeldError
+from src.services.hold_service import SlotHoldService
+from src.services.shop_service import ShopService
+from src.services.virtual_slot_service import encode_virtual_slot_id
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def _slots(db, shop, *hours, booked=()):
+    slots = [
+        BarberSlot(barber_id=shop["barber_id"], shop_id=shop["shop_id"], slot_date=TOMORROW, slot_time=time(hour),
+                   status="booked" if hour in booked else "available", is_booked=hour in booked)
+        for hour in hours
+    ]
+    db.add_all(slots)
+    db.commit()
+    return [slot.slot_id for slot in slots]
+
+
+def _book(db, shop, user, slot_ids, mode="pessimistic"):
+    return BookingService.book_slots(db, shop[user], shop["barber_id"], shop["shop_id"], slot_ids, mode=mode)
+
+
+def _lose_races(db, times: int) -> dict:
+    """Bump every slot's version right before the next `times` optimistic claims, like a concurrent booking."""
+    races = {"left": times, "claims": 0}
+
+    @event.listens_for(db.get_bind(), "before_cursor_execute")
+    def bump_versions(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE barber_slots") and "barber_slots.version = ?" in statement:
+            races["claims"] += 1
+            if races["left"]:
+                races["left"] -= 1
+                cursor.execute("UPDATE barber_slots SET version = version + 1")
+
+    return races
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(booking_service, "BOOKING_RETRY_BACKOFF_MS", 0)
+    monkeypatch.setattr(booking_service, "BOOKING_MAX_RETRIES", 2)
+
+
+def test_books_every_slot_or_none(db, shop):
+    free_10, free_11, taken_12 = _slots(db, shop, 10, 11, 12, booked=(12,))
+
+    with pytest.raises(SlotAlreadyBookedError, match=f"Slot {taken_12} "):
+        _book(db, shop, "alice", [free_10, free_11, taken_12])
+    assert db.query(BarberSlot).filter(BarberSlot.is_booked == True).count() == 1
+    assert db.query(Booking).count() == 0
+
+    booked = _book(db, shop, "alice", [free_10, free_11])
+    assert [slot["slot_id"] for slot in booked] == [free_10, free_11]
+    assert db.query(Booking).filter(Booking.user_id == shop["alice"]).count() == 2
+
+
+def test_booked_slot_is_a_409_conflict(db, shop):
+    [slot_id] = _slots(db, shop, 10)
+    ShopService.book_slots(db, shop["bob"], shop["barber_id"], shop["shop_id"], [slot_id])
+
+    with pytest.raises(HTTPException) as exc_info:
+        ShopService.book_slots(db, shop["alice"], shop["barber_id"], shop["shop_id"], [slot_id])
+    assert exc_info.value.status_code == 409
+
+
+def test_slot_held_by_another_customer(db, shop):
+    [slot_id] = _slots(db, shop, 10)
+    SlotHoldService.hold_slots(db, shop["bob"], shop["barber_id"], shop["shop_id"], [slot_id])
+
+    with pytest.raises(SlotHeldError):
+        _book(db, shop, "alice", [slot_id])
+    assert _book(db, shop, "bob", [slot_id])[0]["status"] == "booked"
+
+
+def test_virtual_slot_is_materialized_and_booked(db, shop):
+    virtual_id = encode_virtual_slot_id(shop["barber_id"], TOMORROW, 14 * 60)
+
+    [booked] = _book(db, shop, "alice", [virtual_id])
+
+    assert booked["slot_id"] > 0
+    assert booked["slot_time"] == "14:00:00"
+    slot = db.query(BarberSlot).filter(BarberSlot.slot_id == booked["slot_id"]).one()
+    assert slot.is_booked
+
+
+def test_conflict_next_to_a_virtual_slot_is_reported_as_booked(db, shop):
+    [taken_10] = _slots(db, shop, 10, booked=(10,))
+    virtual_id = encode_virtual_slot_id(shop["barber_id"], TOMORROW, 14 * 60)
+
+    # The claim fails after the virtual slot got its row: the error still names the booked slot
+    with pytest.raises(SlotAlreadyBookedError, match=f"Slot {taken_10} "):
+        _book(db, shop, "alice", [virtual_id, taken_10])
+    assert db.query(BarberSlot).filter(BarberSlot.slot_time == time(14)).count() == 0
+
+
+def test_optimistic_version_conflict_is_retried(db, shop):
+    slot_ids = _slots(db, shop, 10, 11)
+    races = _lose_races(db, 1)
+
+    booked = _book(db, shop, "alice", slot_ids, mode="optimistic")
+
+    assert [slot["slot_id"] for slot in booked] == slot_ids
+    assert races["claims"] == 2
+    assert db.query(Booking).filter(Booking.user_id == shop["alice"]).count() == 2
+
+
+def test_optimistic_gives_up_with_409_after_max_retries(db, shop, monkeypatch):
+    monkeypatch.setattr(booking_service, "BOOKING_CONCURRENCY_MODE", "optimistic")
+    [slot_id] = _slots(db, shop, 10)
+    races = _lose_races(db, 10)
+
+    with pytest.raises(HTTPException) as exc_info:
+        ShopService.book_slots(db, shop["alice"], shop["barber_id"], shop["shop_id"], [slot_id])
+    assert exc_info.value.status_code == 409
+    assert races["claims"] == 3  # first attempt + BOOKING_MAX_RETRIES
+    assert db.query(Booking).count() == 0
+
+
+def test_optimistic_retry_materializes_virtual_slot_again(db, shop):
+    virtual_id = encode_virtual_slot_id(shop["barber_id"], TOMORROW, 14 * 60)
+    races = _lose_races(db, 1)
+
+    [booked] = _book(db, shop, "alice", [virtual_id], mode="optimistic")
+
+    assert races["claims"] == 2
+    assert booked["slot_time"] == "14:00:00"
+    assert db.query(BarberSlot).filter(BarberSlot.slot_id == booked["slot_id"], BarberSlot.is_booked == True).count() == 1
@@ -0,0 +1,99 @@
+import smtplib
+import pytest
+from fastapi import HTTPException
+from src.utils import email
+from src.utils.email import MailQueue, send_email_otp
+
+
+class FakeSMTP:
+    """Stand-in SMTP connection; `failures` are raised by the next sendmail calls, in order."""
+
+    opened = []
+
+    def __init__(self, failures=()):
+        self.sent = []
+        self.failures = list(failures)
+        self.closed = False
+        FakeSMTP.opened.append(self)
+
+    def sendmail(self, sender, receivers, message):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append((receivers[0], message))
+
+    def quit(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def reset_connections():
+    FakeSMTP.opened = []
+
+
+def make_queue(factory=FakeSMTP, **kwargs):
+    options = {"sender": "noreply@example.com", "workers": 1, "retry_base_seconds": 0.01, "idle_seconds": 60}
+    options.update(kwargs)
+    return MailQueue(connection_factory=factory, **options)
+
+
+def test_messages_share_one_connection():
+    mail = make_queue()
+    for index in range(5):
+        mail.enqueue(f"user{index}@example.com", "Your OTP", f"Your OTP is {index}")
+    assert mail.wait_idle(5)
+    mail.stop()
+
+    assert len(FakeSMTP.opened) == 1
+    sent = FakeSMTP.opened[0].sent
+    assert [receiver for receiver, _ in sent] == [f"user{index}@example.com" for index in range(5)]
+    assert "Subject: Your OTP" in sent[0][1]
+    assert mail.stats()["sent"] == 5
+    assert mail.stats()["delivery_ms"]["count"] == 5
+
+
+def test_dropped_connection_is_reopened_without_a_retry():
+    mail = make_queue(factory=lambda: FakeSMTP([smtplib.SMTPServerDisconnected()]) if not FakeSMTP.opened else FakeSMTP())
+    mail.enqueue("a@example.com", "s", "b")
+    assert mail.wait_idle(5)
+    mail.stop()
+    assert mail.stats()["sent"] == 1
+    assert mail.stats()["retried"] == 0
+    assert mail.stats()["connections"] == 2
+
+
+def test_transient_failures_are_retried_then_given_up():
+    mail = make_queue(factory=lambda: FakeSMTP([smtplib.SMTPDataError(451, b"try later")]), max_attempts=3)
+    mail.enqueue("a@example.com", "s", "b")
+    assert mail.wait_idle(5)
+    mail.stop()
+    stats = mail.stats()
+    assert (stats["retried"], stats["failed"], stats["sent"]) == (2, 1, 0)
+
+
+def test_refused_recipient_is_not_retried():
+    refused = smtplib.SMTPRecipientsRefused({"bad@example.com": (550, b"no such user")})
+    mail = make_queue(factory=lambda: FakeSMTP([refused]))
+    mail.enqueue("bad@example.com", "s", "b")
+    assert mail.wait_idle(5)
+    mail.stop()
+    assert (mail.stats()["retried"], mail.stats()["failed"]) == (0, 1)
+
+
+def test_full_queue_rejects_with_503():
+    mail = make_queue(workers=0, queue_size=1)
+    mail.enqueue("a@example.com", "s", "b")
+    with pytest.raises(HTTPException) as error:
+        mail.enqueue("b@example.com", "s", "b")
+    assert error.value.status_code == 503
+    assert mail.stats()["rejected"] == 1
+
+
+def test_otp_email_states_the_configured_lifetime(monkeypatch):
+    mail = make_queue()
+    monkeypatch.setattr(email, "mail_queue", mail)
+    for ttl_seconds, expected in ((600, "10 minutes"), (60, "1 minute"), (90, "90 seconds")):
+        monkeypatch.setattr(email, "OTP_TTL_SECONDS", ttl_seconds)
+        send_email_otp("a@example.com", "123456")
+        assert mail.wait_idle(5)
+        assert f"It will expire in {expected}." in FakeSMTP.opened[0].sent[-1][1]
+    mail.stop()
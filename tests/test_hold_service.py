@@ -0,0 +1,137 @@
+import pytest
+from datetime import date, datetime, time, timedelta
+from src.core.config import SLOT_HOLD_MAX_SECONDS
+from src.db.models import BarberSlot
+from src.services import hold_service
+from src.services.booking_service import BookingService, SlotHeldError
+from src.services.hold_service import HoldExpiryQueue, SlotHoldService, sweep_expired_holds
+from tests.query_budget import query_budget
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def _slots(db, shop, *hours):
+    slots = [
+        BarberSlot(barber_id=shop["barber_id"], shop_id=shop["shop_id"], slot_date=TOMORROW, slot_time=time(hour),
+                   status="available", is_booked=False)
+        for hour in hours
+    ]
+    db.add_all(slots)
+    db.commit()
+    return [slot.slot_id for slot in slots]
+
+
+def _hold(db, shop, user, slot_ids, hold_seconds=None):
+    return SlotHoldService.hold_slots(db, shop[user], shop["barber_id"], shop["shop_id"], slot_ids, hold_seconds)
+
+
+def _book(db, shop, user, slot_ids):
+    return BookingService.book_slots(db, shop[user], shop["barber_id"], shop["shop_id"], slot_ids)
+
+
+def _slot(db, slot_id) -> BarberSlot:
+    db.expire_all()
+    return db.query(BarberSlot).filter(BarberSlot.slot_id == slot_id).one()
+
+
+def _lapse(db, slot_ids):
+    db.query(BarberSlot).filter(BarberSlot.slot_id.in_(slot_ids)).update(
+        {BarberSlot.held_until: datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False
+    )
+    db.commit()
+
+
+@pytest.fixture(autouse=True)
+def expiry_queue(monkeypatch):
+    queue = HoldExpiryQueue()
+    monkeypatch.setattr(hold_service, "hold_expiry_queue", queue)
+    return queue
+
+
+@pytest.fixture
+def sweep_sessions(monkeypatch, agent_sessions):
+    monkeypatch.setattr(hold_service, "SessionLocal", agent_sessions)
+
+
+def test_hold_blocks_other_customers_but_not_the_holder(db, shop):
+    slot_ids = _slots(db, shop, 10, 11)
+    _hold(db, shop, "bob", slot_ids)
+
+    with pytest.raises(SlotHeldError):
+        _book(db, shop, "alice", slot_ids[:1])
+    with pytest.raises(SlotHeldError):
+        _hold(db, shop, "alice", slot_ids[1:])
+
+    booked = _book(db, shop, "bob", slot_ids)
+    assert [slot["status"] for slot in booked] == ["booked", "booked"]
+    assert _slot(db, slot_ids[0]).is_booked
+
+
+def test_holding_again_extends_the_own_hold_up_to_the_cap(db, shop):
+    [slot_id] = _slots(db, shop, 10)
+    first = _hold(db, shop, "bob", [slot_id], hold_seconds=30)
+
+    second = _hold(db, shop, "bob", [slot_id], hold_seconds=SLOT_HOLD_MAX_SECONDS * 10)
+
+    assert second["held_until"] > first["held_until"]
+    held_for = datetime.fromisoformat(second["held_until"]) - datetime.utcnow()
+    assert held_for <= timedelta(seconds=SLOT_HOLD_MAX_SECONDS)
+
+
+def test_lapsed_hold_no_longer_blocks_anyone(db, shop):
+    [slot_id] = _slots(db, shop, 10)
+    _hold(db, shop, "bob", [slot_id])
+    _lapse(db, [slot_id])
+
+    assert _book(db, shop, "alice", [slot_id])[0]["status"] == "booked"
+
+
+def test_sweep_releases_only_lapsed_holds(db, shop, sweep_sessions, expiry_queue):
+    lapsing, live = _slots(db, shop, 10, 11)
+    _hold(db, shop, "bob", [lapsing])
+    _hold(db, shop, "alice", [live])
+    _lapse(db, [lapsing])
+    expiry_queue.push(datetime.utcnow() - timedelta(seconds=1))
+
+    sweep_expired_holds()
+
+    released = _slot(db, lapsing)
+    assert (released.status, released.held_by, released.held_until) == ("available", None, None)
+    assert _slot(db, live).status == "held"
+
+
+def test_sweep_skips_the_database_until_a_hold_is_due(db, shop, sweep_sessions, expiry_queue):
+    [slot_id] = _slots(db, shop, 10)
+    _hold(db, shop, "bob", [slot_id])
+    assert len(expiry_queue) == 1
+
+    with query_budget(0):
+        sweep_expired_holds()
+
+    # The forced sweep catches holds this process never queued (other workers, restarts)
+    _lapse(db, [slot_id])
+    sweep_expired_holds(force=True)
+    assert _slot(db, slot_id).status == "available"
+
+
+def test_release_only_touches_the_callers_holds(db, shop):
+    bobs, alices = _slots(db, shop, 10, 11)
+    _hold(db, shop, "bob", [bobs])
+    _hold(db, shop, "alice", [alices])
+
+    result = SlotHoldService.release_holds(db, shop["bob"], shop["shop_id"], [bobs, alices])
+
+    assert result["message"] == "1 slots released"
+    assert _slot(db, bobs).status == "available"
+    assert _slot(db, alices).held_by == shop["alice"]
+
+
+def test_expiry_queue_pops_only_due_entries():
+    queue = HoldExpiryQueue()
+    now = datetime(2026, 10, 18, 12, 0)
+    for seconds in (30, -5, 10, -1):
+        queue.push(now + timedelta(seconds=seconds))
+
+    assert queue.pop_due(now) == 2
+    assert queue.pop_due(now + timedelta(seconds=10)) == 1
+    assert len(queue) == 1
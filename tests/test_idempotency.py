@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from src.core import idempotency
+from src.core.idempotency import InMemoryIdempotencyStore, run_idempotent, run_idempotent_async
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = InMemoryIdempotencyStore(ttl_seconds=60, max_entries=2, clock=FakeClock())
+    monkeypatch.setattr(idempotency, "_backend", store)
+    return store
+
+
+def test_replay_returns_stored_response_without_running_handler(store):
+    calls = []
+
+    def handler():
+        calls.append(1)
+        return {"message": "1 slots booked successfully"}
+
+    first = run_idempotent("key-1", 7, {"slot_ids": [1]}, handler)
+    replay = run_idempotent("key-1", 7, {"slot_ids": [1]}, handler)
+
+    assert first == {"message": "1 slots booked successfully"}
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert len(calls) == 1
+
+
+def test_same_key_different_user_runs_again(store):
+    calls = []
+    run_idempotent("key-1", 7, {"slot_ids": [1]}, lambda: calls.append(1) or {})
+    run_idempotent("key-1", 8, {"slot_ids": [1]}, lambda: calls.append(1) or {})
+    assert len(calls) == 2
+
+
+def test_key_reuse_with_different_payload_is_rejected(store):
+    run_idempotent("key-1", 7, {"slot_ids": [1]}, lambda: {})
+    with pytest.raises(HTTPException) as exc_info:
+        run_idempotent("key-1", 7, {"slot_ids": [2]}, lambda: {})
+    assert exc_info.value.status_code == 422
+
+
+def test_client_errors_are_stored_but_conflicts_are_not(store):
+    def already_booked():
+        raise HTTPException(status_code=400, detail="Slot 1 is already booked")
+
+    with pytest.raises(HTTPException):
+        run_idempotent("key-1", 7, {}, already_booked)
+    assert run_idempotent("key-1", 7, {}, lambda: {}).status_code == 400
+
+    def conflict():
+        raise HTTPException(status_code=409, detail="retry")
+
+    with pytest.raises(HTTPException):
+        run_idempotent("key-2", 7, {}, conflict)
+    assert run_idempotent("key-2", 7, {}, lambda: {"ok": True}) == {"ok": True}
+
+
+def test_store_expires_and_evicts_least_recently_used(store):
+    store.reserve("a", "f")
+    store.reserve("b", "f")
+    store.reserve("a", "f")  # touch "a"
+    store.reserve("c", "f")  # evicts "b"
+    assert store.reserve("b", "f") is None
+
+    store._clock.now = 61
+    assert store.reserve("a", "f") is None
+
+
+def test_async_variant_shares_the_store(store):
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        return {"message": "booked"}
+
+    first = asyncio.run(run_idempotent_async("key-1", 7, {"slot_ids": [1]}, handler))
+    replay = run_idempotent("key-1", 7, {"slot_ids": [1]}, lambda: calls.append(1) or {})
+
+    assert first == {"message": "booked"}
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert len(calls) == 1
@@ -0,0 +1,59 @@
+import json
+import logging
+import queue
+from src.core.logger import JsonFormatter, NonBlockingQueueHandler, SamplingFilter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_record(level=logging.INFO, category=None, name="fastapi-auth", msg="hello"):
+    record = logging.LogRecord(name, level, __file__, 1, msg, None, None)
+    if category:
+        record.category = category
+    return record
+
+
+def test_rate_limit_refills_per_second():
+    clock = FakeClock()
+    sampler = SamplingFilter(rate_limits={"access": 2}, clock=clock)
+    assert [sampler.filter(make_record(category="access")) for _ in range(3)] == [True, True, False]
+    assert sampler.rate_limited == {"access": 1}
+
+    clock.now = 0.5
+    assert sampler.filter(make_record(category="access"))
+    assert not sampler.filter(make_record(category="access"))
+    # Other categories and warnings are not limited
+    assert sampler.filter(make_record())
+    assert sampler.filter(make_record(logging.ERROR, category="access"))
+
+
+def test_sampling_applies_per_category():
+    draws = iter([0.05, 0.5])
+    sampler = SamplingFilter(sample_rates={"sql": 0.1}, rng=lambda: next(draws))
+    assert sampler.filter(make_record(name="sqlalchemy.engine.Engine"))
+    assert not sampler.filter(make_record(name="sqlalchemy.engine.Engine"))
+    assert sampler.sampled_out == {"sql": 1}
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    handler.handle(make_record())
+    handler.handle(make_record())
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_json_formatter_includes_extra_fields():
+    record = make_record(category="access", msg="GET /shops/")
+    record.status_code = 200
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "GET /shops/"
+    assert entry["category"] == "access"
+    assert entry["status_code"] == 200
+    assert entry["level"] == "INFO"
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+from src.core.metrics import Histogram, RouteLatency, render_prometheus
+from src.db.pool import PoolMetrics, instrument_engine, instrumented_pool_class
+
+
+def test_histogram_percentiles_fall_in_the_right_bucket():
+    histogram = Histogram(buckets=(10, 100, 1000))
+    for _ in range(90):
+        histogram.observe(5)
+    for _ in range(10):
+        histogram.observe(500)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 100
+    assert 0 < snapshot["p50"] <= 10
+    assert 100 < snapshot["p99"] <= 1000
+    assert snapshot["max"] == 500
+    assert snapshot["buckets"][-1] == ("+Inf", 100)
+
+
+def test_empty_histogram():
+    assert Histogram().snapshot()["p95"] == 0.0
+
+
+def test_pool_metrics_track_checkouts_timeouts_and_lifetimes(tmp_path):
+    metrics = PoolMetrics("test")
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class(QueuePool, metrics),
+        pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    instrument_engine(engine, metrics)
+
+    held = engine.connect()
+    held.execute(text("select 1"))
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    stats = metrics.snapshot()
+    assert stats["checked_out"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["checkout_ms"]["count"] == 2
+
+    held.close()
+    engine.dispose()
+    stats = metrics.snapshot()
+    assert stats["opened"] == 1
+    assert stats["connection_lifetime_s"]["count"] == 1
+
+
+def test_prometheus_rendering_of_route_latency():
+    latency = RouteLatency()
+    latency.observe("GET", "/shops/{shop_id}/slots/", 200, 3.0)
+    latency.observe("GET", "/shops/{shop_id}/slots/", 304, 0.5)
+
+    text = render_prometheus(latency.snapshot())
+    assert 'http_requests_total{method="GET",route="/shops/{shop_id}/slots/",status="200"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/shops/{shop_id}/slots/",le="0.005"} 2' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/shops/{shop_id}/slots/",le="+Inf"} 2' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/shops/{shop_id}/slots/"} 2' in text
+    assert 'http_request_latency_ms{method="GET",route="/shops/{shop_id}/slots/",quantile="0.99"}' in text
@@ -0,0 +1,93 @@
+from datetime import date, time
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+from src.db.database import Base
+from src.db.migrations import run_startup_migrations
+
+# The tables as the first release created them: no watermark, city, version, hold or duration
+# columns, no uq_barber_slot and none of the search/pagination indexes
+OLD_SCHEMA = (
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(100) NOT NULL, email VARCHAR(150), "
+    "hashed_password VARCHAR(255), phone_number VARCHAR(20), role VARCHAR(20), otp_code VARCHAR(10), "
+    "otp_expiry DATETIME, is_verified BOOLEAN, created_at DATETIME)",
+    "CREATE TABLE shops (shop_id INTEGER PRIMARY KEY, owner_id INTEGER NOT NULL, shop_name VARCHAR(200) NOT NULL, "
+    "address TEXT NOT NULL, city VARCHAR(100) NOT NULL, state VARCHAR(100) NOT NULL, open_time TIME NOT NULL, "
+    "close_time TIME NOT NULL, is_open BOOLEAN, created_at DATETIME)",
+    "CREATE TABLE barbers (barber_id INTEGER PRIMARY KEY, barber_name VARCHAR(200) NOT NULL, shop_id INTEGER NOT NULL, "
+    "start_time TIME NOT NULL, end_time TIME NOT NULL, is_available BOOLEAN, generate_daily BOOLEAN, created_at DATETIME)",
+    "CREATE TABLE barber_slots (slot_id INTEGER PRIMARY KEY, barber_id INTEGER NOT NULL, shop_id INTEGER NOT NULL, "
+    "slot_date DATE NOT NULL, slot_time TIME NOT NULL, is_booked BOOLEAN, status VARCHAR(20), created_at DATETIME)",
+    "CREATE TABLE bookings (booking_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, barber_id INTEGER NOT NULL, "
+    "shop_id INTEGER NOT NULL, slot_id INTEGER NOT NULL, booking_date DATE NOT NULL, booking_time TIME NOT NULL, "
+    "status VARCHAR(20), created_at DATETIME)",
+)
+
+DAY = date(2026, 10, 20).isoformat()
+
+
+def _old_database():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        for statement in OLD_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'owner'), (2, 'alice')"))
+        conn.execute(text(
+            "INSERT INTO shops VALUES (1, 1, 'Fade', '1 Main St', 'Hyderabad', 'TS', '09:00:00', '17:00:00', 1, NULL)"
+        ))
+        conn.execute(text("INSERT INTO barbers VALUES (1, 'Ravi', 1, '09:00:00', '17:00:00', 1, 1, NULL)"))
+        # Two runs of the old generator raced on 09:00, and alice booked the second copy
+        conn.execute(text(
+            "INSERT INTO barber_slots VALUES "
+            f"(1, 1, 1, '{DAY}', '09:00:00', 0, 'available', NULL), "
+            f"(2, 1, 1, '{DAY}', '09:00:00', 1, 'booked', NULL), "
+            f"(3, 1, 1, '{DAY}', '10:00:00', 0, 'available', NULL), "
+            f"(4, 1, 1, '{DAY}', '10:00:00', 0, 'available', NULL)"
+        ))
+        conn.execute(text(f"INSERT INTO bookings VALUES (1, 2, 1, 1, 2, '{DAY}', '09:00:00', 'booked', NULL)"))
+    Base.metadata.create_all(engine)  # what main.py does first: only the tables that do not exist yet
+    return engine
+
+
+def test_old_schema_is_brought_up_to_the_models():
+    engine = _old_database()
+
+    run_startup_migrations(engine)
+
+    inspector = inspect(engine)
+    slot_columns = {column["name"] for column in inspector.get_columns("barber_slots")}
+    assert {"city", "version", "held_by", "held_until", "duration_minutes"} <= slot_columns
+    assert "slots_generated_until" in {c["name"] for c in inspector.get_columns("barbers")}
+    slot_indexes = {index["name"]: index for index in inspector.get_indexes("barber_slots")}
+    assert slot_indexes["uq_barber_slot"]["unique"]
+    assert "ix_barber_slots_city_date_status_time" in slot_indexes
+    assert "ix_shops_city_state_is_open_shop_id" in {index["name"] for index in inspector.get_indexes("shops")}
+
+    with engine.connect() as conn:
+        slots = conn.execute(text("SELECT slot_id, slot_time, is_booked, city, version FROM barber_slots ORDER BY slot_id")).all()
+        booking_slot = conn.execute(text("SELECT slot_id FROM bookings")).scalar()
+    # The booked copy of 09:00 and the oldest copy of 10:00 survive; the booking still points at its slot
+    assert [(row.slot_id, row.is_booked, row.city, row.version) for row in slots] == [
+        (2, 1, "Hyderabad", 0), (3, 0, "Hyderabad", 0)
+    ]
+    assert booking_slot == 2
+
+
+def test_bookings_of_merged_duplicates_move_to_the_kept_row():
+    engine = _old_database()
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO bookings VALUES (2, 2, 1, 1, 4, '{DAY}', '10:00:00', 'cancelled', NULL)"))
+
+    run_startup_migrations(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT slot_id FROM bookings WHERE booking_id = 2")).scalar() == 3
+
+
+def test_migrations_are_idempotent():
+    engine = _old_database()
+    run_startup_migrations(engine)
+
+    run_startup_migrations(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM barber_slots")).scalar() == 2
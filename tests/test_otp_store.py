@@ -0,0 +1,55 @@
+from src.core.otp_store import InMemoryOTPStore, OTP_VALID, OTP_INVALID, OTP_EXPIRED, OTP_MISSING
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_valid_code_is_consumed():
+    store = InMemoryOTPStore(clock=FakeClock())
+    store.put("verify:a@example.com", "123456", ttl_seconds=300)
+    assert store.verify("verify:a@example.com", "654321") == OTP_INVALID
+    assert store.verify("verify:a@example.com", "123456") == OTP_VALID
+    assert store.verify("verify:a@example.com", "123456") == OTP_MISSING
+
+
+def test_expired_code_is_reported_then_forgotten():
+    clock = FakeClock()
+    store = InMemoryOTPStore(clock=clock)
+    store.put("login:a@example.com", "123456", ttl_seconds=300)
+    clock.now = 300
+    assert store.verify("login:a@example.com", "123456") == OTP_EXPIRED
+    assert store.verify("login:a@example.com", "123456") == OTP_MISSING
+
+
+def test_expired_codes_are_purged_as_new_ones_are_issued():
+    clock = FakeClock()
+    store = InMemoryOTPStore(clock=clock)
+    store.put("a", "1", ttl_seconds=10)
+    store.put("b", "2", ttl_seconds=100)
+    clock.now = 50
+    store.put("c", "3", ttl_seconds=10)
+    assert len(store) == 2
+
+
+def test_reissued_code_replaces_the_old_one():
+    clock = FakeClock()
+    store = InMemoryOTPStore(clock=clock)
+    store.put("a", "111111", ttl_seconds=10)
+    store.put("a", "222222", ttl_seconds=100)
+    clock.now = 20
+    store.put("b", "333333", ttl_seconds=10)  # pops the stale expiry of the first "a"
+    assert store.verify("a", "111111") == OTP_INVALID
+    assert store.verify("a", "222222") == OTP_VALID
+
+
+def test_oldest_codes_are_evicted_beyond_max_entries():
+    store = InMemoryOTPStore(max_entries=2, clock=FakeClock())
+    for index, key in enumerate("abc"):
+        store.put(key, "1", ttl_seconds=10 + index)
+    assert len(store) == 2
+    assert store.verify("a", "1") == OTP_MISSING
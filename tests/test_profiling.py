@@ -0,0 +1,57 @@
+import threading
+import time
+from types import SimpleNamespace
+from src.core.profiling import StackSampler, _frame_label, sign_profile_request, summarize, verify_profile_header
+
+
+def test_signed_header_is_bound_to_path_and_expiry():
+    value = sign_profile_request("/shops/", ttl_seconds=60, secret="s3cret")
+    assert verify_profile_header(value, "/shops/", secret="s3cret")
+    assert not verify_profile_header(value, "/shops/1/slots/", secret="s3cret")
+    assert not verify_profile_header(value, "/shops/", secret="other")
+    assert not verify_profile_header(value, "/shops/", secret=None)
+
+    expired = sign_profile_request("/shops/", ttl_seconds=-1, secret="s3cret")
+    assert not verify_profile_header(expired, "/shops/", secret="s3cret")
+    assert not verify_profile_header("garbage", "/shops/", secret="s3cret")
+
+
+def test_summary_splits_wall_time_by_sampled_ticks():
+    sampler = StackSampler()
+    sampler.stacks.update({
+        ("main.py:app", "src/services/shop_service.py:ShopService.get_available_slots", "sqlalchemy/engine/base.py:Connection.execute"): 6,
+        ("main.py:app", "src/services/shop_service.py:ShopService.get_available_slots"): 2,
+        ("main.py:app", "fastapi/routing.py:serialize_response"): 2
+    })
+    sampler.ticks.update({"db": 6, "python": 2, "serialization": 2})
+
+    summary = summarize(sampler, wall_ms=20.0, db_ms=11.5, top=2)
+    assert summary["sampled_ms"] == {"db": 12.0, "python": 4.0, "serialization": 4.0}
+    assert summary["db_ms"] == 11.5
+    assert summary["samples"] == 10
+    assert summary["top_own"][0] == ("sqlalchemy/engine/base.py:Connection.execute", 6)
+    assert summary["top_cumulative"][0] == ("main.py:app", 10)
+    assert summary["top_cumulative"][1] == ("src/services/shop_service.py:ShopService.get_available_slots", 8)
+
+
+def test_sampler_sees_work_in_other_threads():
+    done = threading.Event()
+
+    def busy():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            sum(range(100))
+        done.set()
+
+    sampler = StackSampler(interval_ms=1)
+    sampler.start()
+    threading.Thread(target=busy).start()
+    done.wait()
+    sampler.stop()
+    assert any(any("test_profiling.py" in label for label in stack) for stack in sampler.stacks)
+
+
+def test_frame_label_without_co_qualname():
+    # Code objects before Python 3.11 only have co_name
+    code = SimpleNamespace(co_filename="/elsewhere/jobs.py", co_name="run")
+    assert _frame_label(code) == "/elsewhere/jobs.py:run"
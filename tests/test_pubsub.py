@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import pytest
+from src.core.pubsub import SlotEventHub
+
+
+def test_publish_from_another_thread_reaches_subscriber():
+    async def scenario():
+        hub = SlotEventHub(queue_size=10, max_subscribers=10)
+        subscription = hub.subscribe(1, "2026-01-01")
+        change = {"slot_id": 5, "status": "booked"}
+        thread = threading.Thread(target=hub.publish, args=(1, "2026-01-01", [change]))
+        thread.start()
+        thread.join()
+        event = await asyncio.wait_for(subscription.queue.get(), 1)
+        assert event["type"] == "slots"
+        assert event["changes"] == [change]
+
+    asyncio.run(scenario())
+
+
+def test_other_dates_are_not_notified_but_shop_wide_refresh_is():
+    async def scenario():
+        hub = SlotEventHub(queue_size=10, max_subscribers=10)
+        subscription = hub.subscribe(1, "2026-01-02")
+        hub.publish(1, "2026-01-01", [{"slot_id": 5}])
+        hub.publish(1)
+        event = await asyncio.wait_for(subscription.queue.get(), 1)
+        assert event["type"] == "refresh"
+        assert event["date"] == "2026-01-02"
+        assert subscription.queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_backlog_collapses_to_refresh():
+    async def scenario():
+        hub = SlotEventHub(queue_size=2, max_subscribers=10)
+        subscription = hub.subscribe(1, "2026-01-01")
+        for slot_id in range(5):
+            hub.publish(1, "2026-01-01", [{"slot_id": slot_id}])
+        await asyncio.sleep(0)
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        assert subscription.queue.maxsize == 2
+        assert events[0]["type"] == "refresh"
+        assert len(events) <= 2
+
+    asyncio.run(scenario())
+
+
+def test_subscriber_cap_and_unsubscribe():
+    async def scenario():
+        hub = SlotEventHub(queue_size=10, max_subscribers=1)
+        subscription = hub.subscribe(1, "2026-01-01")
+        with pytest.raises(OverflowError):
+            hub.subscribe(2, "2026-01-01")
+
+        hub.unsubscribe(subscription)
+        hub.unsubscribe(subscription)
+        assert hub.stats()["subscribers"] == 0
+        assert not hub.has_subscribers(1)
+
+    asyncio.run(scenario())
@@ -0,0 +1,68 @@
+import pytest
+from datetime import date, time, timedelta
+from src.core.slot_cache import SlotCache
+from src.db.models import Barber, BarberSlot
+from src.routes.slot_generator import generate_barber_slots
+from src.services import shop_service
+from src.services.shop_service import ShopService
+from tests.query_budget import query_budget
+
+# Statement budgets of the hot paths. Each is independent of how many barbers or slots are
+# involved, so a per-item query (N+1) sneaking back in fails these tests.
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def _more_barbers(db, shop, count: int):
+    db.add_all([
+        Barber(barber_name=f"Barber {index}", shop_id=shop["shop_id"], start_time=time(9), end_time=time(17),
+               is_available=True, generate_daily=True)
+        for index in range(count)
+    ])
+    db.commit()
+
+
+@pytest.fixture(params=["materialized", "virtual"])
+def engine(request, monkeypatch):
+    monkeypatch.setattr(shop_service, "SLOT_ENGINE", request.param)
+    monkeypatch.setattr(shop_service, "slot_cache", SlotCache())
+    return request.param
+
+
+@pytest.mark.parametrize("barbers", [1, 6])
+def test_generate_barber_slots(db, shop, agent_sessions, barbers):
+    _more_barbers(db, shop, barbers - 1)
+
+    # barbers + shops, existing slots, one multi-row insert, one watermark update
+    with query_budget(4, max_repeats=1):
+        generate_barber_slots()
+
+    assert db.query(BarberSlot.barber_id).filter(BarberSlot.slot_date == TOMORROW).distinct().count() == barbers
+
+
+def test_slot_listing(db, shop, agent_sessions, engine):
+    _more_barbers(db, shop, 5)
+    if engine == "materialized":
+        generate_barber_slots()
+
+    # materialized: one indexed read; virtual: working hours, bookings, holds
+    with query_budget(1 if engine == "materialized" else 3, max_repeats=1):
+        slots = ShopService.get_available_slots(db, shop["shop_id"], TOMORROW.isoformat())
+    assert len({slot["barber_id"] for slot in slots}) == 6
+
+    with query_budget(0):
+        ShopService.get_available_slots(db, shop["shop_id"], TOMORROW.isoformat())
+
+
+@pytest.mark.parametrize("count", [1, 6])
+def test_book_slots(db, shop, agent_sessions, engine, count):
+    if engine == "materialized":
+        generate_barber_slots()
+    listing = ShopService.get_available_slots(db, shop["shop_id"], TOMORROW.isoformat())
+    slot_ids = [slot["slot_id"] for slot in listing][:count]
+
+    # materialized: claim (savepoint, UPDATE, release), read back, insert bookings;
+    # virtual adds the materialization reads and one multi-row slot insert
+    with query_budget(5 if engine == "materialized" else 11, max_repeats=1):
+        booked = ShopService.book_slots(db, shop["alice"], shop["barber_id"], shop["shop_id"], slot_ids)
+    assert len(booked["booked_slots"]) == count
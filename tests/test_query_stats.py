@@ -0,0 +1,51 @@
+import re
+import pytest
+from sqlalchemy import create_engine, text
+from src.db.query_stats import QueryStats, statement_shape, track_queries, debug_headers
+from tests.query_budget import query_budget
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE slots (id INTEGER PRIMARY KEY, status TEXT)"))
+        conn.execute(text("INSERT INTO slots (id, status) VALUES (1, 'available'), (2, 'available'), (3, 'booked')"))
+    return engine
+
+
+def test_in_lists_of_any_length_share_a_shape():
+    assert statement_shape("SELECT * FROM slots WHERE id IN (%s, %s, %s)") == \
+        statement_shape("SELECT *\n  FROM slots WHERE id IN (%s)")
+
+
+def test_statements_are_counted_per_unit_and_repeats_flagged(engine):
+    with engine.connect() as conn:
+        with track_queries("outer") as outer:
+            with track_queries("request") as request:
+                for slot_id in (1, 2, 3):
+                    conn.execute(text("SELECT status FROM slots WHERE id = :id"), {"id": slot_id})
+            conn.execute(text("SELECT count(*) FROM slots"))
+        conn.execute(text("SELECT count(*) FROM slots"))
+
+    assert request.count == 3
+    assert request.repeated(threshold=3) == {"SELECT status FROM slots WHERE id = ?": 3}
+    assert request.repeated(threshold=4) == {}
+    assert outer.count == 4
+    assert dict(debug_headers(request))[b"x-db-queries"] == b"3"
+
+
+def test_query_budget_fails_with_the_offending_shapes(engine):
+    with engine.connect() as conn:
+        with query_budget(1):
+            conn.execute(text("SELECT status FROM slots WHERE id IN (1, 2)"))
+
+        with pytest.raises(AssertionError, match=re.escape("2x SELECT status FROM slots WHERE id = ?")):
+            with query_budget(5, max_repeats=1):
+                for slot_id in (1, 2):
+                    conn.execute(text("SELECT status FROM slots WHERE id = :id"), {"id": slot_id})
+
+
+def test_unit_without_statements_reports_zero():
+    stats = QueryStats("job:idle")
+    assert stats.summary() == "job:idle: 0 statements, 0.0ms"
@@ -0,0 +1,35 @@
+from src.db.routing import ReadYourWrites
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_client_is_sticky_only_within_the_window():
+    clock = FakeClock()
+    routing = ReadYourWrites(window_seconds=5, max_clients=10, clock=clock)
+    assert not routing.is_sticky("a")
+
+    routing.mark("a")
+    clock.now = 4.9
+    assert routing.is_sticky("a")
+    assert not routing.is_sticky("b")
+
+    clock.now = 5.0
+    assert not routing.is_sticky("a")
+
+
+def test_oldest_writers_are_forgotten_first():
+    routing = ReadYourWrites(window_seconds=5, max_clients=2, clock=FakeClock())
+    routing.mark("a")
+    routing.mark("b")
+    routing.mark("a")
+    routing.mark("c")
+
+    assert routing.is_sticky("a")
+    assert routing.is_sticky("c")
+    assert not routing.is_sticky("b")
@@ -0,0 +1,146 @@
+import pytest
+from datetime import date, time, timedelta
+from fastapi import HTTPException
+from src.core.slot_cache import SlotCache
+from src.db.migrations import backfill_slot_cities
+from src.db.models import Barber, BarberSlot, Shop
+from src.services import search_service, shop_service
+from src.services.booking_service import BookingService
+from src.services.hold_service import SlotHoldService
+from src.services.search_service import SlotSearchService
+from src.services.virtual_slot_service import encode_virtual_slot_id
+from tests.query_budget import query_budget
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def _second_shop(db, city="Hyderabad") -> dict:
+    other = Shop(owner_id=1, shop_name="Clipper", address="2 Main St", city=city, state="TS",
+                 open_time=time(9), close_time=time(17), is_open=True)
+    db.add(other)
+    db.flush()
+    barber = Barber(barber_name="Arjun", shop_id=other.shop_id, start_time=time(9), end_time=time(17),
+                    is_available=True, generate_daily=True)
+    db.add(barber)
+    db.commit()
+    return {"shop_id": other.shop_id, "barber_id": barber.barber_id}
+
+
+def _slots(db, shop, *hours, city="Hyderabad", booked=()):
+    slots = [
+        BarberSlot(barber_id=shop["barber_id"], shop_id=shop["shop_id"], city=city, slot_date=TOMORROW,
+                   slot_time=time(hour), status="booked" if hour in booked else "available", is_booked=hour in booked)
+        for hour in hours
+    ]
+    db.add_all(slots)
+    db.commit()
+    return [slot.slot_id for slot in slots]
+
+
+def _search(db, **filters):
+    return SlotSearchService.search_available_slots(db, "Hyderabad", TOMORROW.isoformat(), **filters)
+
+
+def _times(slots) -> list:
+    return [(slot["slot_time"], slot["shop_id"]) for slot in slots]
+
+
+def test_earliest_first_across_shops(db, shop):
+    other = _second_shop(db)
+    _slots(db, shop, 11, 9)
+    _slots(db, other, 10)
+    _slots(db, _second_shop(db, city="Pune"), 8, city="Pune")
+
+    slots, next_cursor = _search(db)
+
+    assert _times(slots) == [("09:00:00", shop["shop_id"]), ("10:00:00", other["shop_id"]), ("11:00:00", shop["shop_id"])]
+    assert next_cursor is None
+
+
+def test_cursor_pages_through_every_slot_once(db, shop):
+    other = _second_shop(db)
+    _slots(db, shop, 9, 10, 11)
+    _slots(db, other, 10, 12)
+
+    pages, cursor = [], None
+    while True:
+        slots, cursor = _search(db, cursor=cursor, limit=2)
+        pages.append(_times(slots))
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [item for page in pages for item in page] == [
+        ("09:00:00", shop["shop_id"]), ("10:00:00", shop["shop_id"]), ("10:00:00", other["shop_id"]),
+        ("11:00:00", shop["shop_id"]), ("12:00:00", other["shop_id"])
+    ]
+
+
+def test_time_window_is_start_inclusive_end_exclusive(db, shop):
+    _slots(db, shop, 9, 10, 11, 12)
+
+    slots, _ = _search(db, start_time=time(10), end_time=time(12))
+
+    assert [slot["slot_time"] for slot in slots] == ["10:00:00", "11:00:00"]
+
+
+def test_booked_and_held_slots_are_not_listed(db, shop):
+    free_9, held_10, _ = _slots(db, shop, 9, 10, 11, booked=(11,))
+    SlotHoldService.hold_slots(db, shop["bob"], shop["barber_id"], shop["shop_id"], [held_10])
+
+    slots, _ = _search(db)
+
+    assert [slot["slot_id"] for slot in slots] == [free_9]
+
+
+def test_invalid_cursor_and_date_are_400(db, shop):
+    for bad in ({"cursor": "not-a-cursor"}, {"cursor": "09:00:00_x"}):
+        with pytest.raises(HTTPException) as exc_info:
+            _search(db, **bad)
+        assert exc_info.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc_info:
+        SlotSearchService.search_available_slots(db, "Hyderabad", "18-10-2026")
+    assert exc_info.value.status_code == 400
+
+
+def test_backfilled_slots_become_searchable(db, shop):
+    _slots(db, shop, 9, city=None)
+    assert _search(db) == ([], None)
+
+    assert backfill_slot_cities(db) == 1
+    db.commit()
+
+    assert _times(_search(db)[0]) == [("09:00:00", shop["shop_id"])]
+    assert backfill_slot_cities(db) == 0
+
+
+def test_virtual_engine_merges_computed_listings(db, shop, monkeypatch):
+    monkeypatch.setattr(search_service, "SLOT_ENGINE", "virtual")
+    monkeypatch.setattr(shop_service, "SLOT_ENGINE", "virtual")
+    monkeypatch.setattr(shop_service, "slot_cache", SlotCache())
+    other = _second_shop(db)
+    BookingService.book_slots(db, shop["alice"], shop["barber_id"], shop["shop_id"],
+                              [encode_virtual_slot_id(shop["barber_id"], TOMORROW, 9 * 60)])
+
+    slots, next_cursor = _search(db, end_time=time(11), limit=2)
+    rest, last_cursor = _search(db, end_time=time(11), cursor=next_cursor, limit=2)
+
+    # shop's 09:00 is booked; the other three slots before 11:00 come earliest first over two pages
+    assert next_cursor is not None and last_cursor is None
+    assert [(slot["slot_time"], slot["shop_id"]) for slot in slots][0] == ("09:00:00", other["shop_id"])
+    assert sorted(_times(slots + rest)) == [
+        ("09:00:00", other["shop_id"]), ("10:00:00", shop["shop_id"]), ("10:00:00", other["shop_id"])
+    ]
+
+
+@pytest.mark.parametrize("shops", [1, 5])
+def test_virtual_search_reads_the_city_in_constant_queries(db, shop, monkeypatch, shops):
+    monkeypatch.setattr(search_service, "SLOT_ENGINE", "virtual")
+    for _ in range(shops - 1):
+        _second_shop(db)
+
+    # barber -> shop lookup, working hours, bookings, holds
+    with query_budget(4, max_repeats=1):
+        slots, _ = _search(db, limit=100)
+    assert len({slot["shop_id"] for slot in slots}) == shops
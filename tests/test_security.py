@@ -0,0 +1,44 @@
+import threading
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from src.core.security import PasswordHasher, _hash, _verify_and_update, pwd_context
+
+
+def test_saturated_hasher_rejects_immediately():
+    hasher = PasswordHasher(workers=0, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+        return "done"
+
+    worker = threading.Thread(target=hasher.run, args=(slow,))
+    worker.start()
+    started.wait()
+    with pytest.raises(HTTPException) as error:
+        hasher.run(_hash, "secret")
+    assert error.value.status_code == 503
+    assert hasher.stats()["rejected"] == 1
+
+    release.set()
+    worker.join()
+    assert hasher.stats()["pending"] == 0
+
+
+def test_process_pool_round_trip():
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    try:
+        hashed = hasher.run(_hash, "secret")
+        assert hasher.run(_verify_and_update, "secret", hashed) == (True, None)
+        assert hasher.run(_verify_and_update, "wrong", hashed) == (False, None)
+    finally:
+        hasher.shutdown()
+
+
+def test_hash_with_old_cost_is_upgraded_on_verify():
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+    valid, new_hash = _verify_and_update("secret", old_hash)
+    assert valid
+    assert new_hash is not None and not pwd_context.needs_update(new_hash)
@@ -0,0 +1,72 @@
+from src.core.slot_cache import SlotCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_counts_hits_and_misses():
+    cache = SlotCache(max_entries=10, ttl_seconds=60, clock=FakeClock())
+    assert cache.get(1, "2026-01-01") is None
+    cache.put(1, "2026-01-01", [{"slot_id": 1}])
+    assert cache.get(1, "2026-01-01") == [{"slot_id": 1}]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_invalidate_single_date_and_whole_shop():
+    cache = SlotCache(max_entries=10, ttl_seconds=60, clock=FakeClock())
+    cache.put(1, "2026-01-01", [])
+    cache.put(1, "2026-01-02", [])
+    cache.put(2, "2026-01-01", [])
+
+    cache.invalidate(1, ["2026-01-01"])
+    assert cache.get(1, "2026-01-01") is None
+    assert cache.get(1, "2026-01-02") == []
+    assert cache.get(2, "2026-01-01") == []
+
+    cache.invalidate(1)
+    assert cache.get(1, "2026-01-02") is None
+    assert cache.get(2, "2026-01-01") == []
+
+
+def test_lru_eviction_and_expiry():
+    clock = FakeClock()
+    cache = SlotCache(max_entries=2, ttl_seconds=60, clock=clock)
+    cache.put(1, "a", [])
+    cache.put(1, "b", [])
+    cache.get(1, "a")
+    cache.put(1, "c", [])  # evicts "b"
+    assert cache.get(1, "b") is None
+    assert cache.stats()["evictions"] == 1
+
+    cache.put(2, "a", [], ttl_seconds=5)
+    clock.now = 6
+    assert cache.get(2, "a") is None
+    assert cache.get(1, "c") == []
+
+
+def test_fill_from_read_started_before_invalidation_is_dropped():
+    clock = FakeClock()
+    cache = SlotCache(max_entries=10, ttl_seconds=60, clock=clock, fill_grace_seconds=2)
+    read_started = cache.now()
+    clock.now = 1.0
+    cache.invalidate(1)
+    cache.put(1, "2026-01-01", [{"slot_id": 1}], read_started=read_started)
+    assert cache.get(1, "2026-01-01") is None
+
+    # Still inside the replica lag grace window
+    clock.now = 2.5
+    cache.put(1, "2026-01-01", [{"slot_id": 1}], read_started=cache.now())
+    assert cache.get(1, "2026-01-01") is None
+    assert cache.stats()["stale_fills"] == 2
+
+    clock.now = 3.5
+    cache.put(1, "2026-01-01", [{"slot_id": 1}], read_started=cache.now())
+    assert cache.get(1, "2026-01-01") == [{"slot_id": 1}]
@@ -0,0 +1,125 @@
+import pytest
+from datetime import date, time, timedelta
+from src.core.config import SLOT_HORIZON_DAYS
+from src.db.models import Barber, BarberSlot
+from src.routes import slot_generator
+from src.routes.slot_generator import generate_barber_slots, regenerate_barber_slots
+from src.services.booking_service import BookingService
+from src.services.hold_service import SlotHoldService
+
+TODAY = date.today()
+TOMORROW = TODAY + timedelta(days=1)
+HORIZON_END = TODAY + timedelta(days=SLOT_HORIZON_DAYS - 1)
+
+
+def _hours(db, barber_id: int, day=TOMORROW) -> list:
+    rows = db.query(BarberSlot.slot_time).filter(BarberSlot.barber_id == barber_id, BarberSlot.slot_date == day)
+    return sorted(row.slot_time.hour for row in rows)
+
+
+def _slot_id(db, barber_id: int, hour: int, day=TOMORROW) -> int:
+    return db.query(BarberSlot.slot_id).filter(
+        BarberSlot.barber_id == barber_id, BarberSlot.slot_date == day, BarberSlot.slot_time == time(hour)
+    ).scalar()
+
+
+def _set_hours(db, barber_id: int, start: int, end: int):
+    db.query(Barber).filter(Barber.barber_id == barber_id).update(
+        {Barber.start_time: time(start), Barber.end_time: time(end)}
+    )
+    db.commit()
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    """The regeneration queue without its worker thread, so queued ranges can be inspected."""
+    monkeypatch.setattr(slot_generator, "_pending_regenerations", {})
+    monkeypatch.setattr(slot_generator, "_worker_thread", None)
+    monkeypatch.setattr(slot_generator, "_regeneration_worker", lambda: None)
+    return slot_generator._pending_regenerations
+
+
+def test_generate_fills_the_horizon_once(db, shop, agent_sessions):
+    generate_barber_slots()
+
+    assert _hours(db, shop["barber_id"]) == list(range(9, 17))
+    assert _hours(db, shop["barber_id"], HORIZON_END) == list(range(9, 17))
+    assert _hours(db, shop["barber_id"], HORIZON_END + timedelta(days=1)) == []
+    barber = db.query(Barber).filter(Barber.barber_id == shop["barber_id"]).one()
+    assert barber.slots_generated_until == HORIZON_END
+    assert {row.city for row in db.query(BarberSlot.city)} == {"Hyderabad"}
+
+    count = db.query(BarberSlot).count()
+    generate_barber_slots()
+    assert db.query(BarberSlot).count() == count
+
+
+def test_generate_walks_only_barbers_whose_watermark_was_cleared(db, shop, agent_sessions):
+    other = Barber(barber_name="Arjun", shop_id=shop["shop_id"], start_time=time(9), end_time=time(17),
+                   is_available=True, generate_daily=True)
+    db.add(other)
+    db.commit()
+    generate_barber_slots()
+
+    _set_hours(db, shop["barber_id"], 9, 19)
+    _set_hours(db, other.barber_id, 9, 19)
+    db.query(Barber).filter(Barber.barber_id == shop["barber_id"]).update({Barber.slots_generated_until: None})
+    db.commit()
+    generate_barber_slots()
+
+    assert _hours(db, shop["barber_id"]) == list(range(9, 19))
+    assert _hours(db, other.barber_id) == list(range(9, 17))
+
+
+def test_regenerate_retires_unbooked_slots_outside_the_new_hours(db, shop, agent_sessions):
+    generate_barber_slots()
+    booked = _slot_id(db, shop["barber_id"], 15)
+    BookingService.book_slots(db, shop["alice"], shop["barber_id"], shop["shop_id"], [booked])
+
+    _set_hours(db, shop["barber_id"], 8, 14)
+    regenerate_barber_slots(shop["barber_id"])
+
+    # 08:00 added, 14:00 and 16:00 retired, the booked 15:00 kept
+    assert _hours(db, shop["barber_id"]) == [8, 9, 10, 11, 12, 13, 15]
+    assert _hours(db, shop["barber_id"], HORIZON_END) == [8, 9, 10, 11, 12, 13]
+
+
+def test_regenerate_keeps_held_slots_until_the_hold_lapses(db, shop, agent_sessions, monkeypatch):
+    later = []
+    monkeypatch.setattr(slot_generator, "_regenerate_later", lambda *args: later.append(args))
+    generate_barber_slots()
+    held = _slot_id(db, shop["barber_id"], 16)
+    SlotHoldService.hold_slots(db, shop["bob"], shop["barber_id"], shop["shop_id"], [held], hold_seconds=120)
+
+    _set_hours(db, shop["barber_id"], 9, 15)
+    regenerate_barber_slots(shop["barber_id"])
+
+    assert _hours(db, shop["barber_id"]) == [9, 10, 11, 12, 13, 14, 16]
+    [(barber_id, start_date, end_date, delay)] = later
+    assert (barber_id, start_date, end_date) == (shop["barber_id"], TOMORROW, TOMORROW)
+    assert 100 < delay <= 121
+
+    # The checkout can still complete
+    assert BookingService.book_slots(db, shop["bob"], shop["barber_id"], shop["shop_id"], [held])[0]["status"] == "booked"
+
+
+def test_queued_regenerations_of_a_barber_merge(queue):
+    monday, wednesday, friday = date(2026, 10, 19), date(2026, 10, 21), date(2026, 10, 23)
+
+    slot_generator.enqueue_slot_regeneration(1, monday, wednesday)
+    slot_generator.enqueue_slot_regeneration(1, wednesday, friday)
+    slot_generator.enqueue_slot_regeneration(2, friday, friday)
+    assert queue == {1: (monday, friday), 2: (friday, friday)}
+
+    # An open-ended request (whole horizon) absorbs narrower ones
+    slot_generator.enqueue_slot_regeneration(2)
+    slot_generator.enqueue_slot_regeneration(2, monday, monday)
+    assert queue[2] == (None, None)
+
+
+def test_virtual_engine_queues_no_regeneration(monkeypatch, queue):
+    monkeypatch.setattr(slot_generator, "SLOT_ENGINE", "virtual")
+
+    slot_generator.enqueue_slot_regeneration(1)
+
+    assert queue == {}
@@ -7,6 +7,7 @@ from src.services.user_service import UserService
 from src.db.models import User, EmailVerification
 from src.repositories.user_repo import UserRepository
 from src.core.security import hash_password
+from src.core.otp_store import otp_store, verification_key
 
 @pytest.fixture(scope="module")
 def test_db():
@@ -70,17 +71,24 @@ def test_send_verification_otp(mock_send_email, test_db: Session):
     mock_send_email.return_value = True
     result = UserService.send_verification_otp(test_db, "john@example.com")
     assert result["msg"] == "Verification OTP sent"
-    record = test_db.query(EmailVerification).filter_by(email="john@example.com").first()
-    assert record is not None
+    # The code went to the email, and is held by the OTP store rather than the database
+    otp = mock_send_email.call_args.args[1]
+    assert test_db.query(EmailVerification).filter_by(email="john@example.com").first() is None
+    assert otp_store.verify(verification_key("john@example.com"), "not-it") == "invalid"
 
 
-def test_verify_email_success(test_db: Session):
-    # Get OTP record and verify it
-    record = test_db.query(EmailVerification).filter_by(email="john@example.com").first()
-    otp = record.otp_code
-    result = UserService.verify_email(test_db, "john@example.com", otp)
+@patch("src.services.user_service.send_email_otp")
+def test_verify_email_success(mock_send_email, test_db: Session):
+    UserService.send_verification_otp(test_db, "jane@example.com")
+    otp = mock_send_email.call_args.args[1]
+    result = UserService.verify_email(test_db, "jane@example.com", otp)
     assert result["msg"] == "Email verified successfully"
 
+    # Codes are single use
+    with pytest.raises(HTTPException) as exc_info:
+        UserService.verify_email(test_db, "jane@example.com", otp)
+    assert exc_info.value.status_code == 404
+
 
 def test_login_with_password_success(test_db: Session):
     # Create user manually for login test
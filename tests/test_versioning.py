@@ -0,0 +1,92 @@
+from fastapi import Request, Response
+from src.core import versioning
+from src.core.versioning import VersionStamps, conditional_get, query_variant, set_next_cursor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bump_changes_only_the_affected_stamp():
+    stamps = VersionStamps(max_entries=10)
+    shops_before, _ = stamps.stamp(("shops",))
+    slots_before, _ = stamps.stamp(("slots", 1, "2026-01-01"))
+
+    stamps.bump(("slots", 1, "2026-01-01"))
+
+    assert stamps.stamp(("shops",))[0] == shops_before
+    assert stamps.stamp(("slots", 1, "2026-01-01"))[0] != slots_before
+
+
+def test_evicted_scope_never_reuses_an_old_stamp():
+    stamps = VersionStamps(max_entries=1)
+    never_bumped, _ = stamps.stamp(("slots", 1, "a"))
+
+    stamps.bump(("slots", 1, "a"))
+    bumped, _ = stamps.stamp(("slots", 1, "a"))
+    stamps.bump(("slots", 1, "b"))  # evicts "a"
+
+    after_eviction, _ = stamps.stamp(("slots", 1, "a"))
+    assert after_eviction != never_bumped
+
+    stamps.bump(("slots", 1, "a"))
+    assert stamps.stamp(("slots", 1, "a"))[0] not in (never_bumped, bumped, after_eviction)
+
+
+def test_stamp_rolls_over_after_max_age():
+    clock = FakeClock()
+    stamps = VersionStamps(max_entries=10, max_age_seconds=60, clock=clock)
+    first, _ = stamps.stamp(("shops",))
+
+    clock.now = 59.9
+    assert stamps.stamp(("shops",))[0] == first
+
+    # A write handled by another worker never bumps this process: the window still moves on
+    clock.now = 60.0
+    assert stamps.stamp(("shops",))[0] != first
+
+
+def test_query_variant_separates_pages_and_filters():
+    first_page = query_variant(None, 50, "Hyderabad", None, None)
+    assert first_page == query_variant(None, 50, "Hyderabad", None, None)
+    assert first_page != query_variant(120, 50, "Hyderabad", None, None)
+    assert first_page != query_variant(None, 50, 'Pune "East"', None, None)
+    assert first_page.isalnum()
+
+
+def _get(if_none_match: str = None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/shops/", "headers": headers})
+
+
+def test_every_page_revalidates_and_the_304_names_the_next_cursor(monkeypatch):
+    monkeypatch.setattr(versioning, "version_stamps", VersionStamps(max_entries=10))
+    first_page = Response()
+    assert conditional_get(_get(), first_page, ("shops",), variant="p1", paged=True) is None
+    set_next_cursor(first_page, 120)
+    etag = first_page.headers["ETag"]
+    assert etag.endswith('-p1.next-120"') and first_page.headers["X-Next-Cursor"] == "120"
+
+    not_modified = conditional_get(_get(etag), Response(), ("shops",), variant="p1", paged=True)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["X-Next-Cursor"] == "120"
+    assert not_modified.headers["ETag"] == etag
+
+    # Another page, or the same page after a write, is a full response
+    assert conditional_get(_get(etag), Response(), ("shops",), variant="p2", paged=True) is None
+    versioning.version_stamps.bump(("shops",))
+    assert conditional_get(_get(etag), Response(), ("shops",), variant="p1", paged=True) is None
+
+
+def test_cursor_etags_only_match_paged_lists(monkeypatch):
+    monkeypatch.setattr(versioning, "version_stamps", VersionStamps(max_entries=10))
+    response = Response()
+    conditional_get(_get(), response, ("shops",), variant="p1")
+    tagged = f'{response.headers["ETag"][:-1]}.next-120"'
+
+    assert conditional_get(_get(tagged), Response(), ("shops",), variant="p1") is None
+    assert conditional_get(_get(tagged[:-1] + ' x"'), Response(), ("shops",), variant="p1", paged=True) is None
@@ -0,0 +1,122 @@
+import pytest
+from datetime import date, datetime, time, timedelta
+from src.db.models import BarberSlot, Booking
+from src.services.booking_service import BookingService
+from src.services.virtual_slot_service import (
+    IntervalSet, SlotUnavailableError, VirtualSlotService, encode_virtual_slot_id, decode_virtual_slot_id
+)
+
+
+def test_interval_set_merges_overlapping_and_adjacent():
+    intervals = IntervalSet([(540, 600), (660, 720)])
+    intervals.add(600, 660)
+    assert list(intervals) == [(540, 720)]
+
+    intervals.add(800, 900)
+    intervals.add(850, 1000)
+    assert list(intervals) == [(540, 720), (800, 1000)]
+
+
+def test_interval_set_subtract_splits_interval():
+    intervals = IntervalSet([(540, 1020)])  # 09:00 - 17:00
+    intervals.subtract(600, 660)            # booked 10:00 - 11:00
+    assert list(intervals) == [(540, 600), (660, 1020)]
+
+    intervals.subtract(500, 560)
+    intervals.subtract(1000, 1100)
+    assert list(intervals) == [(560, 600), (660, 1000)]
+
+
+def test_interval_set_slots_respect_duration_and_cutoff():
+    intervals = IntervalSet([(540, 600), (660, 780)])
+    assert list(intervals.slots(30)) == [540, 570, 660, 690, 720, 750]
+    assert list(intervals.slots(60)) == [540, 660, 720]
+    assert list(intervals.slots(60, not_before=600)) == [660, 720]
+
+
+def test_interval_set_contains():
+    intervals = IntervalSet([(540, 600), (660, 780)])
+    assert intervals.contains(540, 600)
+    assert not intervals.contains(590, 670)
+    assert not intervals.contains(500, 541)
+
+
+def test_virtual_slot_id_round_trip():
+    slot_id = encode_virtual_slot_id(4321, date(2026, 3, 15), 17 * 60 + 30, 45)
+    assert -2 ** 53 < slot_id < 0
+    assert decode_virtual_slot_id(slot_id) == (4321, date(2026, 3, 15), 17 * 60 + 30, 45)
+
+
+def _taken_slot(db, shop, slot_date, slot_time, user_id, status):
+    slot = BarberSlot(barber_id=shop["barber_id"], shop_id=shop["shop_id"], slot_date=slot_date, slot_time=slot_time,
+                      status=status, is_booked=status == "booked")
+    if status == "held":
+        slot.held_by, slot.held_until = user_id, datetime.utcnow() + timedelta(minutes=5)
+    db.add(slot)
+    db.flush()
+    if status == "booked":
+        db.add(Booking(user_id=user_id, barber_id=shop["barber_id"], shop_id=shop["shop_id"], slot_id=slot.slot_id,
+                       booking_date=slot_date, booking_time=slot_time, status="booked"))
+    db.commit()
+
+
+def test_virtual_id_overlapping_a_booking_is_rejected(db, shop):
+    tomorrow = date.today() + timedelta(days=1)
+    _taken_slot(db, shop, tomorrow, time(10), shop["bob"], "booked")
+
+    overlapping = encode_virtual_slot_id(shop["barber_id"], tomorrow, 10 * 60 + 30)
+    with pytest.raises(SlotUnavailableError, match="already booked"):
+        VirtualSlotService.materialize_slots(db, shop["shop_id"], shop["barber_id"], [overlapping], shop["alice"])
+
+    after = encode_virtual_slot_id(shop["barber_id"], tomorrow, 11 * 60)
+    [slot_id] = VirtualSlotService.materialize_slots(db, shop["shop_id"], shop["barber_id"], [after], shop["alice"])
+    assert slot_id > 0
+
+
+def test_virtual_id_held_by_someone_else_is_rejected(db, shop):
+    tomorrow = date.today() + timedelta(days=1)
+    _taken_slot(db, shop, tomorrow, time(10), shop["bob"], "held")
+    virtual_id = encode_virtual_slot_id(shop["barber_id"], tomorrow, 10 * 60)
+
+    with pytest.raises(SlotUnavailableError) as exc_info:
+        VirtualSlotService.materialize_slots(db, shop["shop_id"], shop["barber_id"], [virtual_id], shop["alice"])
+    assert exc_info.value.held
+
+    # The customer holding it may still book it
+    assert VirtualSlotService.materialize_slots(db, shop["shop_id"], shop["barber_id"], [virtual_id], shop["bob"])[0] > 0
+
+
+def test_virtual_id_in_the_past_is_rejected(db, shop):
+    yesterday = date.today() - timedelta(days=1)
+    virtual_id = encode_virtual_slot_id(shop["barber_id"], yesterday, 10 * 60)
+    with pytest.raises(ValueError, match="in the past"):
+        VirtualSlotService.materialize_slots(db, shop["shop_id"], shop["barber_id"], [virtual_id], shop["alice"])
+
+
+def test_listed_slots_of_any_duration_can_be_booked(db, shop):
+    tomorrow = date.today() + timedelta(days=1)
+    slots, _ = VirtualSlotService.compute_slots(db, shop["shop_id"], tomorrow, 30)
+    by_time = {slot["slot_time"]: slot["slot_id"] for slot in slots}
+
+    # The last half hour of the day, and two adjacent half hours
+    for slot_times in (["16:30:00"], ["10:00:00", "10:30:00"]):
+        booked = BookingService.book_slots(db, shop["alice"], shop["barber_id"], shop["shop_id"],
+                                           [by_time[slot_time] for slot_time in slot_times])
+        assert [slot["slot_time"] for slot in booked] == slot_times
+
+    assert {row.duration_minutes for row in db.query(BarberSlot).all()} == {30}
+    # Each booking occupies only its own half hour: 11:00 is still free for an hour-long slot
+    hourly, _ = VirtualSlotService.compute_slots(db, shop["shop_id"], tomorrow, 60)
+    available = [slot["slot_time"] for slot in hourly if slot["status"] == "available"]
+    assert available[:3] == ["09:00:00", "11:00:00", "12:00:00"]
+    assert "16:00:00" not in available
+
+
+def test_longer_slot_overlapping_a_short_booking_is_rejected(db, shop):
+    tomorrow = date.today() + timedelta(days=1)
+    short = encode_virtual_slot_id(shop["barber_id"], tomorrow, 10 * 60 + 30, 30)
+    BookingService.book_slots(db, shop["bob"], shop["barber_id"], shop["shop_id"], [short])
+
+    long = encode_virtual_slot_id(shop["barber_id"], tomorrow, 10 * 60, 60)
+    with pytest.raises(SlotUnavailableError, match="already booked"):
+        VirtualSlotService.materialize_slots(db, shop["shop_id"], shop["barber_id"], [long], shop["alice"])